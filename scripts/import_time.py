@@ -0,0 +1,64 @@
+import os
+import sys
+import argparse
+import subprocess
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# (name, code, budget in ms). Budgets leave headroom over what we measure today so
+# that only real regressions (an eager heavy import creeping back in) fail
+TARGETS = [
+    ("cli", "import main", 250),
+    ("web app", "import web_app; web_app.create_app()", 1200),
+    ("sandbox worker", "import sandbox, benchmarking", 200),
+    ("report rendering", "import file_saver", 150),
+]
+
+
+def measure(code):
+    # Runs a fresh interpreter with -X importtime and returns
+    # (total ms, [(cumulative ms, self ms, module), ...]) for that run
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ `{code}` failed:\n{result.stderr[-2000:]}")
+
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.strip()))
+        # Only top-level imports count towards the total; nested ones are part of their parent
+        if not name.startswith("  "):
+            total += int(cumulative_us)
+    return total / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the app's entry points with -X importtime.")
+    parser.add_argument("--runs", type=int, default=5, help="runs per target; the fastest one is reported (default: 5)")
+    parser.add_argument("--top", type=int, default=8, help="slowest modules to list per target (default: 8)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. for slow CI machines")
+    args = parser.parse_args()
+
+    failed = False
+    for name, code, budget in TARGETS:
+        total, modules = min((measure(code) for _ in range(args.runs)), key=lambda run: run[0])
+        limit = budget * args.scale
+        status = "✅" if total <= limit else "❌"
+        failed |= total > limit
+        print(f"\n{status} {name}: {total:.1f} ms (budget {limit:.0f} ms)  [{code}]")
+        for cumulative, self_ms, module in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+            print(f"    {self_ms:8.1f} ms self {cumulative:8.1f} ms cumulative  {module}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "cache", "analysis_cache.sqlite3")
+)
+
+
+def normalize_code(code):
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def make_key(code, dataset, model_name, prompt_version, context=""):
+    parts = [normalize_code(code), (dataset or "").strip(), model_name or "", prompt_version]
+    if context:
+        # Extra prompt input (e.g. profiler hot spots); absent keeps older keys valid
+        parts.append(context)
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_entries=256, ttl=7 * 24 * 3600,
+                 max_disk_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Per-function lookups of incremental analyses, counted apart so they
+        # do not skew the whole-analysis hit rate
+        self.unit_hits = 0
+        self.unit_misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    # -------------------------------
+    # Persistent tier (SQLite file)
+    # -------------------------------
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_accessed ON analyses (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def _expired(self, created_at, now):
+        return self.ttl and now - created_at > self.ttl
+
+    def _disk_get(self, key, now):
+        conn = self._connection()
+        row = conn.execute("SELECT value, created_at FROM analyses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self._expired(created_at, now):
+            conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE analyses SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return value, created_at
+
+    def _disk_set(self, key, value, now):
+        conn = self._connection()
+        size = len(value.encode("utf-8"))
+        conn.execute(
+            "INSERT OR REPLACE INTO analyses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, size, now, now),
+        )
+        self._evict(conn, now)
+        conn.commit()
+
+    def _evict(self, conn, now):
+        if self.ttl:
+            conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl,))
+        if not self.max_disk_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop least recently used entries until we are back under 90% of the budget
+        target = total - int(self.max_disk_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM analyses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM analyses WHERE key = ?", victims)
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    def get(self, key, unit=False):
+        value, source = self._lookup(key)
+        with self._lock:
+            if unit:
+                if value is None:
+                    self.unit_misses += 1
+                else:
+                    self.unit_hits += 1
+            elif value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                if source == "memory":
+                    self.memory_hits += 1
+                else:
+                    self.disk_hits += 1
+        return value
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    return value, "memory"
+                del self._memory[key]
+
+            try:
+                entry = self._disk_get(key, now)
+            except sqlite3.Error as e:
+                print(f"⚠️ Analysis cache read failed: {e}")
+                entry = None
+
+            if entry is None:
+                return None, None
+
+            self._remember(key, entry)
+            return entry[0], "disk"
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, (value, now))
+            try:
+                self._disk_set(key, value, now)
+            except sqlite3.Error as e:
+                print(f"⚠️ Analysis cache write failed: {e}")
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "unit_hits": self.unit_hits,
+            "unit_misses": self.unit_misses,
+            "memory_entries": len(self._memory),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(
+                    path=os.environ.get("ANALYSIS_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    memory_entries=int(os.environ.get("ANALYSIS_CACHE_MEMORY_ENTRIES", "256")),
+                    ttl=float(os.environ.get("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600))),
+                    max_disk_bytes=int(float(os.environ.get("ANALYSIS_CACHE_MAX_MB", "200")) * 1024 * 1024),
+                )
+    return _cache
+
+
+def cache_enabled():
+    return os.environ.get("ANALYSIS_CACHE", "1").lower() not in ("0", "false", "no", "off")
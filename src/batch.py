@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import html
+import zipfile
+import time
+import hashlib
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from file_saver import save_html_output, REPORTS_DIR
+from static_analysis import analyze_static
+
+DATASET_SUFFIXES = (".dataset", ".txt", ".json")
+# Job ids of batch items in the shared analysis queue (they have no progress page)
+BATCH_JOB_PREFIX = "batch:"
+# Wait before resubmitting an item the full analysis queue turned away
+QUEUE_RETRY_SECONDS = 1.0
+
+
+class BatchItem:
+    def __init__(self, name, code, dataset=""):
+        self.name = name
+        self.code = code
+        self.dataset = dataset or ""
+
+    @property
+    def key(self):
+        payload = json.dumps([self.name, self.code, self.dataset], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------------------
+# Loading items
+# -------------------------------
+def _items_from_files(names, read):
+    names = set(names)
+    items = []
+    for name in sorted(names):
+        if not name.endswith(".py"):
+            continue
+        stem = name[:-3]
+        dataset = ""
+        for suffix in DATASET_SUFFIXES:
+            if stem + suffix in names:
+                dataset = read(stem + suffix)
+                break
+        items.append(BatchItem(stem, read(name), dataset))
+    return items
+
+
+def load_directory(path):
+    names = []
+    for root, _, files in os.walk(path):
+        for filename in files:
+            names.append(os.path.relpath(os.path.join(root, filename), path).replace(os.sep, "/"))
+
+    def read(name):
+        with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    return _items_from_files(names, read)
+
+
+def load_zip(path_or_file):
+    with zipfile.ZipFile(path_or_file) as archive:
+        names = [info.filename for info in archive.infolist() if not info.is_dir()]
+        return _items_from_files(names, lambda name: archive.read(name).decode("utf-8"))
+
+
+def load_jsonl_lines(lines):
+    items = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        name = str(record.get("name") or record.get("id") or f"item_{number}")
+        items.append(BatchItem(name, record["code"], record.get("dataset", "")))
+    return items
+
+
+def load_items(path):
+    if os.path.isdir(path):
+        return load_directory(path)
+    if zipfile.is_zipfile(path):
+        return load_zip(path)
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return load_jsonl_lines(f)
+    raise ValueError(f"Unsupported batch source: {path} (expected a directory, .zip or .jsonl)")
+
+
+def batch_id_for(path):
+    base = re.sub(r"[^\w-]+", "_", os.path.splitext(os.path.basename(os.path.normpath(path)))[0])
+    digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return f"{base}_{digest}"
+
+
+def new_batch_id():
+    return datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+def valid_batch_id(batch_id):
+    return bool(batch_id) and re.fullmatch(r"[\w-]+", batch_id) is not None
+
+
+def _state_paths(batch_id):
+    base = os.path.join(REPORTS_DIR, f"batch_{batch_id}")
+    return base + ".json", base + ".log.jsonl"
+
+
+def read_state(batch_id):
+    # Last snapshot plus the per-item records appended since; None if unknown
+    state_path, log_path = _state_paths(batch_id)
+    if not os.path.exists(state_path) and not os.path.exists(log_path):
+        return None
+    state = {"batch_id": batch_id, "items": {}}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    if os.path.exists(log_path):
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash mid-write
+                    continue
+                state["items"].setdefault(record.pop("key"), {}).update(record)
+    return state
+
+
+# -------------------------------
+# Running a batch
+# -------------------------------
+class BatchRun:
+    def __init__(self, batch_id, items, concurrency=4, analyze=None, on_item_done=None, scheduler=None,
+                 user_key="batch"):
+        self.batch_id = batch_id
+        self.items = items
+        self.concurrency = max(1, int(concurrency))
+        self.analyze = analyze
+        self.on_item_done = on_item_done
+        # With a scheduler (the web app's), items run on its workers and take
+        # turns with other users' jobs under user_key
+        self.scheduler = scheduler
+        self.user_key = user_key
+        # Item updates are appended to the log (O(1) each); the snapshot is
+        # rewritten, and the log emptied, only when a run starts and ends
+        self.state_path, self.log_path = _state_paths(batch_id)
+        self.index_filename = f"batch_{batch_id}_index.html"
+        self._lock = threading.Lock()
+        self.state = read_state(batch_id) or {"batch_id": batch_id, "items": {}}
+        self.state["total"] = len(items)
+
+    def _save_state(self):
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def _record(self, item, **fields):
+        with self._lock:
+            entry = self.state["items"].setdefault(item.key, {"name": item.name})
+            entry.update(fields)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": item.key, "name": item.name, **fields}) + "\n")
+
+    def pending(self):
+        done = self.state["items"]
+        return [item for item in self.items if done.get(item.key, {}).get("status") != "done"]
+
+    def _report_timestamp(self, item):
+        safe_name = re.sub(r"[^\w-]+", "_", item.name).strip("_") or "item"
+        return f"{self.batch_id}_{safe_name}_{item.key[:8]}"
+
+    def _run_item(self, item):
+        if self.scheduler is None:
+            return self._analyze_item(item)
+
+        from job_queue import QueueFull
+
+        finished = threading.Event()
+        outcome = {}
+
+        def job():
+            try:
+                outcome["filename"] = self._analyze_item(item)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                finished.set()
+
+        job_id = f"{BATCH_JOB_PREFIX}{self.batch_id}:{item.key[:8]}"
+        while True:
+            try:
+                self.scheduler.submit(job_id, self.user_key, job)
+                break
+            except QueueFull:
+                if self.scheduler.stats().get("closing"):
+                    raise
+                time.sleep(QUEUE_RETRY_SECONDS)
+        finished.wait()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["filename"]
+
+    def _analyze_item(self, item):
+        analyze = self.analyze
+        if analyze is None:
+            from gemini_analyzer import analyze_with_fallback as analyze
+
+        self._record(item, status="running", error=None)
+        analysis = analyze(item.code, item.dataset)
+        filename = save_html_output(item.code, item.dataset, analysis, self._report_timestamp(item),
+                                    static=analyze_static(item.code))
+        self._record(item, status="done", report=filename)
+        if self.on_item_done:
+            self.on_item_done(item, filename, analysis)
+        return filename
+
+    def run(self):
+        pending = self.pending()
+        print(f"\n📦 Batch {self.batch_id}: {len(self.items) - len(pending)} already done, {len(pending)} to analyze "
+              f"with concurrency {self.concurrency}")
+        with self._lock:
+            self._save_state()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._run_item, item): item for item in pending}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    future.result()
+                    print(f"✅ {item.name}")
+                except Exception as e:
+                    print(f"❌ {item.name}: {e}")
+                    self._record(item, status="error", error=str(e))
+
+        with self._lock:
+            self._save_state()
+        self.write_index()
+        return self.state
+
+    def write_index(self):
+        rows = []
+        for item in self.items:
+            entry = self.state["items"].get(item.key, {})
+            if entry.get("status") == "done":
+                cell = f'<a href="{html.escape(entry["report"])}">{html.escape(entry["report"])}</a>'
+            else:
+                cell = html.escape(entry.get("error") or entry.get("status", "pending"))
+            rows.append(f"<tr><td>{html.escape(item.name)}</td><td>{html.escape(entry.get('status', 'pending'))}</td><td>{cell}</td></tr>")
+
+        content = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Batch {html.escape(self.batch_id)}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; background-color: #f9f9f9; }}
+        table {{ border-collapse: collapse; background: #fff; }}
+        th, td {{ border: 1px solid #ddd; padding: 8px 14px; text-align: left; }}
+    </style>
+</head>
+<body>
+    <h1>📦 Batch {html.escape(self.batch_id)}</h1>
+    <table>
+        <tr><th>Item</th><th>Status</th><th>Report</th></tr>
+        {"".join(rows)}
+    </table>
+</body>
+</html>"""
+        index_path = os.path.join(REPORTS_DIR, self.index_filename)
+        with open(index_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        print(f"\n✅ Batch index saved to {index_path}")
+        return self.index_filename
+
+
+def run_batch(source, concurrency=4, batch_id=None):
+    items = load_items(source)
+    return BatchRun(batch_id or batch_id_for(source), items, concurrency=concurrency).run()
@@ -0,0 +1,191 @@
+import os
+import json
+import math
+import uuid
+import hashlib
+import platform
+import statistics
+from datetime import datetime
+
+from analysis_cache import normalize_code
+
+# Earlier sweeps the latest one is compared against, and how many are returned as history
+BASELINE_SWEEPS = int(os.environ.get("BENCHMARK_BASELINE_SWEEPS", "5"))
+HISTORY_SWEEPS = int(os.environ.get("BENCHMARK_HISTORY_SWEEPS", "20"))
+# A size is flagged only if the slowdown is significant (p < ALPHA) and at least this large
+SIGNIFICANCE_ALPHA = float(os.environ.get("BENCHMARK_SIGNIFICANCE_ALPHA", "0.05"))
+REGRESSION_THRESHOLD = float(os.environ.get("BENCHMARK_REGRESSION_THRESHOLD", "0.10"))
+MAX_ROWS_PER_SWEEP = 25
+
+_fingerprint = None
+
+
+def code_hash(code, workload=None):
+    # Sweeps on different generated inputs are different benchmarks
+    key = normalize_code(code)
+    if workload:
+        key += "\n" + json.dumps(workload, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def python_version():
+    return f"{platform.python_implementation()} {platform.python_version()}"
+
+
+def machine_fingerprint():
+    # Timings are only comparable on the same hardware, so history is kept per machine
+    global _fingerprint
+    if _fingerprint is None:
+        parts = [platform.node(), platform.machine(), platform.processor(), platform.system(), str(os.cpu_count())]
+        _fingerprint = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+    return _fingerprint
+
+
+# -------------------------------
+# Recording
+# -------------------------------
+def record_sweep(code, outcome):
+    from models.models import db, BenchmarkRun
+
+    results = [r for r in (outcome.get("results") or []) if r.get("median") is not None]
+    if not results:
+        return None
+
+    sweep_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    digest = code_hash(code, outcome.get("workload"))
+    for r in results:
+        db.session.add(BenchmarkRun(
+            code_hash=digest,
+            sweep_id=sweep_id,
+            n=r["n"],
+            median=r["median"],
+            min=r.get("min"),
+            max=r.get("max"),
+            q1=r.get("q1"),
+            q3=r.get("q3"),
+            iqr=r.get("iqr"),
+            samples=json.dumps(r.get("samples") or [r["median"]]),
+            number=r.get("number"),
+            repeats=r.get("repeats"),
+            tracemalloc_peak=r.get("tracemalloc_peak"),
+            allocations=r.get("allocations"),
+            rss_peak_delta=r.get("rss_peak_delta"),
+            python_version=python_version(),
+            machine=machine_fingerprint(),
+            created_at=now,
+        ))
+    db.session.commit()
+    return sweep_id
+
+
+# -------------------------------
+# Comparison
+# -------------------------------
+def mann_whitney_greater(a, b):
+    # One-sided Mann-Whitney U test: p-value for "values in `a` tend to be larger
+    # than in `b`", normal approximation with tie and continuity correction.
+    # Rank based, so a few noisy outliers cannot fake a regression.
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    ranks = [0.0] * len(combined)
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+
+    u = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 1 - statistics.NormalDist().cdf(z)
+
+
+def load_sweeps(digest, machine=None, version=None, limit=HISTORY_SWEEPS):
+    from models.models import BenchmarkRun
+
+    rows = (
+        BenchmarkRun.query
+        .filter_by(code_hash=digest, machine=machine or machine_fingerprint(),
+                   python_version=version or python_version())
+        .order_by(BenchmarkRun.created_at.desc(), BenchmarkRun.id)
+        .limit(limit * MAX_ROWS_PER_SWEEP)
+        .all()
+    )
+    sweeps = {}
+    for row in rows:
+        sweep = sweeps.setdefault(row.sweep_id, {
+            "sweep_id": row.sweep_id,
+            "created_at": row.created_at.isoformat(),
+            "results": [],
+        })
+        sweep["results"].append({
+            "n": row.n,
+            "median": row.median,
+            "iqr": row.iqr,
+            "tracemalloc_peak": row.tracemalloc_peak,
+            "samples": json.loads(row.samples or "[]"),
+        })
+    # Newest first; the oldest sweep may be cut short by the row limit
+    return list(sweeps.values())[:limit]
+
+
+def compare_latest(digest, machine=None, version=None):
+    sweeps = load_sweeps(digest, machine, version)
+    report = {
+        "code_hash": digest,
+        "machine": machine or machine_fingerprint(),
+        "python_version": version or python_version(),
+        "alpha": SIGNIFICANCE_ALPHA,
+        "threshold": REGRESSION_THRESHOLD,
+        "latest": None,
+        "sizes": [],
+        "regression": False,
+        "improvement": False,
+        "history": [
+            {"sweep_id": s["sweep_id"], "created_at": s["created_at"],
+             "medians": {str(r["n"]): r["median"] for r in s["results"]}}
+            for s in sweeps
+        ],
+    }
+    if not sweeps:
+        return report
+
+    latest, baseline = sweeps[0], sweeps[1:1 + BASELINE_SWEEPS]
+    report["latest"] = {"sweep_id": latest["sweep_id"], "created_at": latest["created_at"]}
+
+    for result in sorted(latest["results"], key=lambda r: r["n"]):
+        previous = [r for s in baseline for r in s["results"] if r["n"] == result["n"]]
+        entry = {"n": result["n"], "median": result["median"], "baseline_median": None,
+                 "ratio": None, "p_slower": None, "p_faster": None, "status": "no history"}
+        if previous:
+            pooled = [sample for r in previous for sample in (r["samples"] or [r["median"]])]
+            base_median = statistics.median(pooled)
+            ratio = result["median"] / base_median if base_median > 0 else None
+            samples = result["samples"] or [result["median"]]
+            p_slower = mann_whitney_greater(samples, pooled)
+            p_faster = mann_whitney_greater(pooled, samples)
+            if ratio and p_slower < SIGNIFICANCE_ALPHA and ratio >= 1 + REGRESSION_THRESHOLD:
+                status = "slower"
+            elif ratio and p_faster < SIGNIFICANCE_ALPHA and ratio <= 1 / (1 + REGRESSION_THRESHOLD):
+                status = "faster"
+            else:
+                status = "unchanged"
+            entry.update(baseline_median=base_median, ratio=ratio, p_slower=p_slower,
+                         p_faster=p_faster, status=status)
+        report["sizes"].append(entry)
+
+    report["regression"] = any(entry["status"] == "slower" for entry in report["sizes"])
+    report["improvement"] = any(entry["status"] == "faster" for entry in report["sizes"])
+    return report
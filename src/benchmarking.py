@@ -0,0 +1,318 @@
+import os
+import ast
+import time
+import statistics
+import traceback
+import contextlib
+import tracemalloc
+
+from sandbox import get_pool, SandboxTimeout
+from complexity_fit import fit_sweep
+from workloads import workload_spec, materialize_sizes, workload_globals, parse_template, describe, INPUT_NAMES
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+MAX_SIZES = 25
+MIN_BATCH_TIME = 0.2
+REPEATS = 5
+MAX_NUMBER = 100_000
+DEFAULT_PREDICT_N = 1_000_000
+SWEEP_TIMEOUT = float(os.environ.get("BENCHMARK_SWEEP_TIMEOUT", "60"))
+# Generated inputs alive at once while a batch is set up (elements, summed over copies)
+SETUP_ELEMENTS = 2_000_000
+
+
+class _NullWriter:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# -------------------------------
+# Input size parsing (web side)
+# -------------------------------
+def geometric_sizes(start, stop, factor=None, points=None):
+    start = max(1, int(start))
+    stop = max(start, int(stop))
+    if points:
+        points = max(2, int(points))
+        ratio = (stop / start) ** (1 / (points - 1))
+        sizes = [round(start * ratio ** i) for i in range(points)]
+    else:
+        factor = float(factor or 10)
+        if factor <= 1:
+            raise ValueError("factor must be greater than 1")
+        sizes = []
+        value = start
+        while value <= stop:
+            sizes.append(round(value))
+            value *= factor
+    return sorted(set(sizes))
+
+
+def parse_sizes(data):
+    if data.get("sizes"):
+        sizes = sorted({int(n) for n in data["sizes"]})
+    elif data.get("range"):
+        r = data["range"]
+        sizes = geometric_sizes(r["start"], r["stop"], r.get("factor"), r.get("points"))
+    else:
+        sizes = list(DEFAULT_SIZES)
+
+    if not sizes or sizes[0] < 0:
+        raise ValueError("input sizes must be non-negative integers")
+    if len(sizes) > MAX_SIZES:
+        raise ValueError(f"at most {MAX_SIZES} input sizes per sweep")
+    return sizes
+
+
+# -------------------------------
+# Timing (runs inside a sandbox worker)
+# -------------------------------
+def _quantile(sorted_values, q):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    q1 = _quantile(ordered, 0.25)
+    q3 = _quantile(ordered, 0.75)
+    return {
+        "median": statistics.median(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "q1": q1,
+        "q3": q3,
+        "iqr": q3 - q1,
+    }
+
+
+def _time_batch(compiled, make_globals, number, setup_batch=None):
+    # Namespaces are prepared in slices of `setup_batch` outside the clock, so a
+    # large batch never holds `number` copies of a generated input at once
+    setup_batch = setup_batch or number
+    elapsed_ns = 0
+    for done in range(0, number, setup_batch):
+        namespaces = [make_globals() for _ in range(min(setup_batch, number - done))]
+        start = time.perf_counter_ns()
+        for namespace in namespaces:
+            exec(compiled, namespace)
+        elapsed_ns += time.perf_counter_ns() - start
+    return elapsed_ns
+
+
+def _autorange(compiled, make_globals, min_batch_ns, setup_batch=None):
+    base = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            number = base * multiplier
+            elapsed_ns = _time_batch(compiled, make_globals, number, setup_batch)
+            if elapsed_ns >= min_batch_ns or number >= MAX_NUMBER:
+                return number, elapsed_ns
+        base *= 10
+
+
+def time_code(compiled, make_globals, min_batch_time=MIN_BATCH_TIME, repeats=REPEATS, budget=None,
+              setup_batch=None):
+    # Warmup run: fills caches, triggers lazy imports and surfaces errors early
+    warmup_ns = _time_batch(compiled, make_globals, 1)
+
+    # Calibrate the loop count timeit-style: 1, 2, 5, 10, 20, 50, ...
+    number, elapsed_ns = _autorange(compiled, make_globals, min_batch_time * 1e9, setup_batch)
+
+    if budget is not None:
+        per_batch = max(elapsed_ns, 1) / 1e9
+        repeats = max(1, min(repeats, int(budget / per_batch)))
+
+    samples = [elapsed_ns / number]
+    for _ in range(repeats - 1):
+        samples.append(_time_batch(compiled, make_globals, number, setup_batch) / number)
+
+    stats = {key: value / 1e9 for key, value in summarize(samples).items()}
+    stats.update({
+        "number": number,
+        "repeats": len(samples),
+        "warmup": warmup_ns / 1e9,
+        # Kept for significance tests against earlier runs (see benchmark_history.py)
+        "samples": [sample / 1e9 for sample in samples],
+    })
+    return stats
+
+
+def _current_rss_bytes():
+    # Resident set size right now. ru_maxrss is the lifetime peak of a reused
+    # worker, so it stops moving once any earlier job went higher
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure_memory(compiled, make_globals):
+    namespace = make_globals()
+    rss_before = _current_rss_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        exec(compiled, namespace)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    # Sampled while the namespace is still referenced, so whatever the
+    # program kept alive counts as growth
+    rss_after = _current_rss_bytes()
+
+    return {
+        "tracemalloc_peak": peak,
+        "allocations": sum(stat.count for stat in snapshot.statistics("filename")),
+        "rss_peak_delta": None if rss_before is None or rss_after is None else rss_after - rss_before,
+    }, elapsed
+
+
+def run_sweep(code, sizes, min_batch_time=MIN_BATCH_TIME, repeats=REPEATS, size_budget=5.0, memory=True,
+              workloads=None):
+    # Inputs are built by make_globals, which every timing helper calls before
+    # its clock starts, so generating data never counts towards the measurement
+    workloads = workloads or {}
+    results = []
+    error = None
+    try:
+        compiled = compile(code, "<user_code>", "exec")
+    except SyntaxError:
+        return {"results": [], "error": traceback.format_exc()}
+
+    with contextlib.redirect_stdout(_NullWriter()):
+        # Memory passes run first, before the timing batches have grown the heap
+        if memory:
+            measured = []
+            for n in sizes:
+                try:
+                    stats, elapsed = measure_memory(compiled, lambda: workload_globals(workloads.get(n), n))
+                except Exception:
+                    error = traceback.format_exc()
+                    break
+                stats["n"] = n
+                measured.append(stats)
+                if elapsed > size_budget:
+                    break
+            sizes = [stats["n"] for stats in measured]
+        else:
+            measured = [{"n": n} for n in sizes]
+
+        for n, stats in zip(sizes, measured):
+            try:
+                stats.update(time_code(
+                    compiled,
+                    lambda: workload_globals(workloads.get(n), n),
+                    min_batch_time=min_batch_time,
+                    repeats=repeats,
+                    budget=size_budget,
+                    setup_batch=max(1, SETUP_ELEMENTS // max(n, 1)) if workloads.get(n) else None,
+                ))
+            except Exception:
+                error = traceback.format_exc()
+                break
+            results.append(stats)
+            # Larger inputs would only blow the time limit; stop the sweep here
+            if stats["warmup"] > size_budget:
+                break
+
+    return {"results": results, "error": error}
+
+
+def handle_sweep(payload):
+    return run_sweep(
+        payload["code"],
+        payload["sizes"],
+        min_batch_time=payload.get("min_batch_time", MIN_BATCH_TIME),
+        repeats=payload.get("repeats", REPEATS),
+        size_budget=payload.get("size_budget", 5.0),
+        memory=payload.get("memory", True),
+        workloads=payload.get("workloads"),
+    )
+
+
+# -------------------------------
+# Dispatch (web side)
+# -------------------------------
+def parse_workload(data, dataset=None):
+    # {"kind": "nearly_sorted", "seed": 7} or {"kind": "template", "template": "..."};
+    # the template defaults to the dataset field
+    workload = data.get("workload")
+    if not workload:
+        return None
+    if isinstance(workload, str):
+        workload = {"kind": workload}
+    return workload_spec(workload.get("kind", "random"), workload.get("seed", 0),
+                         workload.get("template") or dataset or data.get("dataset"))
+
+
+def sweep(code, sizes, timeout=SWEEP_TIMEOUT, workload=None):
+    payload = {
+        "code": code,
+        "sizes": list(sizes),
+        "size_budget": timeout / (2 * max(len(sizes), 1)),
+        "workloads": materialize_sizes(workload, sizes),
+    }
+    try:
+        outcome = get_pool().submit("sweep", payload, timeout=timeout, cpu_timeout=timeout)
+    except SandboxTimeout as e:
+        outcome = {"results": [], "error": f"TimeoutError: {e}"}
+    if workload:
+        outcome["workload"] = describe(workload)
+    return outcome
+
+
+def sweep_with_fit(code, sizes, predict_n=None, timeout=SWEEP_TIMEOUT, workload=None):
+    outcome = sweep(code, sizes, timeout=timeout, workload=workload)
+    results = outcome.get("results") or []
+    outcome["fit"] = fit_sweep(results, predict_n=predict_n)
+    outcome["memory_fit"] = fit_sweep(results, key="tracemalloc_peak", predict_n=predict_n)
+    return outcome
+
+
+def uses_input_size(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    return any(isinstance(node, ast.Name) and node.id in INPUT_NAMES and isinstance(node.ctx, ast.Load)
+               for node in ast.walk(tree))
+
+
+def uses_workload(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    return any(isinstance(node, ast.Name) and node.id in ("data", "data_view") for node in ast.walk(tree))
+
+
+def report_workload(code, dataset=None):
+    # Reports benchmark code that reads `data` on inputs drawn from the dataset
+    # field when it parses as a list of values, otherwise on random integers
+    if not uses_workload(code):
+        return None
+    if parse_template(dataset):
+        return workload_spec("template", 0, dataset)
+    return workload_spec("random")
+
+
+def benchmark_for_report(code, predict_n=None, dataset=None):
+    if not uses_input_size(code):
+        return None
+    outcome = sweep_with_fit(code, DEFAULT_SIZES, predict_n=predict_n or DEFAULT_PREDICT_N,
+                             workload=report_workload(code, dataset))
+    if not outcome.get("results"):
+        return None
+    return outcome
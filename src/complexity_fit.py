@@ -0,0 +1,139 @@
+import re
+
+# numpy is imported on the first fit; rendering reports only needs claimed_complexities
+np = None
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+# Ordered from cheapest to most expensive; ties go to the simpler model
+MODELS = [
+    ("O(1)", lambda n: np.zeros_like(n)),
+    ("O(log n)", lambda n: np.log2(n)),
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * np.log2(n)),
+    ("O(n²)", lambda n: n ** 2),
+    ("O(n³)", lambda n: n ** 3),
+    ("O(2ⁿ)", lambda n: np.exp2(n)),
+]
+
+# A more complex model has to beat the simpler one by this margin
+SIMPLER_MODEL_TOLERANCE = 1.10
+# Below this growth across the measured range the timing is treated as flat
+CONSTANT_GROWTH = 1.25
+MIN_POINTS = 3
+
+BIG_O_PATTERN = re.compile(r"O\((?:[^()]|\([^()]*\))*\)")
+
+
+def _features(sizes):
+    _numpy()
+    n = np.maximum(np.asarray(sizes, dtype=float), 2.0)
+    with np.errstate(over="ignore", invalid="ignore"):
+        features = np.vstack([f(n) for _, f in MODELS])
+        # The fit squares each feature: 2ⁿ for n around 512-1023 is finite but its square is not
+        valid = np.all(np.isfinite(features ** 2), axis=1)
+    return np.where(valid[:, None], features, 0.0), valid
+
+
+def _weighted_fit(features, y, w):
+    # Closed-form weighted least squares for y = a + b*f(n), all models at once
+    sw = w.sum()
+    sy = (w * y).sum()
+    # Large features times 1/y² weights can still overflow; those models get b = 0
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        sx = features @ w
+        sxx = (features ** 2) @ w
+        sxy = features @ (w * y)
+        det = sw * sxx - sx ** 2
+        b = np.where(det > 0, (sw * sxy - sx * sy) / det, 0.0)
+    # A negative slope means the model does not describe growth at all
+    b = np.where(np.isfinite(b) & (b > 0), b, 0.0)
+    a = (sy - b * sx) / sw
+    return a, b
+
+
+def fit_complexity(sizes, values, predict_n=None):
+    _numpy()
+    sizes = np.asarray(sizes, dtype=float)
+    y = np.asarray(values, dtype=float)
+    mask = np.isfinite(y) & (y > 0) & (sizes > 0)
+    sizes, y = sizes[mask], y[mask]
+
+    if sizes.size < MIN_POINTS:
+        return None
+
+    features, valid = _features(sizes)
+    # Weight by 1/y² so the fit minimizes relative error; timings span decades
+    w = 1.0 / y ** 2
+    a, b = _weighted_fit(features, y, w)
+
+    predicted = a[:, None] + b[:, None] * features
+    rss = ((predicted - y) ** 2 * w).sum(axis=1)
+    mean = (w * y).sum() / w.sum()
+    tss = ((y - mean) ** 2 * w).sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(tss > 0, 1 - rss / tss, 1.0)
+    rss = np.where(valid, rss, np.inf)
+
+    best = int(np.argmin(rss))
+    for index in range(best):
+        if valid[index] and rss[index] <= rss[best] * SIMPLER_MODEL_TOLERANCE:
+            best = index
+            break
+
+    fitted = predicted[best]
+    if fitted.min() > 0 and fitted.max() / fitted.min() < CONSTANT_GROWTH:
+        best = 0
+
+    candidates = [
+        {
+            "model": MODELS[i][0],
+            "intercept": float(a[i]),
+            "coefficient": float(b[i]),
+            "r2": float(r2[i]),
+            "rss": float(rss[i]),
+        }
+        for i in range(len(MODELS))
+        if valid[i]
+    ]
+
+    result = {
+        "best": MODELS[best][0],
+        "r2": float(r2[best]),
+        "intercept": float(a[best]),
+        "coefficient": float(b[best]),
+        "candidates": candidates,
+        "predict_n": None,
+        "predicted": None,
+    }
+
+    if predict_n:
+        with np.errstate(over="ignore"):
+            feature = MODELS[best][1](np.array([max(float(predict_n), 2.0)]))[0]
+        value = a[best] + b[best] * feature
+        result["predict_n"] = int(predict_n)
+        result["predicted"] = float(value) if np.isfinite(value) else None
+
+    return result
+
+
+def fit_sweep(results, key="median", predict_n=None):
+    points = [(r["n"], r[key]) for r in results if r.get(key) is not None]
+    if not points:
+        return None
+    sizes, values = zip(*points)
+    return fit_complexity(sizes, values, predict_n=predict_n)
+
+
+def claimed_complexities(analysis):
+    seen = []
+    for match in BIG_O_PATTERN.findall(analysis or ""):
+        notation = " ".join(match.split())
+        if notation not in seen:
+            seen.append(notation)
+    return seen
@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+from dotenv import dotenv_values, load_dotenv
+
+ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+DEFAULT_ENV_CONTENT = """GOOGLE_API_KEY=
+MODEL_NAME=gemini-2.0-flash-001
+"""
+
+
+def _quote(value):
+    # Written so dotenv reads back exactly this value
+    value = str(value)
+    if re.fullmatch(r"[\w./:@+,-]*", value):
+        return value
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class EnvConfig:
+    # Parsed .env kept in memory and re-read only when the file changes, so every
+    # process (web workers included) picks up edits made by any other one.
+    # Values in the file win over os.environ, which only holds the startup copy.
+
+    def __init__(self, path=ENV_PATH):
+        self.path = path
+        self._values = {}
+        # Every key the file has held since startup: once the file defined a
+        # key, removing it there must not bring back the startup os.environ copy
+        self._defined = set()
+        self._signature = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # os.replace gives the file a new inode even if mtime granularity hides the change
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _refresh(self):
+        signature = self._stat_signature()
+        with self._lock:
+            if signature == self._signature:
+                return self._values, False
+            values = {k: v or "" for k, v in dotenv_values(self.path).items()} if signature else {}
+            changed = values != self._values
+            self._values = values
+            self._defined.update(values)
+            self._signature = signature
+        if changed:
+            for callback in list(self._listeners):
+                callback(self)
+        return values, changed
+
+    def values(self):
+        return dict(self._refresh()[0])
+
+    def get(self, key, default=None):
+        values = self._refresh()[0]
+        if key in self._defined:
+            # Blank or removed in the file: unset, even if it was set at startup
+            return values.get(key) or default
+        return os.environ.get(key, default)
+
+    def subscribe(self, callback):
+        # Called with the config whenever a refresh finds different values
+        self._listeners.append(callback)
+
+    def ensure_exists(self, content=DEFAULT_ENV_CONTENT):
+        if not os.path.exists(self.path):
+            self._write_atomic(content)
+
+    def _write_atomic(self, content):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(self.path):
+            os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+        os.replace(tmp_path, self.path)
+
+    def update(self, changes):
+        # Rewrites only the given keys; comments, ordering and other keys are kept
+        self._rewrite(changes, drop_others=False)
+
+    def replace(self, values):
+        # The file ends up holding exactly these keys: any other key is deleted.
+        # Comments and the order of the kept keys are preserved
+        self._rewrite(values, drop_others=True)
+
+    def _rewrite(self, changes, drop_others):
+        lines = []
+        current = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                lines = f.read().splitlines()
+            current = {k: v or "" for k, v in dotenv_values(self.path).items()}
+
+        pending = dict(changes)
+        kept = []
+        for line in lines:
+            stripped = line.strip()
+            if "=" in stripped and not stripped.startswith("#"):
+                key = stripped.split("=", 1)[0].strip()
+                if key.startswith("export "):
+                    key = key[len("export "):].strip()
+                if key in pending:
+                    value = pending.pop(key)
+                    # Unchanged values keep their raw line (quotes, ${...} references)
+                    if value != current.get(key):
+                        line = f"{key}={_quote(value)}"
+                elif drop_others or key in changes:
+                    # Dropped, or a duplicate of a key already rewritten above
+                    continue
+            kept.append(line)
+        kept.extend(f"{key}={_quote(value)}" for key, value in pending.items())
+
+        self._write_atomic("\n".join(kept) + "\n")
+        self._refresh()
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                # Other settings (limits, pool sizes, ...) are still read from
+                # os.environ once, so seed it from the file as before
+                load_dotenv(dotenv_path=ENV_PATH)
+                _config = EnvConfig()
+    return _config
@@ -1,33 +1,123 @@
 import os
+import gzip
+import shutil
 import datetime
 
-from html_generator import generate_html
+from html_generator import render_report, stylesheet_asset
+from metrics import CODE_SAVE_LATENCY, HTML_RENDER_LATENCY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPORTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "reports"))
+
+# Reports never change once written, so each one is compressed a single time
+# and the variants are stored next to it as <report>.gz / <report>.br
+COMPRESSED_VARIANTS = {"br": ".br", "gzip": ".gz"}
+COPY_CHUNK = 64 * 1024
+
+
+def _compress_file(path, encoding):
+    variant = path + COMPRESSED_VARIANTS[encoding]
+    tmp_path = variant + ".tmp"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        if encoding == "gzip":
+            with gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=dst, mtime=0) as gz:
+                shutil.copyfileobj(src, gz, COPY_CHUNK)
+        else:
+            compressor = brotli.Compressor(quality=11)
+            for block in iter(lambda: src.read(COPY_CHUNK), b""):
+                dst.write(compressor.process(block))
+            dst.write(compressor.finish())
+    os.replace(tmp_path, variant)
+
+
+def write_report(filename, content, reports_dir=REPORTS_DIR):
+    # `content` may be a string or any iterable of strings (e.g. a streaming
+    # template), which is written out as it is produced
+    os.makedirs(reports_dir, exist_ok=True)
+    path = os.path.join(reports_dir, filename)
+    chunks = [content] if isinstance(content, str) else content
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+    # Until its variants exist the report is simply served uncompressed
+    _compress_file(path, "gzip")
+    if brotli is not None:
+        _compress_file(path, "br")
+    return path
+
+
+def ensure_report_stylesheet(reports_dir=REPORTS_DIR):
+    filename, css = stylesheet_asset()
+    if not os.path.exists(os.path.join(reports_dir, filename)):
+        write_report(filename, css, reports_dir)
+    return filename
+
+
+def report_files(filename, reports_dir=REPORTS_DIR):
+    path = os.path.join(reports_dir, filename)
+    return [path] + [path + suffix for suffix in COMPRESSED_VARIANTS.values()]
+
+
+def compressed_variant(path, encoding):
+    # Ignores sidecars older than the report (e.g. left over from a file that was replaced)
+    variant = path + COMPRESSED_VARIANTS[encoding]
+    try:
+        if os.stat(variant).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return variant
+    except OSError:
+        pass
+    return None
+
+
+def rename_report_files(old_filename, new_filename, reports_dir=REPORTS_DIR):
+    old_paths = report_files(old_filename, reports_dir)
+    new_paths = report_files(new_filename, reports_dir)
+    for old_path, new_path in zip(old_paths, new_paths):
+        if os.path.exists(old_path):
+            os.rename(old_path, new_path)
+
+
+def delete_report_files(filename, reports_dir=REPORTS_DIR):
+    for path in report_files(filename, reports_dir):
+        if os.path.exists(path):
+            os.remove(path)
 
 def save_code_to_file(code):
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    reports_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "reports"))
+    # Microseconds keep job ids unique when several submissions land in the same second
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    reports_dir = REPORTS_DIR
     os.makedirs(reports_dir, exist_ok=True)
 
     filename = f"user_code_{timestamp}.txt"
     filepath = os.path.join(reports_dir, filename)
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(code)
+    with CODE_SAVE_LATENCY.time():
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(code)
 
     print(f"\n✅ Code saved to {filepath}")
     return filepath, timestamp
 
-def save_html_output(code, dataset, analysis, timestamp):
-    reports_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "reports"))
+def save_html_output(code, dataset, analysis, timestamp, benchmark=None, optimization=None, profile=None,
+                     static=None):
+    reports_dir = REPORTS_DIR
     os.makedirs(reports_dir, exist_ok=True)
 
     output_filename = f"gemini_analysis_{timestamp}.html"
     output_path = os.path.join(reports_dir, output_filename)
 
-    html_content = generate_html(code, dataset, analysis)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    with HTML_RENDER_LATENCY.time():
+        stylesheet = ensure_report_stylesheet(reports_dir)
+        content = render_report(code, dataset, analysis, benchmark, stylesheet, optimization, profile, static)
+        write_report(output_filename, content, reports_dir)
 
     print(f"\n✅ Gemini analysis saved to {output_path}")
     return output_filename
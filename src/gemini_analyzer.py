@@ -1,25 +1,40 @@
 import os
-import time
-import google.generativeai as genai
-from dotenv import load_dotenv
 
-# Load API key
-dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
-load_dotenv(dotenv_path=dotenv_path)
+from analysis_cache import get_cache, cache_enabled, make_key
+from gemini_client import get_client, CHARS_PER_TOKEN
+from profiling import profile_summary, profile_fingerprint
+from prompt_budget import PromptPlan, code_units, group_units, MAX_CHUNKS, UNIT_HEADING, UNIT_SECTION
+from static_analysis import fallback_analysis
 
-MODEL_NAME = os.getenv("MODEL_NAME")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Bump whenever the prompt below changes so cached analyses are not reused
+PROMPT_VERSION = 1
 
-genai.configure(api_key=GOOGLE_API_KEY)
+# Progress while streaming is derived from output tokens received so far
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "2000"))
 
-def analyze_with_gemini(code, dataset, progress_callback=None):
-    model = genai.GenerativeModel(MODEL_NAME)
+TASKS = """Tasks:
+1. Identify and list all data structures used.
+2. Categorize them by time complexity:
+   - Fastest
+   - Average
+   - Slowest
+3. Explain how the algorithm works (briefly).
+4. Provide Big-O time and space complexities.
+5. Suggest more efficient alternatives if possible.
+"""
 
-    if progress_callback:
-        progress_callback(10)
-    time.sleep(0.2)
+def _profile_section(profile):
+    if not profile:
+        return ""
+    return f"""
+Profile of one run of the code:
+{profile_summary(profile)}
+
+Focus the suggestions and the optimized code on these measured hot spots.
+"""
 
-    prompt = f"""
+def build_prompt(code, dataset, profile=None):
+    return f"""
 You are a Python performance expert.
 
 Analyze the following code and dataset:
@@ -30,33 +45,291 @@ Dataset:
 Code:
 {code}
 
-Tasks:
-1. Identify and list all data structures used.
-2. Categorize them by time complexity:
-   - Fastest
-   - Average
-   - Slowest
-3. Explain how the algorithm works (briefly).
-4. Provide Big-O time and space complexities.
-5. Suggest more efficient alternatives if possible.
-6. Print the optimized code with improvements.
-"""
+{TASKS}6. Print the optimized code with improvements.
+""" + _profile_section(profile)
 
-    if progress_callback:
-        progress_callback(40)
-    time.sleep(0.5)
+def build_part_prompt(part, index, total, context, dataset, profile=None):
+    return f"""
+You are a Python performance expert.
 
-    print("\n⏳ Sending code to Gemini for analysis...\n")
-    response = model.generate_content(prompt)
+The code below is part {index} of {total} of a larger program ({", ".join(part["names"])}).
+Analyze only this part; the other parts are analyzed separately.
+
+Dataset:
+{dataset}
+
+Shared context (imports, constants and an outline of the whole program):
+{context or "(none)"}
+
+Code (part {index} of {total}):
+{part["code"]}
+
+{TASKS}6. Print optimized versions of the functions and classes in this part, keeping their names and signatures.
+""" + _profile_section(profile)
+
+def build_units_prompt(part, context, dataset, profile=None):
+    names = ", ".join(part["names"])
+    return f"""
+You are a Python performance expert.
+
+The code below is taken from a larger program ({names}).
+Analyze only this code; the rest of the program is analyzed separately.
+
+Dataset:
+{dataset}
+
+Shared context (imports, constants and an outline of the whole program):
+{context or "(none)"}
+
+Code:
+{part["code"]}
+
+Answer with one section per function or class, in this order: {names}.
+Start each section with the exact line "{UNIT_HEADING}<name>" and answer the tasks for that unit only.
+
+{TASKS}6. Print the optimized version of the unit, keeping its name and signature.
+""" + _profile_section(profile)
+
+# -------------------------------
+# Several answers streamed in order, each at its place in the report
+# -------------------------------
+def stream_segments(client, segments, prompts, emit, progress_callback=None):
+    # Each segment is either text shown as-is or the index of the prompt whose
+    # answer goes there. Returns (merged text, answer per prompt, {index: error})
+    total = len(prompts)
+    received = [[] for _ in prompts]
+    tokens_seen = [0.0] * total
+    finished = [False] * total
+    position, emitted = 0, 0
+
+    def flush():
+        # The earliest unfinished answer is shown live, later ones are held
+        # back until everything before them is out
+        nonlocal position, emitted
+        while position < len(segments):
+            segment = segments[position]
+            if isinstance(segment, str):
+                emit(segment)
+            else:
+                pending = received[segment][emitted:]
+                if pending:
+                    emit("".join(pending))
+                    emitted = len(received[segment])
+                if not finished[segment]:
+                    return
+            position, emitted = position + 1, 0
+
+    def on_chunk(index, text, tokens):
+        received[index].append(text)
+        tokens_seen[index] = tokens or len("".join(received[index])) / CHARS_PER_TOKEN
+        if progress_callback:
+            progress = sum(tokens_seen) / (EXPECTED_OUTPUT_TOKENS * total)
+            progress_callback(5 + int(90 * min(1.0, progress)))
+        flush()
+
+    def on_done(index, error):
+        if error is not None:
+            received[index].append(f"⚠️ This part could not be analyzed: {error}")
+        finished[index] = True
+        flush()
+
+    flush()
+    results = client.generate_many_sync(prompts, on_chunk, on_done, expected_tokens=EXPECTED_OUTPUT_TOKENS)
+    answers = ["".join(parts) for parts in received]
+    errors = {i: result for i, result in enumerate(results) if isinstance(result, BaseException)}
+    merged = "".join(segment if isinstance(segment, str) else answers[segment] for segment in segments)
+    return merged, answers, errors
+
+# -------------------------------
+# Large inputs: parts analyzed concurrently, merged in order
+# -------------------------------
+def _part_heading(part, index, total):
+    return f"\n\n## Part {index} of {total}: {', '.join(part['names'])}\n\n"
+
+def _overview(plan):
+    notes = [f"This program was too large for one request, so it was analyzed in {len(plan.chunks)} parts "
+             "(split along top-level functions and classes)."]
+    if plan.dataset_summarized:
+        notes.append("The dataset was too large to send in full; Gemini saw a summary of its shape, types and samples.")
+    if plan.skipped:
+        notes.append(f"Not analyzed (over the {len(plan.chunks)}-part limit): {', '.join(plan.skipped)}.")
+    return "## Overview\n\n" + "\n".join(f"- {note}" for note in notes)
+
+def analyze_parts(client, plan, profile, emit, progress_callback=None):
+    total = len(plan.chunks)
+    prompts = [build_part_prompt(part, i + 1, total, plan.context, plan.dataset, profile)
+               for i, part in enumerate(plan.chunks)]
+    segments = [_overview(plan)]
+    for i, part in enumerate(plan.chunks):
+        segments += [_part_heading(part, i + 1, total), i]
+    analysis, _, errors = stream_segments(client, segments, prompts, emit, progress_callback)
+    if len(errors) == total:
+        raise errors[0]
+    return analysis, not errors
+
+# -------------------------------
+# Unit by unit: unchanged functions/classes reuse their earlier analysis
+# -------------------------------
+def unit_key(unit, dataset, model_name, profile=None):
+    # Shared context and callees are part of the key: a unit's complexity
+    # changes with the functions it calls
+    context = "unit|" + unit["dependencies"]
+    if profile:
+        context += "|" + profile_fingerprint(profile, spans=unit["spans"])
+    return make_key(unit["fingerprint"], dataset, model_name, PROMPT_VERSION, context)
+
+def split_unit_sections(answer, names):
+    # The unit sections of one answer, or None when Gemini did not follow the headings
+    matches = list(UNIT_SECTION.finditer(answer))
+    if [match.group(1).strip(" `*") for match in matches] != names:
+        return None
+    ends = [match.start() for match in matches[1:]] + [len(answer)]
+    return [answer[match.end():end].strip() for match, end in zip(matches, ends)]
+
+def _unit_section(name, text):
+    return f"\n\n{UNIT_HEADING}{name}\n\n{text}"
+
+def _units_overview(plan, reused, sent, skipped):
+    notes = [f"Analyzed function by function: {len(sent)} sent to Gemini"
+             + (f", {len(reused)} unchanged since an earlier analysis and reused ({', '.join(reused)})." if reused else ".")]
+    if plan.dataset_summarized:
+        notes.append("The dataset was too large to send in full; Gemini saw a summary of its shape, types and samples.")
+    if skipped:
+        notes.append(f"Not analyzed (over the {MAX_CHUNKS}-request limit): {', '.join(skipped)}.")
+    return "## Overview\n\n" + "\n".join(f"- {note}" for note in notes)
+
+def analyze_units(client, units, context, keys, cached, plan, profile, emit, progress_callback=None):
+    cache = get_cache()
+    key_of = {id(unit): key for unit, key in zip(units, keys)}
+
+    # Runs of consecutive changed units are grouped into requests, so the
+    # merged report keeps the order of the code
+    parts, layout, run = [], [], []
+    for unit, text in zip(units + [None], cached + [None]):
+        if unit is None or text is not None:
+            for part in group_units(run):
+                layout.append(len(parts))
+                parts.append(part)
+            run = []
+            if unit is not None:
+                layout.append(_unit_section(unit["names"][0], text))
+        else:
+            run.append(unit)
+    skipped = [name for part in parts[MAX_CHUNKS:] for name in part["names"]]
+    parts = parts[:MAX_CHUNKS]
+
+    reused = [unit["names"][0] for unit, text in zip(units, cached) if text is not None]
+    sent = [name for part in parts for name in part["names"]]
+    print(f"♻️ {len(reused)} unchanged unit(s) reused, {len(sent)} sent to Gemini in {len(parts)} request(s)")
+
+    segments = [_units_overview(plan, reused, sent, skipped)]
+    for entry in layout:
+        if isinstance(entry, str):
+            segments.append(entry)
+        elif entry < len(parts):
+            segments += ["\n\n", entry]
+    if not parts:
+        analysis = "".join(segments)
+        emit(analysis)
+        return analysis, not skipped
+
+    prompts = [build_units_prompt(part, context, plan.dataset, profile) for part in parts]
+    analysis, answers, errors = stream_segments(client, segments, prompts, emit, progress_callback)
+    if len(errors) == len(parts) and not reused:
+        raise errors[0]
+
+    for index, (part, answer) in enumerate(zip(parts, answers)):
+        if index in errors:
+            continue
+        sections = split_unit_sections(answer, part["names"])
+        if sections is None and len(part["units"]) == 1:
+            sections = [UNIT_SECTION.sub("", answer, count=1).strip()]
+        if sections is None:
+            print(f"⚠️ Could not split the answer for {', '.join(part['names'])} into units; not cached per unit")
+            continue
+        for unit, text in zip(part["units"], sections):
+            if text:
+                cache.set(key_of[id(unit)], text)
+    return analysis, not errors and not skipped
+
+def analyze_with_gemini(code, dataset, progress_callback=None, chunk_callback=None, profile=None):
+    client = get_client()
+    cache_key = make_key(code, dataset, client.model_name, PROMPT_VERSION,
+                         profile_fingerprint(profile)) if cache_enabled() else None
+    if cache_key:
+        cached = get_cache().get(cache_key)
+        if cached is not None:
+            print("\n⚡ Reusing cached Gemini analysis.\n")
+            if chunk_callback:
+                chunk_callback(cached)
+            if progress_callback:
+                progress_callback(100)
+            return cached
+
+    plan = PromptPlan(code, dataset)
+    units = code_units(code)
+    if units:
+        keys = [unit_key(unit, dataset, client.model_name, profile) for unit in units[0]]
+        cached = [get_cache().get(key, unit=True) for key in keys]
 
     if progress_callback:
-        progress_callback(80)
-    time.sleep(0.3)
+        progress_callback(5)
 
+    print("\n⏳ Sending code to Gemini for analysis...\n")
     print("\n📊 Gemini Analysis Output:\n")
-    print(response.text)
+    received_chars = 0
+
+    def handle_chunk(text, tokens):
+        nonlocal received_chars
+        received_chars += len(text)
+        print(text, end="", flush=True)
+
+        if chunk_callback:
+            chunk_callback(text)
+        if progress_callback:
+            tokens = tokens or received_chars / CHARS_PER_TOKEN
+            progress_callback(5 + int(90 * min(1.0, tokens / EXPECTED_OUTPUT_TOKENS)))
+
+    def emit(text):
+        print(text, end="", flush=True)
+        if chunk_callback:
+            chunk_callback(text)
+
+    # Partial answers (a part failed, units left out) are returned but not cached
+    complete = True
+    if units:
+        analysis, complete = analyze_units(client, *units, keys, cached, plan, profile, emit, progress_callback)
+    elif plan.chunked:
+        print(f"✂️ Large input: analyzing {len(plan.chunks)} parts concurrently")
+        analysis, complete = analyze_parts(client, plan, profile, emit, progress_callback)
+    else:
+        part = plan.chunks[0]["code"]
+        if part != code:
+            # A single definition too large for the budget, sent truncated
+            part = plan.context + part
+        prompt = build_prompt(part, plan.dataset, profile)
+        analysis = client.generate_sync(prompt, handle_chunk, expected_tokens=EXPECTED_OUTPUT_TOKENS)
+    print()
+
+    if not analysis:
+        raise RuntimeError("Gemini returned an empty analysis")
+
+    if cache_key and complete:
+        get_cache().set(cache_key, analysis)
 
     if progress_callback:
         progress_callback(100)
 
-    return response.text
+    return analysis
+
+def analyze_with_fallback(code, dataset, progress_callback=None, chunk_callback=None, profile=None):
+    # For callers that render the static analysis next to Gemini's: when Gemini
+    # cannot be reached (outage, bad key, rate limits) that analysis is the result
+    try:
+        return analyze_with_gemini(code, dataset, progress_callback, chunk_callback, profile)
+    except Exception as e:
+        print(f"\n⚠️ Gemini analysis failed, falling back to the static analysis: {e}\n")
+        analysis = fallback_analysis(e)
+        if chunk_callback:
+            chunk_callback(analysis)
+        return analysis
@@ -0,0 +1,333 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+from config import get_config
+from metrics import GEMINI_LATENCY
+
+CHARS_PER_TOKEN = 4
+
+
+def retryable_errors():
+    # 429s and transient server-side failures are worth retrying; anything else
+    # (bad request, permission denied, safety blocks) fails immediately.
+    # Imported on first use: google.* adds about a second to startup.
+    from google.api_core import exceptions as api_exceptions
+
+    return (
+        api_exceptions.TooManyRequests,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.InternalServerError,
+        api_exceptions.DeadlineExceeded,
+        asyncio.TimeoutError,
+    )
+
+
+class GeminiUnavailable(RuntimeError):
+    pass
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+# -------------------------------
+# Rate limiting
+# -------------------------------
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1, timeout=None):
+        # Waiters are served in arrival order; a caller that could not be served
+        # before its deadline fails right away instead of queueing behind others
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            self._refill()
+            wait = max(0.0, (amount - self.tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                raise GeminiUnavailable(f"Rate limit would delay the request by {wait:.1f}s")
+            if wait > 0:
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= amount
+
+
+# -------------------------------
+# Client
+# -------------------------------
+class GeminiClient:
+    def __init__(self, model_name, fallback_model=None, rpm=15, tpm=1_000_000, burst=None,
+                 max_retries=4, backoff_base=1.0, backoff_max=30.0, timeout=120.0, hedge_after=0.0):
+        self.model_name = model_name
+        self.fallback_model = fallback_model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.requests = TokenBucket(rpm, burst or max(1, rpm // 5))
+        self.tokens = TokenBucket(tpm)
+        self.api_key = None
+        self._models = {}
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._settings_lock = threading.Lock()
+
+    def apply_settings(self, model_name=None, api_key=None, fallback_model=None):
+        # New settings apply to the next request; streams already running keep
+        # the model (and credentials) they started with
+        with self._settings_lock:
+            if api_key and api_key != self.api_key:
+                import google.generativeai as genai
+
+                genai.configure(api_key=api_key)
+                self.api_key = api_key
+                self._models = {}
+            if model_name and model_name != self.model_name:
+                if self.model_name:
+                    print(f"🔁 Gemini model switched from {self.model_name} to {model_name}")
+                self.model_name = model_name
+            self.fallback_model = fallback_model or None
+
+    def apply_config(self, config):
+        self.apply_settings(config.get("MODEL_NAME"), config.get("GOOGLE_API_KEY"), config.get("FALLBACK_MODEL_NAME"))
+
+    def _model(self, name):
+        models = self._models
+        model = models.get(name)
+        if model is None:
+            import google.generativeai as genai
+
+            model = models[name] = genai.GenerativeModel(name)
+        return model
+
+    def _backoff(self, attempt):
+        # "Full jitter": spreads retries from many callers over the whole window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _stream_once(self, model_name, prompt, on_chunk):
+        response = await self._model(model_name).generate_content_async(prompt, stream=True)
+        parts = []
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata only)
+                continue
+            parts.append(text)
+            usage = getattr(chunk, "usage_metadata", None)
+            on_chunk(text, getattr(usage, "candidates_token_count", None))
+        return "".join(parts)
+
+    async def _attempt_with_retries(self, model_name, prompt, on_chunk, deadline, expected_tokens):
+        emitted = False
+
+        def forward(text, tokens):
+            nonlocal emitted
+            emitted = True
+            on_chunk(text, tokens)
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GeminiUnavailable(f"{model_name}: deadline exceeded")
+            await self.requests.acquire(1, timeout=remaining)
+            await self.tokens.acquire(estimate_tokens(prompt) + expected_tokens, timeout=remaining)
+            try:
+                return await asyncio.wait_for(
+                    self._stream_once(model_name, prompt, forward),
+                    max(0.1, deadline - time.monotonic())
+                )
+            except retryable_errors() as e:
+                # A stream that already produced text cannot be replayed without
+                # duplicating output, so only retry failures before the first chunk
+                if emitted or attempt >= self.max_retries:
+                    raise GeminiUnavailable(f"{model_name}: {str(e) or type(e).__name__}") from e
+                delay = self._backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    raise GeminiUnavailable(f"{model_name}: {str(e) or type(e).__name__}") from e
+                attempt += 1
+                print(f"⚠️ Gemini {model_name} failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def generate(self, prompt, on_chunk=None, timeout=None, expected_tokens=2000):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._generate(prompt, on_chunk, timeout, expected_tokens)
+            outcome = "ok"
+            return result
+        finally:
+            GEMINI_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def _generate(self, prompt, on_chunk, timeout, expected_tokens):
+        # Streams the primary model; if it has not produced its first chunk within
+        # `hedge_after` seconds, the fallback model is started too and whichever
+        # speaks first wins. Only the winner's chunks reach `on_chunk`.
+        deadline = time.monotonic() + (timeout or self.timeout)
+        on_chunk = on_chunk or (lambda text, tokens: None)
+        winner = []
+        tasks = {}
+        started = set()
+
+        def forward_from(name):
+            def forward(text, tokens):
+                if not winner:
+                    winner.append(name)
+                    for other, task in tasks.items():
+                        if other != name:
+                            task.cancel()
+                if winner[0] == name:
+                    on_chunk(text, tokens)
+            return forward
+
+        def start(name):
+            started.add(name)
+            tasks[name] = asyncio.ensure_future(
+                self._attempt_with_retries(name, prompt, forward_from(name), deadline, expected_tokens)
+            )
+
+        can_fall_back = bool(self.fallback_model and self.fallback_model != self.model_name)
+        errors = []
+        start(self.model_name)
+        try:
+            if can_fall_back and self.hedge_after > 0:
+                done, _ = await asyncio.wait(list(tasks.values()), timeout=self.hedge_after)
+                if not done and not winner:
+                    print(f"⏱️ {self.model_name} slower than {self.hedge_after}s, hedging with {self.fallback_model}")
+                    start(self.fallback_model)
+
+            while tasks:
+                done, _ = await asyncio.wait(list(tasks.values()), return_when=asyncio.FIRST_COMPLETED)
+                for name, task in list(tasks.items()):
+                    if task not in done:
+                        continue
+                    del tasks[name]
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    if error is None and (not winner or winner[0] == name):
+                        return task.result()
+                    if error is not None:
+                        if winner and winner[0] == name:
+                            raise error
+                        errors.append(error)
+                # The primary gave up before producing anything: try the fallback once
+                if not tasks and not winner and can_fall_back and self.fallback_model not in started:
+                    print(f"⚠️ {self.model_name} unavailable, falling back to {self.fallback_model}")
+                    start(self.fallback_model)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        raise errors[-1] if errors else GeminiUnavailable("No Gemini response")
+
+    # -------------------------------
+    # Sync bridge: one background event loop shared by every thread
+    # -------------------------------
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="gemini-client", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def generate_sync(self, prompt, on_chunk=None, timeout=None, expected_tokens=2000):
+        # Chunks are handed back to the calling thread, so callbacks keep running
+        # with the caller's app context and never block the shared loop
+        import queue
+
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self.generate(prompt, lambda text, tokens: chunks.put((text, tokens)), timeout, expected_tokens),
+            self._ensure_loop()
+        )
+        future.add_done_callback(lambda _: chunks.put(None))
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            if on_chunk:
+                on_chunk(*item)
+        return future.result()
+
+    def generate_many_sync(self, prompts, on_chunk=None, on_done=None, timeout=None, expected_tokens=2000):
+        # Runs the prompts concurrently (still subject to the rate limits) and
+        # returns their results in order; a failed prompt yields its exception.
+        # on_chunk(index, text, tokens) and on_done(index, error) run on the calling thread.
+        import queue
+
+        events = queue.Queue()
+
+        async def run_one(index, prompt):
+            try:
+                result = await self.generate(
+                    prompt, lambda text, tokens: events.put((index, text, tokens)), timeout, expected_tokens
+                )
+            except Exception as e:
+                events.put((index, None, e))
+                raise
+            events.put((index, None, None))
+            return result
+
+        async def run_all():
+            return await asyncio.gather(*(run_one(i, p) for i, p in enumerate(prompts)), return_exceptions=True)
+
+        future = asyncio.run_coroutine_threadsafe(run_all(), self._ensure_loop())
+        future.add_done_callback(lambda _: events.put(None))
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            index, text, tokens = item
+            if text is None:
+                if on_done:
+                    on_done(index, tokens)
+            elif on_chunk:
+                on_chunk(index, text, tokens)
+        return future.result()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # Model, fallback and API key follow the .env file (see config.py), so
+    # changes saved from the admin page apply without restarting workers
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                rpm = int(os.environ.get("GEMINI_RPM", "15"))
+                config = get_config()
+                client = GeminiClient(
+                    None,
+                    rpm=rpm,
+                    tpm=int(os.environ.get("GEMINI_TPM", "1000000")),
+                    burst=int(os.environ.get("GEMINI_BURST", "0")) or None,
+                    max_retries=int(os.environ.get("GEMINI_MAX_RETRIES", "4")),
+                    backoff_base=float(os.environ.get("GEMINI_BACKOFF_BASE", "1.0")),
+                    timeout=float(os.environ.get("GEMINI_TIMEOUT", "120")),
+                    hedge_after=float(os.environ.get("GEMINI_HEDGE_AFTER", "0")),
+                )
+                client.apply_config(config)
+                config.subscribe(client.apply_config)
+                _client = client
+    # Cheap stat of .env; reloads and re-applies settings only when it changed
+    get_config().values()
+    return _client
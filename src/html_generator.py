@@ -1,56 +1,169 @@
 import os
-import html
-import markdown2
-
-def generate_html(code, dataset, analysis):
-    escaped_code = html.escape(code)
-    escaped_dataset = html.escape(dataset)
-    formatted_analysis = markdown2.markdown(analysis, extras=["fenced-code-blocks"])
-
-    html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Gemini Code Analysis Report</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 40px;
-            background-color: #f9f9f9;
-            font-size: 18px;
-            line-height: 1.6;
-        }}
-        h1 {{
-            font-size: 36px;
-            color: #2c3e50;
-            text-align: center;
-        }}
-        .section {{
-            background-color: #ffffff;
-            border-left: 8px solid #3498db;
-            padding: 25px;
-            margin-bottom: 40px;
-            border-radius: 10px;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.05);
-        }}
-        pre {{
-            background-color: #272822;
-            color: #f8f8f2;
-            padding: 15px;
-            font-size: 16px;
-            border-radius: 5px;
-            overflow: auto;
-        }}
-        code {{
-            font-family: Consolas, monospace;
-        }}
-    </style>
-</head>
-<body>
-    <h1>🚀 Gemini Code Analysis Report</h1>
-    <div class="section"><h2>🧮 Dataset</h2><pre>{escaped_dataset}</pre></div>
-    <div class="section"><h2>📜 User Code</h2><pre>{escaped_code}</pre></div>
-    <div class="section"><h2>🔍 Gemini Analysis</h2>{formatted_analysis}</div>
-</body>
-</html>"""
-    return html_content
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+from complexity_fit import claimed_complexities
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+STYLESHEET_PATH = os.path.join(os.path.dirname(__file__), "static", "report.css")
+
+# Size of the slices user text is escaped and written in
+CHUNK_CHARS = 64 * 1024
+MARKDOWN_CACHE_ENTRIES = int(os.environ.get("MARKDOWN_CACHE_ENTRIES", "64"))
+
+_env = None
+
+def _template_env():
+    global _env
+    if _env is None:
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+        _env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(["html"]))
+        _env.filters["inline_code"] = inline_code
+    return _env
+
+# Markdown code spans, as written by static_analysis.code_span
+CODE_SPAN = re.compile(r"(?<!`)(`+)(?!`)(.+?)(?<!`)\1(?!`)", re.S)
+
+def inline_code(text):
+    # Escapes text built from user code, rendering only its code spans as <code>
+    from markupsafe import Markup, escape
+
+    parts, last = [], 0
+    for match in CODE_SPAN.finditer(text):
+        code = match.group(2)
+        if code.startswith(" ") and code.endswith(" ") and code.strip():
+            code = code[1:-1]
+        parts += [escape(text[last:match.start()]), Markup("<code>%s</code>") % code]
+        last = match.end()
+    parts.append(escape(text[last:]))
+    return Markup("").join(parts)
+
+def format_seconds(value):
+    if value is None:
+        return "n/a"
+    if value < 1e-3:
+        return f"{value * 1e6:.1f} µs"
+    if value < 1:
+        return f"{value * 1e3:.2f} ms"
+    return f"{value:.3f} s"
+
+def format_bytes(value):
+    if value is None:
+        return "n/a"
+    if value < 1024:
+        return f"{value} B"
+    if value < 1024 * 1024:
+        return f"{value / 1024:.1f} KB"
+    return f"{value / (1024 * 1024):.2f} MB"
+
+def format_memory(value):
+    return format_bytes(None if value is None else int(value))
+
+def text_chunks(text, size=CHUNK_CHARS):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+# -------------------------------
+# Shared stylesheet
+# -------------------------------
+def stylesheet_asset():
+    # The file name carries a content hash, so it can be cached forever and a
+    # changed stylesheet never reuses an old name
+    with open(STYLESHEET_PATH, "r", encoding="utf-8") as f:
+        css = f.read()
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+    return f"report.{digest}.css", css
+
+# -------------------------------
+# Markdown conversion (cached by content hash)
+# -------------------------------
+_markdown_cache = OrderedDict()
+_markdown_lock = threading.Lock()
+
+def markdown_to_html(text):
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _markdown_lock:
+        if key in _markdown_cache:
+            _markdown_cache.move_to_end(key)
+            return _markdown_cache[key]
+
+    import markdown2
+
+    converted = markdown2.markdown(text, extras=["fenced-code-blocks", "tables"])
+    with _markdown_lock:
+        _markdown_cache[key] = converted
+        while len(_markdown_cache) > MARKDOWN_CACHE_ENTRIES:
+            _markdown_cache.popitem(last=False)
+    return converted
+
+# -------------------------------
+# Original vs optimized chart (inline SVG: reports are static files)
+# -------------------------------
+CHART_WIDTH = 640
+CHART_HEIGHT = 300
+CHART_PADDING = 50
+
+def overlay_chart(sizes):
+    # Log-log axes, like the sweep chart on the execute page
+    import math
+
+    points = [entry for entry in sizes if entry["n"] > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log10(entry["n"]) for entry in points]
+    values = [entry[key] for entry in points for key in ("original", "optimized")]
+    y_min, y_max = math.log10(min(values)), math.log10(max(values))
+    if y_max - y_min < 1e-9:
+        y_min, y_max = y_min - 0.5, y_max + 0.5
+    inner_w = CHART_WIDTH - 2 * CHART_PADDING
+    inner_h = CHART_HEIGHT - 2 * CHART_PADDING
+
+    def x_at(x):
+        return CHART_PADDING + (x - xs[0]) / (xs[-1] - xs[0]) * inner_w
+
+    def y_at(value):
+        return CHART_PADDING + (y_max - math.log10(value)) / (y_max - y_min) * inner_h
+
+    def series(key):
+        return [(round(x_at(x), 1), round(y_at(entry[key]), 1)) for x, entry in zip(xs, points)]
+
+    return {
+        "width": CHART_WIDTH,
+        "height": CHART_HEIGHT,
+        "padding": CHART_PADDING,
+        "original": series("original"),
+        "optimized": series("optimized"),
+        "x_labels": [(round(x_at(x), 1), "{:,}".format(entry["n"])) for x, entry in zip(xs, points)],
+        "y_labels": [(round(y_at(value), 1), format_seconds(value)) for value in (min(values), max(values))],
+    }
+
+# -------------------------------
+# Report rendering
+# -------------------------------
+def render_report(code, dataset, analysis, benchmark=None, stylesheet=None, optimization=None, profile=None,
+                  static=None):
+    # Yields the report piece by piece; inputs are escaped slice by slice so no
+    # full escaped copy of the code, dataset or analysis is ever held
+    template = _template_env().get_template("report.html")
+    return template.generate(
+        stylesheet=stylesheet or stylesheet_asset()[0],
+        dataset_chunks=text_chunks(dataset),
+        code_chunks=text_chunks(code),
+        analysis_chunks=text_chunks(markdown_to_html(analysis)),
+        benchmark=benchmark,
+        claimed=claimed_complexities(analysis) if benchmark else [],
+        optimization=optimization,
+        optimization_chart=overlay_chart(optimization["sizes"]) if optimization else None,
+        profile=profile,
+        static=static,
+        format_seconds=format_seconds,
+        format_bytes=format_bytes,
+        format_memory=format_memory,
+    )
+
+def generate_html(code, dataset, analysis, benchmark=None, stylesheet=None, optimization=None, profile=None,
+                  static=None):
+    return "".join(render_report(code, dataset, analysis, benchmark, stylesheet, optimization, profile, static))
@@ -0,0 +1,173 @@
+import os
+import time
+import atexit
+import threading
+import traceback
+from collections import OrderedDict, deque
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Job:
+    def __init__(self, job_id, user_key, func, args):
+        self.job_id = job_id
+        self.user_key = user_key
+        self.func = func
+        self.args = args
+
+
+class AnalysisScheduler:
+    def __init__(self, workers=4, max_depth=100, on_positions=None):
+        self.workers = workers
+        self.max_depth = max_depth
+        # Called with {job_id: position} whenever the queue order changes
+        self.on_positions = on_positions
+
+        # One FIFO per user, served round-robin so a single user's burst
+        # cannot starve everybody else
+        self._queues = OrderedDict()
+        self._jobs = {}
+        self._pending = 0
+        self._running = set()
+        self._closing = False
+        self._cond = threading.Condition()
+        self._threads = []
+        self._generation = 0
+        self._published_generation = 0
+        self._publish_lock = threading.Lock()
+
+    def _start_workers(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job_id, user_key, func, *args):
+        with self._cond:
+            if self._closing:
+                raise QueueFull("The analysis service is shutting down.")
+            if self._pending >= self.max_depth:
+                raise QueueFull("Too many analyses are queued right now. Please try again shortly.")
+            if not self._threads:
+                self._start_workers()
+
+            job = _Job(job_id, user_key, func, args)
+            self._queues.setdefault(user_key, deque()).append(job)
+            self._jobs[job_id] = job
+            self._pending += 1
+            self._cond.notify()
+            snapshot = self._snapshot()
+        self._publish(snapshot)
+        return snapshot[1][job_id]
+
+    def _next_job(self):
+        user_key, jobs = next(iter(self._queues.items()))
+        job = jobs.popleft()
+        del self._queues[user_key]
+        if jobs:
+            self._queues[user_key] = jobs  # back of the rotation
+        self._pending -= 1
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queues and not self._closing:
+                    self._cond.wait()
+                if not self._queues:
+                    return
+                job = self._next_job()
+                self._running.add(job.job_id)
+                snapshot = self._snapshot()
+            self._publish(snapshot)
+
+            try:
+                job.func(*job.args)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._running.discard(job.job_id)
+                    self._jobs.pop(job.job_id, None)
+                    self._cond.notify_all()
+
+    def _positions(self):
+        # Replays the round-robin dispatch order over the current queues
+        positions = {job_id: 0 for job_id in self._running}
+        queues = list(self._queues.values())
+        position = 1
+        depth = 0
+        while position <= self._pending:
+            for jobs in queues:
+                if depth < len(jobs):
+                    positions[jobs[depth].job_id] = position
+                    position += 1
+            depth += 1
+        return positions
+
+    def _snapshot(self):
+        self._generation += 1
+        return self._generation, self._positions()
+
+    def _publish(self, snapshot):
+        if self.on_positions is None:
+            return
+        generation, positions = snapshot
+        with self._publish_lock:
+            # A newer snapshot may already have been published by another thread
+            if generation < self._published_generation:
+                return
+            self._published_generation = generation
+            try:
+                self.on_positions(positions)
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self):
+        with self._cond:
+            return {"queued": self._pending, "running": len(self._running), "workers": self.workers,
+                    "closing": self._closing}
+
+    def shutdown(self, drain=True, timeout=None):
+        with self._cond:
+            self._closing = True
+            if not drain:
+                for jobs in self._queues.values():
+                    for job in jobs:
+                        self._jobs.pop(job.job_id, None)
+                self._queues.clear()
+                self._pending = 0
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(on_positions=None):
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = AnalysisScheduler(
+                    workers=int(os.environ.get("ANALYSIS_WORKERS", "4")),
+                    max_depth=int(os.environ.get("ANALYSIS_QUEUE_MAX", "100")),
+                    on_positions=on_positions,
+                )
+                drain_timeout = float(os.environ.get("ANALYSIS_DRAIN_TIMEOUT", "30"))
+                atexit.register(_scheduler.shutdown, True, drain_timeout)
+    return _scheduler
+
+
+def scheduler_stats():
+    # For /metrics: reads the scheduler without creating it, since the first
+    # get_scheduler() call decides where queue positions are published
+    scheduler = _scheduler
+    if scheduler is None:
+        return {"queued": 0, "running": 0, "workers": 0, "closing": False}
+    return scheduler.stats()
@@ -0,0 +1,380 @@
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+EVICT_INTERVAL = 60
+
+
+class _State:
+    def __init__(self, lock):
+        self.progress = 0
+        self.position = None
+        self.error = None
+        self.report = None
+        self.chunks = []
+        self.version = 0
+        self.updated_at = time.time()
+        self.changed = threading.Condition(lock)
+
+
+class JobStore(ABC):
+    # Interface shared by every backend; progress -1 means the job failed.
+    # Every write bumps the job's version and wakes whoever waits on it.
+
+    # Seconds between checks for changes made by other processes (None = push only)
+    poll_interval = None
+
+    def __init__(self):
+        self._listeners = {}
+        self._listeners_lock = threading.Lock()
+
+    def subscribe(self, job_id, callback):
+        with self._listeners_lock:
+            self._listeners.setdefault(job_id, set()).add(callback)
+
+    def unsubscribe(self, job_id, callback):
+        with self._listeners_lock:
+            callbacks = self._listeners.get(job_id)
+            if callbacks:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._listeners[job_id]
+
+    def _notify_listeners(self, job_id):
+        with self._listeners_lock:
+            callbacks = list(self._listeners.get(job_id, ()))
+        for callback in callbacks:
+            callback()
+
+    @abstractmethod
+    def get_version(self, job_id):
+        ...
+
+    @abstractmethod
+    def wait(self, job_id, version, timeout):
+        # Blocks until the job's version differs from `version` or the timeout
+        # expires; returns the current version
+        ...
+
+    @abstractmethod
+    def create(self, job_id):
+        ...
+
+    @abstractmethod
+    def set_progress(self, job_id, percent):
+        ...
+
+    @abstractmethod
+    def get_progress(self, job_id):
+        ...
+
+    @abstractmethod
+    def set_position(self, job_id, position):
+        ...
+
+    @abstractmethod
+    def get_position(self, job_id):
+        ...
+
+    @abstractmethod
+    def set_error(self, job_id, message):
+        ...
+
+    @abstractmethod
+    def get_error(self, job_id):
+        ...
+
+    @abstractmethod
+    def set_report(self, job_id, filename):
+        ...
+
+    @abstractmethod
+    def get_report(self, job_id):
+        ...
+
+    @abstractmethod
+    def append_chunk(self, job_id, text):
+        ...
+
+    @abstractmethod
+    def get_chunks(self, job_id, start=0):
+        ...
+
+    @abstractmethod
+    def discard(self, job_id):
+        ...
+
+
+# -------------------------------
+# In-process backend (default)
+# -------------------------------
+class InMemoryJobStore(JobStore):
+    def __init__(self, ttl=3600):
+        super().__init__()
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._last_evict = time.time()
+
+    def _evict(self, now):
+        if now - self._last_evict < EVICT_INTERVAL:
+            return
+        self._last_evict = now
+        cutoff = now - self.ttl
+        for job_id in [k for k, state in self._jobs.items() if state.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _state(self, job_id):
+        state = self._jobs.get(job_id)
+        if state is None:
+            state = self._jobs[job_id] = _State(self._lock)
+        return state
+
+    def _update(self, job_id, chunk=None, **fields):
+        now = time.time()
+        with self._lock:
+            state = self._state(job_id)
+            for key, value in fields.items():
+                setattr(state, key, value)
+            if chunk is not None:
+                state.chunks.append(chunk)
+            state.version += 1
+            state.updated_at = now
+            state.changed.notify_all()
+            self._evict(now)
+        self._notify_listeners(job_id)
+
+    def _get(self, job_id, field, default=None):
+        with self._lock:
+            state = self._jobs.get(job_id)
+            return default if state is None else getattr(state, field)
+
+    def get_version(self, job_id):
+        return self._get(job_id, "version", 0)
+
+    def wait(self, job_id, version, timeout):
+        with self._lock:
+            state = self._state(job_id)
+            state.changed.wait_for(lambda: state.version != version, timeout)
+            return state.version
+
+    def create(self, job_id):
+        with self._lock:
+            self._state(job_id)
+
+    def set_progress(self, job_id, percent):
+        self._update(job_id, progress=percent)
+
+    def get_progress(self, job_id):
+        return self._get(job_id, "progress", 0)
+
+    def set_position(self, job_id, position):
+        self._update(job_id, position=position)
+
+    def get_position(self, job_id):
+        return self._get(job_id, "position")
+
+    def set_error(self, job_id, message):
+        self._update(job_id, error=message, progress=-1)
+
+    def get_error(self, job_id):
+        return self._get(job_id, "error")
+
+    def set_report(self, job_id, filename):
+        self._update(job_id, report=filename)
+
+    def get_report(self, job_id):
+        return self._get(job_id, "report")
+
+    def append_chunk(self, job_id, text):
+        self._update(job_id, chunk=text)
+
+    def get_chunks(self, job_id, start=0):
+        with self._lock:
+            state = self._jobs.get(job_id)
+            return [] if state is None else state.chunks[start:]
+
+    def discard(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+# -------------------------------
+# Database backend (shared between processes)
+# -------------------------------
+class DatabaseJobStore(JobStore):
+    # Uses its own short-lived sessions so job-state writes never commit or
+    # roll back work pending in the request/job session
+
+    def __init__(self, ttl=3600, poll_interval=0.25):
+        super().__init__()
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._seq = {}
+        self._lock = threading.Lock()
+        self._last_evict = 0
+        # Writes made by this process wake local waiters immediately; writes from
+        # other processes are picked up by polling the version column
+        self._waiters = {}
+
+    def _session(self):
+        from sqlalchemy.orm import Session
+        from models.models import db
+
+        return Session(db.engine, expire_on_commit=False)
+
+    def _evict(self, session, now):
+        from models.models import JobState, JobChunk
+
+        if now - self._last_evict < EVICT_INTERVAL:
+            return
+        self._last_evict = now
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        stale = session.query(JobState.id).filter(JobState.updated_at < cutoff)
+        session.query(JobChunk).filter(JobChunk.job_id.in_(stale.scalar_subquery())).delete(synchronize_session=False)
+        session.query(JobState).filter(JobState.updated_at < cutoff).delete(synchronize_session=False)
+
+    def _update(self, job_id, chunk=None, **fields):
+        from sqlalchemy import update
+        from sqlalchemy.exc import IntegrityError
+        from models.models import JobState, JobChunk
+
+        values = dict(fields, updated_at=datetime.utcnow())
+        # version = version + 1 is evaluated by the database, so concurrent
+        # writers (threads or processes) never both publish the same version
+        bump = update(JobState).where(JobState.id == job_id).values(version=JobState.version + 1, **values)
+        with self._session() as session:
+            if session.execute(bump).rowcount == 0:
+                session.add(JobState(id=job_id, version=1, **values))
+                try:
+                    session.flush()
+                except IntegrityError:
+                    # Another writer created the row first
+                    session.rollback()
+                    session.execute(bump)
+            if chunk is not None:
+                with self._lock:
+                    seq = self._seq.get(job_id, 0)
+                    self._seq[job_id] = seq + 1
+                session.add(JobChunk(job_id=job_id, seq=seq, text=chunk))
+            self._evict(session, time.time())
+            session.commit()
+
+        with self._lock:
+            waiter = self._waiters.get(job_id)
+            if waiter is not None:
+                waiter[0].notify_all()
+        self._notify_listeners(job_id)
+
+    def get_version(self, job_id):
+        return self._get(job_id, "version", 0) or 0
+
+    def wait(self, job_id, version, timeout):
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            waiter = self._waiters.setdefault(job_id, [threading.Condition(self._lock), 0])
+            waiter[1] += 1
+        try:
+            while True:
+                current = self.get_version(job_id)
+                remaining = deadline - time.monotonic()
+                if current != version or remaining <= 0:
+                    return current
+                with self._lock:
+                    waiter[0].wait(min(self.poll_interval, remaining))
+        finally:
+            with self._lock:
+                waiter[1] -= 1
+                if waiter[1] == 0:
+                    self._waiters.pop(job_id, None)
+
+    def _get(self, job_id, field, default=None):
+        from models.models import JobState
+
+        with self._session() as session:
+            state = session.get(JobState, job_id)
+            return default if state is None else getattr(state, field)
+
+    def create(self, job_id):
+        self._update(job_id, progress=0, position=None, error=None, report=None)
+
+    def set_progress(self, job_id, percent):
+        if percent >= 100:
+            self._finish(job_id)
+        self._update(job_id, progress=percent)
+
+    def get_progress(self, job_id):
+        return self._get(job_id, "progress", 0)
+
+    def set_position(self, job_id, position):
+        self._update(job_id, position=position)
+
+    def get_position(self, job_id):
+        return self._get(job_id, "position")
+
+    def set_error(self, job_id, message):
+        self._finish(job_id)
+        self._update(job_id, error=message, progress=-1)
+
+    def get_error(self, job_id):
+        return self._get(job_id, "error")
+
+    def set_report(self, job_id, filename):
+        self._update(job_id, report=filename)
+
+    def get_report(self, job_id):
+        return self._get(job_id, "report")
+
+    def _finish(self, job_id):
+        with self._lock:
+            self._seq.pop(job_id, None)
+
+    def append_chunk(self, job_id, text):
+        self._update(job_id, chunk=text)
+
+    def get_chunks(self, job_id, start=0):
+        from models.models import JobChunk
+
+        with self._session() as session:
+            rows = (
+                session.query(JobChunk.text)
+                .filter(JobChunk.job_id == job_id, JobChunk.seq >= start)
+                .order_by(JobChunk.seq)
+                .all()
+            )
+            return [row.text for row in rows]
+
+    def discard(self, job_id):
+        from models.models import JobState, JobChunk
+
+        self._finish(job_id)
+        with self._session() as session:
+            session.query(JobChunk).filter(JobChunk.job_id == job_id).delete(synchronize_session=False)
+            session.query(JobState).filter(JobState.id == job_id).delete(synchronize_session=False)
+            session.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+BACKENDS = {
+    "memory": InMemoryJobStore,
+    "db": DatabaseJobStore,
+}
+
+
+def get_job_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.environ.get("JOB_STORE", "memory").lower()
+                if backend not in BACKENDS:
+                    raise RuntimeError(f"❌ Unknown JOB_STORE '{backend}' (expected one of: {', '.join(BACKENDS)})")
+                options = {"ttl": float(os.environ.get("JOB_STATE_TTL", "3600"))}
+                if backend == "db":
+                    options["poll_interval"] = float(os.environ.get("JOB_STORE_POLL_INTERVAL", "0.25"))
+                _store = BACKENDS[backend](**options)
+    return _store
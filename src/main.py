@@ -1,12 +1,34 @@
+import argparse
+
 from input_handler import get_user_input
 from file_saver import save_code_to_file, save_html_output
-from gemini_analyzer import analyze_with_gemini
+from gemini_analyzer import analyze_with_fallback
+from static_analysis import analyze_static, static_markdown
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze Python code and datasets with Gemini.")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="directory, .zip or .jsonl of (code, dataset) items to analyze in one run")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="maximum number of concurrent Gemini requests in batch mode (default: 4)")
+    parser.add_argument("--batch-id",
+                        help="name of the batch; rerunning with the same id resumes it (default: derived from PATH)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    if args.batch:
+        from batch import run_batch
+
+        run_batch(args.batch, concurrency=args.concurrency, batch_id=args.batch_id)
+        return
+
     dataset, user_code = get_user_input()
     _, timestamp = save_code_to_file(user_code)
-    analysis = analyze_with_gemini(user_code, dataset)
-    save_html_output(user_code, dataset, analysis, timestamp)
+    static = analyze_static(user_code)
+    print("\n" + static_markdown(static))
+    analysis = analyze_with_fallback(user_code, dataset)
+    save_html_output(user_code, dataset, analysis, timestamp, static=static)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,263 @@
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# In-process registry rendered in the Prometheus text format by /metrics. Each
+# observation is a bisect and an add under a per-metric lock, cheap enough to
+# leave on everywhere; with several worker processes each one reports its own.
+
+# Prometheus client defaults, for steps that take milliseconds to seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Network calls and sandboxed runs (seconds to minutes)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts; made cumulative when rendered
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        # In progress while the block runs (open connections, running jobs)
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class CallbackMetric(_Metric):
+    # Read from its owner at scrape time: nothing is recorded on the hot path.
+    # `read` returns a number, or {label values tuple: number} when labelled.
+    def __init__(self, name, help_text, read, kind="gauge", labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self.read = read
+
+    def samples(self):
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                # A broken callback must not take the whole endpoint down
+                print(f"⚠️ Metric {metric.name} could not be read: {e}")
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, help_text, labelnames, buckets))
+
+
+def gauge(name, help_text, labelnames=()):
+    return registry.register(Gauge(name, help_text, labelnames))
+
+
+def callback(name, help_text, read, kind="gauge", labelnames=()):
+    return registry.register(CallbackMetric(name, help_text, read, kind, labelnames))
+
+
+# -------------------------------
+# Pipeline metrics
+# -------------------------------
+GEMINI_LATENCY = histogram(
+    "gemini_request_duration_seconds",
+    "Time for one Gemini analysis request, retries and fallback model included.",
+    ("outcome",), SLOW_BUCKETS,
+)
+CODE_SAVE_LATENCY = histogram("code_save_duration_seconds", "Time to write a submitted program to disk.")
+HTML_RENDER_LATENCY = histogram(
+    "report_render_duration_seconds", "Time to render, write and compress an HTML report.",
+)
+DB_COMMIT_LATENCY = histogram(
+    "db_commit_duration_seconds", "Time for a database commit, flush included.", ("outcome",),
+)
+SANDBOX_LATENCY = histogram(
+    "sandbox_job_duration_seconds",
+    "Time for a sandboxed job (exec: one run, sweep: benchmark, profile: hot spots), waiting for a worker included.",
+    ("handler",), SLOW_BUCKETS,
+)
+SSE_CONNECTIONS = gauge("sse_connections_open", "Progress streams currently open.", ("server",))
+
+
+def _scheduler_stat(field):
+    def read():
+        from job_queue import scheduler_stats
+
+        return scheduler_stats()[field]
+    return read
+
+
+def _cache_stat(field):
+    def read():
+        from analysis_cache import get_cache
+
+        return get_cache().stats()[field]
+    return read
+
+
+callback("analysis_jobs_queued", "Analysis jobs waiting for a worker thread.", _scheduler_stat("queued"))
+callback("analysis_jobs_running", "Analysis jobs being processed.", _scheduler_stat("running"))
+callback("analysis_cache_hits_total", "Gemini analysis cache hits (memory and disk).", _cache_stat("hits"), "counter")
+callback("analysis_cache_misses_total", "Gemini analysis cache misses.", _cache_stat("misses"), "counter")
+callback("analysis_cache_unit_hits_total", "Per-function analyses reused by incremental analysis.",
+         _cache_stat("unit_hits"), "counter")
+callback("analysis_cache_unit_misses_total", "Per-function analyses incremental analysis had to request.",
+         _cache_stat("unit_misses"), "counter")
+callback("analysis_cache_hit_ratio", "Share of analysis cache lookups that hit, since the process started.",
+         _cache_stat("hit_rate"))
+
+
+def instrument_db_commits():
+    # Every SQLAlchemy session in the process; before_commit runs ahead of the
+    # final flush, so the flush is part of the measured time
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if event.contains(Session, "before_commit", _commit_started):
+        return
+    event.listen(Session, "before_commit", _commit_started)
+    event.listen(Session, "after_commit", _commit_finished("ok"))
+    event.listen(Session, "after_soft_rollback", _commit_finished("error"))
+
+
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+def _commit_finished(outcome):
+    def finished(session, *args):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            DB_COMMIT_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+    return finished
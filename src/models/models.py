@@ -44,6 +44,11 @@ class User(UserMixin, db.Model):  # Keep UserMixin before db.Model for clarity
 
 class Report(db.Model):
     __tablename__ = "reports"
+    # Both indexes end in (created_at, id) so keyset pages, filtered or not, are index range scans
+    __table_args__ = (
+        db.Index("ix_reports_created_at", "created_at", "id"),
+        db.Index("ix_reports_user_id", "user_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String, nullable=False, unique=True)
@@ -51,6 +56,63 @@ class Report(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
     created_by_admin = db.Column(db.Boolean, default=False)  # NEW FIELD
+    # Searchable copies of what the report shows (see report_search.py)
+    code = db.Column(db.Text, nullable=True)
+    analysis = db.Column(db.Text, nullable=True)
+    data_structures = db.Column(db.Text, nullable=True)
+    complexities = db.Column(db.Text, nullable=True)
 
     def __repr__(self):
         return f"<Report {self.filename}>"
+
+class JobState(db.Model):
+    __tablename__ = "job_states"
+
+    id = db.Column(db.String(64), primary_key=True)
+    progress = db.Column(db.Integer, default=0, nullable=False)
+    position = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    report = db.Column(db.String, nullable=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<JobState {self.id} {self.progress}%>"
+
+class JobChunk(db.Model):
+    __tablename__ = "job_chunks"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(64), db.ForeignKey("job_states.id", ondelete="CASCADE"), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+
+class BenchmarkRun(db.Model):
+    # One row per input size of a sweep; rows of the same sweep share sweep_id
+    __tablename__ = "benchmark_runs"
+    __table_args__ = (
+        db.Index("ix_benchmark_runs_history", "code_hash", "machine", "python_version", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    code_hash = db.Column(db.String(64), nullable=False)
+    sweep_id = db.Column(db.String(32), nullable=False, index=True)
+    n = db.Column(db.Integer, nullable=False)
+    median = db.Column(db.Float, nullable=False)
+    min = db.Column(db.Float, nullable=True)
+    max = db.Column(db.Float, nullable=True)
+    q1 = db.Column(db.Float, nullable=True)
+    q3 = db.Column(db.Float, nullable=True)
+    iqr = db.Column(db.Float, nullable=True)
+    samples = db.Column(db.Text, nullable=True)  # JSON list of per-loop times (seconds)
+    number = db.Column(db.Integer, nullable=True)
+    repeats = db.Column(db.Integer, nullable=True)
+    tracemalloc_peak = db.Column(db.BigInteger, nullable=True)
+    allocations = db.Column(db.Integer, nullable=True)
+    rss_peak_delta = db.Column(db.BigInteger, nullable=True)
+    python_version = db.Column(db.String(64), nullable=False)
+    machine = db.Column(db.String(32), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<BenchmarkRun {self.code_hash[:8]} n={self.n}>"
@@ -0,0 +1,270 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+from sandbox import get_pool, run_user_code, SandboxTimeout
+
+USER_FILENAME = "<user_code>"
+TOP_N = int(os.environ.get("PROFILE_TOP_N", "15"))
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.001"))
+PROFILE_TIMEOUT = float(os.environ.get("PROFILE_TIMEOUT", "30"))
+# Flame graph boxes under this share of all samples are folded into their parent
+MIN_FLAME_SHARE = 0.005
+# Lines below this share of the traced time are left out of the Gemini prompt
+MIN_PROMPT_SHARE = 0.05
+PROFILER_NOISE = ("<built-in method builtins.exec>", "<method 'disable' of '_lsprof.Profiler' objects>")
+
+
+# -------------------------------
+# Collection (runs inside a sandbox worker)
+# -------------------------------
+class HotPathProfiler:
+    # cProfile gives exact call counts and self/cumulative time per function; a
+    # sampling thread records the call stacks the time is spent in (flame graph)
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._target = None
+        self._profile = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                if frame.f_code.co_filename == USER_FILENAME:
+                    stack.append(frame.f_code.co_name)
+                frame = frame.f_back
+            if stack:
+                self.samples += 1
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def __enter__(self):
+        import cProfile
+
+        self._target = threading.get_ident()
+        self._switch_interval = sys.getswitchinterval()
+        # The sampler only runs when the GIL is handed over, so hand it over often
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._thread = threading.Thread(target=self._sample, name="stack-sampler", daemon=True)
+        self._thread.start()
+        self._profile = cProfile.Profile()
+        self._started = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self._profile.disable()
+        self.elapsed = time.perf_counter() - self._started
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+        return False
+
+    def functions(self, top):
+        import pstats
+
+        stats = pstats.Stats(self._profile).stats
+        rows = []
+        for (filename, lineno, name), (_, ncalls, tottime, cumtime, _) in stats.items():
+            if name in PROFILER_NOISE or filename == __file__:
+                continue
+            if filename == USER_FILENAME:
+                label = f"{name} (line {lineno})"
+            elif filename == "~":
+                label = name.strip("<>")
+            else:
+                label = f"{name} ({os.path.basename(filename)}:{lineno})"
+            rows.append({
+                "function": label,
+                "user": filename == USER_FILENAME,
+                "name": name,
+                "first_line": lineno,
+                "calls": ncalls,
+                "self": tottime,
+                "cumulative": cumtime,
+            })
+        rows.sort(key=lambda row: (row["cumulative"], row["self"]), reverse=True)
+        return rows[:top]
+
+    def flame_graph(self):
+        root = {"name": "all", "value": self.samples, "children": {}}
+        for stack, count in self.stacks.items():
+            node = root
+            for name in stack:
+                node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+                node["value"] += count
+
+        minimum = self.samples * MIN_FLAME_SHARE
+
+        def finish(node):
+            children = [finish(child) for child in node["children"].values() if child["value"] >= minimum]
+            children.sort(key=lambda child: child["value"], reverse=True)
+            return {"name": node["name"], "value": node["value"],
+                    "share": node["value"] / self.samples if self.samples else 0, "children": children}
+
+        return finish(root) if self.samples else None
+
+
+class LineTimer:
+    # Self time per line of the hottest user functions, measured on a second run.
+    # A sampler cannot do this in-process: another thread only gets to look at
+    # the stack between bytecodes that release the GIL, so a slow `x in list`
+    # shows up on the loop's back edge instead of its own line.
+    def __init__(self, functions):
+        # (name, first line) pairs, as reported by cProfile
+        self.functions = set(functions)
+        self.times = Counter()
+        self.hits = Counter()
+        self._stack = []
+        self._last = 0.0
+
+    def _charge(self, now):
+        if self._stack:
+            self.times[self._stack[-1][1]] += now - self._last
+        self._last = now
+
+    def _trace_lines(self, frame, event, arg):
+        now = time.perf_counter()
+        self._charge(now)
+        if event == "line":
+            self._stack[-1][1] = frame.f_lineno
+            self.hits[frame.f_lineno] += 1
+        elif event == "return":
+            self._stack.pop()
+        self._last = time.perf_counter()
+        return self._trace_lines
+
+    def _trace_calls(self, frame, event, arg):
+        code = frame.f_code
+        if code.co_filename != USER_FILENAME or (code.co_name, code.co_firstlineno) not in self.functions:
+            return None
+        self._charge(time.perf_counter())
+        self._stack.append([frame, frame.f_lineno])
+        self._last = time.perf_counter()
+        return self._trace_lines
+
+    def __enter__(self):
+        self._last = time.perf_counter()
+        sys.settrace(self._trace_calls)
+        return self
+
+    def __exit__(self, *exc):
+        sys.settrace(None)
+        return False
+
+    def hot_lines(self, code, top):
+        total = sum(self.times.values())
+        source = code.splitlines()
+        rows = []
+        for lineno, spent in self.times.most_common(top):
+            rows.append({
+                "line": lineno,
+                "source": source[lineno - 1].strip() if 0 < lineno <= len(source) else "",
+                "hits": self.hits[lineno],
+                "time": spent,
+                "share": spent / total if total else 0,
+            })
+        return rows
+
+
+def handle_profile(payload):
+    from workloads import workload_globals
+
+    def fresh_globals():
+        user_globals = dict(payload.get("globals") or {})
+        if payload.get("workload"):
+            user_globals.update(workload_globals(payload["workload"], user_globals.get("n", 0)))
+        return user_globals
+
+    code = payload["code"]
+    top = payload.get("top", TOP_N)
+    profiler = HotPathProfiler(payload.get("interval", SAMPLE_INTERVAL))
+    result = run_user_code(code, fresh_globals(), payload.get("max_output"), profiler=profiler)
+    if not profiler.elapsed:
+        return result
+
+    functions = profiler.functions(top)
+    profile = {
+        "elapsed": profiler.elapsed,
+        "samples": profiler.samples,
+        "functions": functions,
+        # Every user function that ran, not just the top ones (for the cache key)
+        "user_functions": sorted({(row["name"], row["first_line"]) for row in profiler.functions(None) if row["user"]}),
+        "lines": [],
+        "flame": profiler.flame_graph(),
+    }
+    if not result.get("error"):
+        # Only the functions cProfile found hot are line-traced, which keeps the
+        # tracing overhead away from everything else
+        timer = LineTimer((row["name"], row["first_line"]) for row in functions if row["user"])
+        # Same code, fresh inputs; its output was already captured by the first run
+        second = run_user_code(code, fresh_globals(), 1, profiler=timer)
+        if not second.get("error"):
+            profile["lines"] = timer.hot_lines(code, top)
+    result["profile"] = profile
+    return result
+
+
+# -------------------------------
+# Dispatch (web side)
+# -------------------------------
+def profile_code(code, n=0, workload=None, top=TOP_N, timeout=PROFILE_TIMEOUT):
+    path = None
+    if workload:
+        from workloads import materialize
+
+        path = materialize(workload, n)
+    payload = {"code": code, "globals": {"n": n}, "workload": path, "top": top}
+    try:
+        return get_pool().submit("profile", payload, timeout=timeout, cpu_timeout=timeout)
+    except SandboxTimeout as e:
+        return {"output": "", "error": f"TimeoutError: {e}", "time": timeout}
+
+
+def profile_summary(profile, limit=8):
+    # Plain-text hot spots for the Gemini prompt
+    if not profile:
+        return ""
+    lines = [f"Measured with cProfile and a line timer ({profile['elapsed']:.3f}s total run time)."]
+    hot_lines = [row for row in profile["lines"][:limit] if row["share"] >= MIN_PROMPT_SHARE]
+    if hot_lines:
+        lines.append("Hottest lines (share of time in the hottest functions):")
+        for row in hot_lines:
+            lines.append(f"  line {row['line']}: {row['share']:.0%}  {row['source']}")
+    functions = profile["functions"][:limit]
+    if functions:
+        lines.append("Hottest functions (calls, self time, cumulative time):")
+        for row in functions:
+            lines.append(f"  {row['function']}: {row['calls']} calls, {row['self']:.4f}s self, "
+                         f"{row['cumulative']:.4f}s cumulative")
+    return "\n".join(lines)
+
+
+def _relative_line(line, spans):
+    # Line number within the (start, end) ranges of one unit, or None outside them
+    offset = 0
+    for start, end in spans:
+        if start <= line <= end:
+            return offset + line - start
+        offset += end - start + 1
+    return None
+
+
+def profile_fingerprint(profile, spans=None):
+    # Identifies a profiled analysis without anything ranked by time: which
+    # lines make the top rows or the 5% cut varies between identical runs, so
+    # only the sorted names of the user functions that ran are used, and
+    # re-profiling the same code hits the analysis cache. With spans, only the
+    # functions defined inside them count, so editing other code does not change it
+    if not profile:
+        return ""
+    ran = profile.get("user_functions") or [(row["name"], row["first_line"]) for row in profile["functions"]
+                                            if row["user"]]
+    names = {name for name, first_line in ran if spans is None or _relative_line(first_line, spans) is not None}
+    return "profiled|" + "|".join(sorted(names))
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import asyncio
+import threading
+
+from metrics import SSE_CONNECTIONS
+
+HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT", "15"))
+
+
+# -------------------------------
+# Event rendering (shared by the Flask and asyncio endpoints)
+# -------------------------------
+class StreamCursor:
+    def __init__(self):
+        self.chunks = 0
+        self.position = None
+        self.progress = None
+
+
+def render_updates(store, ts, cursor):
+    events = []
+    position = store.get_position(ts)
+    if position != cursor.position and position is not None:
+        events.append(f"event: queue\ndata: {position}\n\n")
+        cursor.position = position
+
+    for chunk in store.get_chunks(ts, cursor.chunks):
+        events.append(f"event: chunk\ndata: {json.dumps(chunk)}\n\n")
+        cursor.chunks += 1
+
+    progress = store.get_progress(ts)
+    if progress == -1:
+        events.append("data: error\n\n")
+        return events, True
+    if progress != cursor.progress:
+        events.append(f"data: {progress}\n\n")
+        cursor.progress = progress
+    return events, progress >= 100
+
+
+def sync_stream(store, ts, heartbeat=HEARTBEAT_INTERVAL):
+    # Counted from the first event until the client goes away (the generator is closed)
+    with SSE_CONNECTIONS.track(server="flask"):
+        cursor = StreamCursor()
+        version = store.get_version(ts)
+        while True:
+            events, finished = render_updates(store, ts, cursor)
+            yield from events
+            if finished:
+                return
+            new_version = store.wait(ts, version, heartbeat)
+            if new_version == version:
+                # Comment lines keep proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+            version = new_version
+
+
+# -------------------------------
+# Optional asyncio SSE server: idle watchers cost a coroutine, not a thread
+# -------------------------------
+REQUEST_LINE = re.compile(r"^GET /progress/([\w.-]+) HTTP/1\.[01]$")
+SSE_ASYNC_HOST = os.environ.get("SSE_ASYNC_HOST", "127.0.0.1")
+# Pages allowed to read the streams cross-origin (the app's own origin when it
+# is served from another port); empty = no CORS header
+SSE_ALLOWED_ORIGINS = [o.strip().rstrip("/") for o in os.environ.get("SSE_ALLOWED_ORIGINS", "").split(",") if o.strip()]
+
+
+class AsyncProgressServer:
+    def __init__(self, app, store, host=SSE_ASYNC_HOST, port=5001, heartbeat=HEARTBEAT_INTERVAL,
+                 allowed_origins=SSE_ALLOWED_ORIGINS):
+        self.app = app
+        self.store = store
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat
+        self.allowed_origins = allowed_origins
+        self.loop = None
+
+    def _read(self, ts, cursor):
+        with self.app.app_context():
+            return render_updates(self.store, ts, cursor)
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            origin = None
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "origin":
+                    origin = value.strip()
+            match = REQUEST_LINE.match(request_line)
+            if not match:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+            await self._stream(match.group(1), writer, origin)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, ts, writer, origin=None):
+        cors = ""
+        if origin and origin.rstrip("/") in self.allowed_origins:
+            cors = f"Access-Control-Allow-Origin: {origin}\r\nVary: Origin\r\n"
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            + cors.encode("latin-1") +
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        changed = asyncio.Event()
+
+        def on_change():
+            self.loop.call_soon_threadsafe(changed.set)
+
+        self.store.subscribe(ts, on_change)
+        SSE_CONNECTIONS.inc(server="async")
+        try:
+            cursor = StreamCursor()
+            # Stores shared between processes only notice foreign writes by polling
+            wait = min(self.heartbeat, self.store.poll_interval or self.heartbeat)
+            idle = 0.0
+            while True:
+                changed.clear()
+                events, finished = await self.loop.run_in_executor(None, self._read, ts, cursor)
+                if events:
+                    writer.write("".join(events).encode("utf-8"))
+                    await writer.drain()
+                    idle = 0.0
+                if finished:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    idle += wait
+                    if idle >= self.heartbeat:
+                        writer.write(b": keep-alive\n\n")
+                        await writer.drain()
+                        idle = 0.0
+        finally:
+            SSE_CONNECTIONS.dec(server="async")
+            self.store.unsubscribe(ts, on_change)
+
+    async def _serve(self, started):
+        self.loop = asyncio.get_running_loop()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            print(f"⚠️ Async SSE server not started on {self.host}:{self.port}: {e}")
+            started.set()
+            return
+        print(f"✅ Async SSE server listening on {self.host}:{self.port}")
+        started.set()
+        async with server:
+            await server.serve_forever()
+
+    def start_in_thread(self):
+        started = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(self._serve(started)), name="async-sse", daemon=True)
+        thread.start()
+        started.wait(5)
+        return thread
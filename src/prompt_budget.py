@@ -0,0 +1,339 @@
+import os
+import re
+import ast
+import csv
+import json
+import hashlib
+import statistics
+from collections import Counter
+
+from analysis_cache import cache_enabled
+from gemini_client import estimate_tokens, CHARS_PER_TOKEN
+
+# Input budgets (estimated tokens). Every request stays under
+# DATASET + CONTEXT + CHUNK + the fixed instructions, and a submission never
+# costs more than MAX_CHUNKS requests, whatever its size.
+DATASET_MAX_TOKENS = int(os.environ.get("PROMPT_DATASET_MAX_TOKENS", "2000"))
+CHUNK_MAX_TOKENS = int(os.environ.get("PROMPT_CHUNK_MAX_TOKENS", "6000"))
+CONTEXT_MAX_TOKENS = int(os.environ.get("PROMPT_CONTEXT_MAX_TOKENS", "1000"))
+MAX_CHUNKS = int(os.environ.get("PROMPT_MAX_CHUNKS", "8"))
+# Programs with several functions/classes are analyzed unit by unit, and units
+# whose code did not change since an earlier submission reuse their analysis
+INCREMENTAL = os.environ.get("ANALYSIS_INCREMENTAL", "1").lower() not in ("0", "false", "no", "off")
+
+SAMPLE_ITEMS = 5
+SAMPLE_CHARS = 200
+MAX_KEYS = 20
+TABLE_SNIFF_CHARS = 8192
+
+
+def _clip(text, limit=SAMPLE_CHARS):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _fit(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit] + "\n… [truncated to fit the prompt budget]"
+
+
+# -------------------------------
+# Dataset summaries
+# -------------------------------
+def _type_name(value):
+    return "null" if value is None else type(value).__name__
+
+
+def _number_stats(values):
+    numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if len(numbers) < 2:
+        return None
+    return (f"min {min(numbers):g}, max {max(numbers):g}, mean {statistics.fmean(numbers):g}, "
+            f"median {statistics.median(numbers):g}, distinct {len(set(numbers)):,}")
+
+
+def _type_mix(values):
+    counts = Counter(_type_name(v) for v in values)
+    total = len(values)
+    return ", ".join(f"{name} {count / total:.0%}" for name, count in counts.most_common())
+
+
+def _samples(values):
+    if len(values) <= SAMPLE_ITEMS * 2:
+        return [json.dumps(v, default=str) for v in values]
+    head = [json.dumps(v, default=str) for v in values[:SAMPLE_ITEMS]]
+    tail = [json.dumps(v, default=str) for v in values[-2:]]
+    return head + ["…"] + tail
+
+
+def _describe_json(value, depth=0):
+    indent = "  " * depth
+    lines = []
+    if isinstance(value, list):
+        lines.append(f"{indent}list of {len(value):,} items ({_type_mix(value) if value else 'empty'})")
+        stats = _number_stats(value)
+        if stats:
+            lines.append(f"{indent}  numbers: {stats}")
+        records = [v for v in value if isinstance(v, dict)]
+        if records and depth < 2:
+            keys = Counter(key for record in records for key in record)
+            lines.append(f"{indent}  record fields:")
+            for key, count in keys.most_common(MAX_KEYS):
+                column = [record[key] for record in records if key in record]
+                detail = _number_stats(column)
+                lines.append(f"{indent}    {key}: {_type_mix(column)}, present in {count / len(records):.0%}"
+                             + (f"; {detail}" if detail else ""))
+        nested = [v for v in value if isinstance(v, list)]
+        if nested and depth < 2:
+            lengths = [len(v) for v in nested]
+            lines.append(f"{indent}  nested lists: length {min(lengths)}–{max(lengths)}")
+        lines.append(f"{indent}  sample: " + ", ".join(_clip(s) for s in _samples(value)))
+    elif isinstance(value, dict):
+        lines.append(f"{indent}object with {len(value):,} keys")
+        for key, item in list(value.items())[:MAX_KEYS]:
+            if isinstance(item, (list, dict)) and depth < 2:
+                lines.append(f"{indent}  {key}:")
+                lines.extend(_describe_json(item, depth + 2))
+            else:
+                lines.append(f"{indent}  {key}: {_type_name(item)} = {_clip(json.dumps(item, default=str), 80)}")
+        if len(value) > MAX_KEYS:
+            lines.append(f"{indent}  … {len(value) - MAX_KEYS:,} more keys")
+    else:
+        lines.append(f"{indent}{_type_name(value)}: {_clip(value)}")
+    return lines
+
+
+def _cell(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _describe_table(text):
+    sample = text[:TABLE_SNIFF_CHARS]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        has_header = csv.Sniffer().has_header(sample)
+    except csv.Error:
+        return None
+    rows = [row for row in csv.reader(text.splitlines(), dialect) if row]
+    if len(rows) < 2:
+        return None
+    widths = Counter(len(row) for row in rows)
+    columns, count = widths.most_common(1)[0]
+    if columns < 2 or count < 0.9 * len(rows):
+        return None
+
+    header = rows[0] if has_header else [f"column {i + 1}" for i in range(columns)]
+    body = rows[1:] if has_header else rows
+    lines = [f"table: {len(body):,} rows × {columns} columns (delimiter {dialect.delimiter!r})"]
+    for index, name in enumerate(header[:MAX_KEYS]):
+        column = [_cell(row[index]) for row in body if len(row) > index]
+        detail = _number_stats(column) or f"distinct {len(set(map(str, column))):,}"
+        lines.append(f"  {name}: {_type_mix(column)}; {detail}")
+    lines.append("  first rows:")
+    lines.extend("    " + _clip(dialect.delimiter.join(row)) for row in ([header] if has_header else []) + body[:SAMPLE_ITEMS])
+    lines.append("  last rows:")
+    lines.extend("    " + _clip(dialect.delimiter.join(row)) for row in body[-2:])
+    return lines
+
+
+def _describe_text(text):
+    tokens = [token for token in re.split(r"[\s,;]+", text) if token]
+    values = [_cell(token) for token in tokens]
+    if values and sum(isinstance(v, (int, float)) for v in values) >= 0.9 * len(values):
+        return [f"{len(values):,} values ({_type_mix(values)})",
+                f"  numbers: {_number_stats(values) or 'n/a'}",
+                "  sample: " + ", ".join(_clip(s) for s in _samples(values))]
+    lines = text.splitlines()
+    return ([f"text: {len(lines):,} lines", "  first lines:"]
+            + ["    " + _clip(line) for line in lines[:SAMPLE_ITEMS * 2]]
+            + ["  last lines:"]
+            + ["    " + _clip(line) for line in lines[-3:]])
+
+
+def summarize_dataset(dataset, max_tokens=DATASET_MAX_TOKENS):
+    # Returns (text for the prompt, whether it was summarized)
+    dataset = dataset or ""
+    if estimate_tokens(dataset) <= max_tokens:
+        return dataset, False
+
+    stripped = dataset.strip()
+    lines = [f"[Summary of a large dataset: {len(dataset):,} characters, {dataset.count(chr(10)) + 1:,} lines, "
+             f"about {estimate_tokens(dataset):,} tokens. The full data is not included.]"]
+    description = None
+    if stripped[:1] in "[{":
+        try:
+            description = _describe_json(json.loads(stripped))
+        except ValueError:
+            pass
+    if description is None:
+        description = _describe_table(stripped) or _describe_text(stripped)
+    lines.extend(description)
+    return _fit("\n".join(lines), max_tokens), True
+
+
+# -------------------------------
+# Code chunks
+# -------------------------------
+# Each unit's section in answers covering several functions/classes
+UNIT_HEADING = "### Unit: "
+UNIT_SECTION = re.compile(r"^### Unit: (.+?)\s*$", re.M)
+DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+CONTEXT_STATEMENTS = (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign)
+
+
+def _signature(node):
+    if isinstance(node, ast.ClassDef):
+        methods = [item.name for item in node.body if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        return f"class {node.name}" + (f" (methods: {', '.join(methods)})" if methods else "")
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{prefix} {node.name}({ast.unparse(node.args)})"
+
+
+def _fingerprint(nodes):
+    # Normalized AST: formatting, comments and line numbers do not change it
+    digest = hashlib.sha256()
+    for node in nodes:
+        digest.update(ast.dump(node).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _span(node):
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+    return start, node.end_lineno
+
+
+def _used_names(nodes):
+    return {node.id for root in nodes for node in ast.walk(root) if isinstance(node, ast.Name)}
+
+
+def _add_dependencies(units, unit_nodes, context_nodes):
+    # A unit's analysis also depends on the shared context and on the units it
+    # calls (directly or through other units); their fingerprints go in its key
+    defined = {unit["names"][0]: unit for unit, nodes in zip(units, unit_nodes) if unit["signature"]}
+    uses = {unit["names"][0]: (_used_names(nodes) & defined.keys()) - {unit["names"][0]}
+            for unit, nodes in zip(units, unit_nodes)}
+    shared = _fingerprint(context_nodes)
+    for unit in units:
+        callees, pending = set(), list(uses[unit["names"][0]])
+        while pending:
+            name = pending.pop()
+            if name not in callees:
+                callees.add(name)
+                pending.extend(uses[name])
+        callees.discard(unit["names"][0])
+        unit["callees"] = sorted(callees)
+        digest = hashlib.sha256(shared.encode("utf-8"))
+        for name in unit["callees"]:
+            digest.update(defined[name]["fingerprint"].encode("utf-8"))
+        unit["dependencies"] = digest.hexdigest()
+
+
+def _units(code, tree):
+    # Top-level definitions become units with the comments above them; other
+    # statements are either shared context (imports, constants) or module-level code
+    lines = code.splitlines(keepends=True)
+    units, unit_nodes, context, context_nodes, module_code, module_nodes = [], [], [], [], [], []
+    previous_end = 0
+    for node in tree.body:
+        source = "".join(lines[previous_end:node.end_lineno])
+        previous_end = node.end_lineno
+        if isinstance(node, DEFINITIONS):
+            units.append({"names": [node.name], "code": source, "signature": _signature(node),
+                          "fingerprint": _fingerprint([node]), "spans": [_span(node)]})
+            unit_nodes.append([node])
+        elif isinstance(node, CONTEXT_STATEMENTS):
+            context.append(source)
+            context_nodes.append(node)
+        else:
+            module_code.append(source)
+            module_nodes.append(node)
+    if module_code:
+        units.append({"names": ["module-level code"], "code": "".join(module_code), "signature": None,
+                      "fingerprint": _fingerprint(module_nodes), "spans": [_span(node) for node in module_nodes]})
+        unit_nodes.append(module_nodes)
+    _add_dependencies(units, unit_nodes, context_nodes)
+    return units, "".join(context)
+
+
+def _with_outline(context, units):
+    outline = [unit["signature"] for unit in units if unit["signature"]]
+    if outline:
+        context += "\n# Definitions in the whole program:\n" + "\n".join(f"#   {line}" for line in outline) + "\n"
+    return _fit(context, CONTEXT_MAX_TOKENS)
+
+
+def group_units(units, max_tokens=CHUNK_MAX_TOKENS):
+    # Consecutive units share a chunk while it fits in max_tokens
+    chunks = []
+    for unit in units:
+        unit_code = _fit(unit["code"], max_tokens)
+        last = chunks[-1] if chunks else None
+        if last and estimate_tokens(last["code"] + unit_code) <= max_tokens:
+            last["names"] += unit["names"]
+            last["code"] += unit_code
+            last["units"].append(unit)
+        else:
+            chunks.append({"names": list(unit["names"]), "code": unit_code, "units": [unit]})
+    return chunks
+
+
+def _line_units(code, max_tokens):
+    # Unparseable code: fall back to fixed-size line ranges
+    lines = code.splitlines(keepends=True)
+    units, current, start = [], [], 1
+    for number, line in enumerate(lines, start=1):
+        current.append(line)
+        if estimate_tokens("".join(current)) >= max_tokens:
+            units.append({"names": [f"lines {start}–{number}"], "code": "".join(current), "signature": None})
+            current, start = [], number + 1
+    if current:
+        units.append({"names": [f"lines {start}–{len(lines)}"], "code": "".join(current), "signature": None})
+    return units
+
+
+def needs_split(code, max_tokens=CHUNK_MAX_TOKENS):
+    return estimate_tokens(code or "") > max_tokens
+
+
+def split_code(code, max_tokens=CHUNK_MAX_TOKENS, max_chunks=MAX_CHUNKS):
+    # Returns (chunks, shared context, names left out); each chunk is
+    # {"names": [...], "code": "..."} and fits in max_tokens
+    if not needs_split(code, max_tokens):
+        return [{"names": [], "code": code}], "", []
+
+    try:
+        units, context = _units(code, ast.parse(code))
+    except SyntaxError:
+        units, context = _line_units(code, max_tokens), ""
+
+    chunks = group_units(units, max_tokens)
+    skipped = [name for chunk in chunks[max_chunks:] for name in chunk["names"]]
+    return chunks[:max_chunks], _with_outline(context, units), skipped
+
+
+def code_units(code):
+    # (units, shared context) when the code is analyzed unit by unit, else None
+    if not INCREMENTAL or not cache_enabled():
+        return None
+    try:
+        units, context = _units(code, ast.parse(code))
+    except SyntaxError:
+        return None
+    if len(units) < 2:
+        return None
+    return units, _with_outline(context, units)
+
+
+class PromptPlan:
+    def __init__(self, code, dataset):
+        self.dataset, self.dataset_summarized = summarize_dataset(dataset)
+        self.chunks, self.context, self.skipped = split_code(code)
+
+    @property
+    def chunked(self):
+        return len(self.chunks) > 1 or bool(self.skipped)
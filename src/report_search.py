@@ -0,0 +1,173 @@
+import re
+import ast
+
+from sqlalchemy import text
+
+from complexity_fit import claimed_complexities
+
+SEARCH_COLUMNS = ("filename", "dataset", "code", "analysis", "data_structures", "complexities")
+# bm25 weights in SEARCH_COLUMNS order: matches on detected structures and Big-O count most
+SQLITE_WEIGHTS = (2.0, 1.0, 3.0, 1.0, 5.0, 5.0)
+SNIPPET_WORDS = 12
+
+# -------------------------------
+# Fields stored with each report
+# -------------------------------
+CONSTRUCTORS = {
+    "list": "list", "dict": "dict", "set": "set", "frozenset": "frozenset", "tuple": "tuple",
+    "bytearray": "bytearray", "deque": "deque", "defaultdict": "defaultdict", "OrderedDict": "OrderedDict",
+    "Counter": "Counter", "namedtuple": "namedtuple", "ChainMap": "ChainMap", "array": "array",
+    "Queue": "queue", "LifoQueue": "stack", "PriorityQueue": "priority queue", "SimpleQueue": "queue",
+}
+MODULES = {"heapq": "heap", "bisect": "sorted list"}
+NODE_LINKS = {"next": "linked list", "prev": "linked list", "left": "binary tree", "right": "binary tree",
+              "children": "tree"}
+LITERALS = {ast.List: "list", ast.ListComp: "list", ast.Dict: "dict", ast.DictComp: "dict",
+            ast.Set: "set", ast.SetComp: "set"}
+
+
+def detect_data_structures(code):
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return sorted({name for word, name in {**CONSTRUCTORS, **MODULES}.items() if re.search(rf"\b{word}\b", code)})
+
+    found = set()
+    for node in ast.walk(tree):
+        if type(node) in LITERALS:
+            found.add(LITERALS[type(node)])
+        elif isinstance(node, ast.Tuple) and isinstance(node.ctx, ast.Load):
+            found.add("tuple")
+        elif isinstance(node, ast.Call):
+            name = getattr(node.func, "id", None) or getattr(node.func, "attr", None)
+            if name in CONSTRUCTORS:
+                found.add(CONSTRUCTORS[name])
+        elif isinstance(node, ast.Import):
+            found.update(MODULES[alias.name] for alias in node.names if alias.name in MODULES)
+        elif isinstance(node, ast.ImportFrom) and node.module in MODULES:
+            found.add(MODULES[node.module])
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store) and node.attr in NODE_LINKS:
+            # self.next = ..., node.left = ... on user-defined node classes
+            if isinstance(node.value, ast.Name) and node.value.id == "self":
+                found.add(NODE_LINKS[node.attr])
+    return sorted(found)
+
+
+def search_fields(code, analysis, benchmark=None, static=None):
+    complexities = claimed_complexities(analysis)
+    for key in ("fit", "memory_fit"):
+        fit = (benchmark or {}).get(key)
+        if fit and fit["best"] not in complexities:
+            complexities.append(fit["best"])
+    if static and static.get("time") and static["time"] not in complexities:
+        complexities.append(static["time"])
+    return {
+        "code": code,
+        "analysis": analysis,
+        "data_structures": ", ".join(detect_data_structures(code)),
+        "complexities": ", ".join(complexities),
+    }
+
+
+# -------------------------------
+# Index setup (SQLite FTS5 / Postgres tsvector)
+# -------------------------------
+def _sqlite_setup(connection):
+    exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'reports_fts'")).first()
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+
+    # External-content table: the text lives only in `reports`, FTS keeps the index
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5({columns}, "
+        "content='reports', content_rowid='id')"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS reports_fts_insert AFTER INSERT ON reports BEGIN "
+        f"INSERT INTO reports_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS reports_fts_delete AFTER DELETE ON reports BEGIN "
+        f"INSERT INTO reports_fts(reports_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    connection.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS reports_fts_update AFTER UPDATE ON reports BEGIN "
+        f"INSERT INTO reports_fts(reports_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO reports_fts(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    if not exists:
+        connection.execute(text("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')"))
+
+
+def _postgres_setup(connection):
+    weighted = " || ".join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+        for column, weight in (("data_structures", "A"), ("complexities", "A"), ("filename", "B"),
+                               ("code", "B"), ("analysis", "C"), ("dataset", "D"))
+    )
+    connection.execute(text(
+        f"ALTER TABLE reports ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({weighted}) STORED"
+    ))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_reports_search ON reports USING GIN (search_vector)"))
+
+
+def setup_search(engine):
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            _sqlite_setup(connection)
+        elif engine.dialect.name == "postgresql":
+            _postgres_setup(connection)
+
+
+# -------------------------------
+# Queries
+# -------------------------------
+def fts5_query(query):
+    # Every term becomes a quoted phrase (so punctuation like "O(n)" cannot break
+    # the MATCH syntax); a trailing * keeps prefix matching
+    terms = []
+    for term in query.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', "")
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_reports(session, query, limit=20, offset=0):
+    dialect = session.get_bind().dialect.name
+    params = {"limit": limit + 1, "offset": offset}
+
+    if dialect == "sqlite":
+        params["query"] = fts5_query(query)
+        if not params["query"]:
+            return [], False
+        weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+        # Rank first and build snippets only for the page: SQLite would otherwise
+        # compute a snippet for every match before sorting
+        sql = text(
+            "WITH page AS ("
+            f"SELECT rowid AS id, bm25(reports_fts, {weights}) AS score FROM reports_fts "
+            "WHERE reports_fts MATCH :query ORDER BY score, rowid DESC LIMIT :limit OFFSET :offset) "
+            "SELECT r.id, r.filename, r.created_at, r.data_structures, r.complexities, page.score, "
+            f"snippet(reports_fts, -1, '[', ']', '…', {SNIPPET_WORDS}) AS snippet "
+            "FROM page JOIN reports r ON r.id = page.id JOIN reports_fts ON reports_fts.rowid = page.id "
+            "WHERE reports_fts MATCH :query ORDER BY page.score, page.id DESC"
+        )
+    elif dialect == "postgresql":
+        params["query"] = query
+        sql = text(
+            "SELECT r.id, r.filename, r.created_at, r.data_structures, r.complexities, "
+            "ts_rank_cd(r.search_vector, q) AS score, "
+            "ts_headline('english', coalesce(r.analysis, ''), q, "
+            f"'StartSel=[, StopSel=], MaxWords={SNIPPET_WORDS * 2}, MinWords={SNIPPET_WORDS}') AS snippet "
+            "FROM reports r, websearch_to_tsquery('english', :query) q "
+            "WHERE r.search_vector @@ q ORDER BY score DESC, r.id DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        raise RuntimeError(f"❌ Full-text search is not supported on '{dialect}' databases")
+
+    rows = session.execute(sql, params).mappings().all()
+    return [dict(row) for row in rows[:limit]], len(rows) > limit
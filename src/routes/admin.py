@@ -1,12 +1,19 @@
 import os
+import base64
+from datetime import datetime, timedelta
 from functools import wraps
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, current_app
+    url_for, flash, current_app, jsonify
 )
 from flask_login import login_required, current_user
+from sqlalchemy import tuple_
+from sqlalchemy.exc import OperationalError
 from models.models import db, Report, AdminUser
 from utils.env_utils import read_env, write_env
+from analysis_cache import get_cache
+from report_search import search_reports
+from file_saver import report_files, rename_report_files, delete_report_files
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -50,12 +57,116 @@ def admin_env():
 # -------------------------------
 # Reports List (Admin Only)
 # -------------------------------
+REPORTS_PAGE_SIZE = 50
+REPORTS_MAX_PAGE_SIZE = 500
+
+def encode_cursor(report):
+    raw = f"{report.created_at.isoformat()}|{report.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    created_at, report_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(created_at), int(report_id)
+
+def parse_date(value, end_of_day=False):
+    parsed = datetime.fromisoformat(value)
+    # A bare date as the upper bound includes that whole day
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def report_page(args):
+    # Keyset pagination: each page continues strictly after the (created_at, id)
+    # of the previous page's last row, so cost does not grow with the page number
+    limit = min(max(args.get("limit", REPORTS_PAGE_SIZE, type=int), 1), REPORTS_MAX_PAGE_SIZE)
+    query = Report.query
+
+    if args.get("user_id"):
+        query = query.filter(Report.user_id == int(args["user_id"]))
+    if args.get("admin") in ("0", "1"):
+        query = query.filter(Report.created_by_admin == (args["admin"] == "1"))
+    if args.get("since"):
+        query = query.filter(Report.created_at >= parse_date(args["since"]))
+    if args.get("until"):
+        query = query.filter(Report.created_at < parse_date(args["until"], end_of_day=True))
+    if args.get("cursor"):
+        created_at, report_id = decode_cursor(args["cursor"])
+        query = query.filter(tuple_(Report.created_at, Report.id) < tuple_(created_at, report_id))
+
+    rows = query.order_by(Report.created_at.desc(), Report.id.desc()).limit(limit + 1).all()
+    reports = rows[:limit]
+    next_cursor = encode_cursor(reports[-1]) if len(rows) > limit else None
+    return reports, next_cursor
+
+def report_filters(args):
+    return {key: args[key] for key in ("user_id", "admin", "since", "until", "limit") if args.get(key)}
+
 @admin_bp.route("/reports")
 @login_required
 @admin_required
 def list_reports():
-    reports = Report.query.order_by(Report.created_at.desc()).all()
-    return render_template("admin_reports.html", reports=reports)
+    try:
+        reports, next_cursor = report_page(request.args)
+    except ValueError:
+        flash("Invalid filter or page cursor.", "error")
+        return redirect(url_for("admin.list_reports"))
+    return render_template(
+        "admin_reports.html",
+        reports=reports,
+        next_cursor=next_cursor,
+        filters=report_filters(request.args),
+        is_first_page=not request.args.get("cursor"),
+    )
+
+@admin_bp.route("/reports.json")
+@login_required
+@admin_required
+def list_reports_json():
+    try:
+        reports, next_cursor = report_page(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid filter or page cursor."}), 400
+    return jsonify({
+        "reports": [
+            {
+                "id": report.id,
+                "filename": report.filename,
+                "dataset": report.dataset,
+                "created_at": report.created_at.isoformat() if report.created_at else None,
+                "user_id": report.user_id,
+                "created_by_admin": report.created_by_admin,
+            }
+            for report in reports
+        ],
+        "next_cursor": next_cursor,
+    })
+
+# -------------------------------
+# Full-text Report Search (Admin Only)
+# -------------------------------
+SEARCH_PAGE_SIZE = 20
+
+@admin_bp.route("/reports/search")
+@login_required
+@admin_required
+def search_reports_json():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing search query (?q=...)."}), 400
+
+    page = max(request.args.get("page", 1, type=int), 1)
+    limit = min(max(request.args.get("limit", SEARCH_PAGE_SIZE, type=int), 1), REPORTS_MAX_PAGE_SIZE)
+    try:
+        results, has_more = search_reports(db.session, query, limit=limit, offset=(page - 1) * limit)
+    except OperationalError as e:
+        return jsonify({"error": f"Invalid search query: {e.orig}"}), 400
+
+    for result in results:
+        created_at = result["created_at"]
+        result["created_at"] = created_at.isoformat() if hasattr(created_at, "isoformat") else created_at
+        result["url"] = url_for("analyze.download_report", filename=result["filename"])
+    return jsonify({"query": query, "page": page, "results": results, "next_page": page + 1 if has_more else None})
 
 # -------------------------------
 # Rename Report (Admin Only)
@@ -77,18 +188,17 @@ def rename_report(report_id):
     report = Report.query.get_or_404(report_id)
     reports_dir = os.path.abspath(os.path.join(current_app.root_path, "..", "reports"))
     old_path = os.path.join(reports_dir, report.filename)
-    new_path = os.path.join(reports_dir, new_filename)
 
     if not os.path.exists(old_path):
         flash("Original file does not exist.", "error")
         return redirect(url_for("admin.list_reports"))
 
-    if os.path.exists(new_path):
+    if any(os.path.exists(path) for path in report_files(new_filename, reports_dir)):
         flash("A file with that name already exists.", "error")
         return redirect(url_for("admin.list_reports"))
 
     try:
-        os.rename(old_path, new_path)
+        rename_report_files(report.filename, new_filename, reports_dir)
     except Exception as e:
         flash(f"Error renaming file: {e}", "error")
         return redirect(url_for("admin.list_reports"))
@@ -113,11 +223,9 @@ def delete_report(report_id):
     report = Report.query.get_or_404(report_id)
 
     reports_dir = os.path.abspath(os.path.join(current_app.root_path, "..", "reports"))
-    file_path = os.path.join(reports_dir, report.filename)
 
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        delete_report_files(report.filename, reports_dir)
 
         db.session.delete(report)
         db.session.commit()
@@ -127,3 +235,12 @@ def delete_report(report_id):
         flash(f"Error deleting report: {e}", "error")
 
     return redirect(url_for("admin.list_reports"))
+
+# -------------------------------
+# Analysis Cache Statistics (Admin Only)
+# -------------------------------
+@admin_bp.route("/cache")
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify(get_cache().stats())
@@ -1,27 +1,77 @@
-from flask import Blueprint, request, redirect, url_for, render_template, Response, current_app
+from flask import (
+    Blueprint, request, redirect, url_for, render_template,
+    Response, current_app, stream_with_context, send_file, send_from_directory, abort
+)
 from flask_login import current_user
-import threading
-import time
+from werkzeug.security import safe_join
 import os
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
 
 from models.models import db, Report, AdminUser
-from gemini_analyzer import analyze_with_gemini
-from file_saver import save_code_to_file, save_html_output
+from gemini_analyzer import analyze_with_fallback
+from static_analysis import analyze_static, static_markdown
+from file_saver import save_code_to_file, save_html_output, compressed_variant, COMPRESSED_VARIANTS
+from benchmarking import benchmark_for_report, uses_input_size, report_workload
+from profiling import profile_code
+from benchmark_history import record_sweep
+from optimization_check import verify_optimization
+from job_queue import get_scheduler, QueueFull
+from job_store import get_job_store
+from progress_stream import sync_stream
+from report_search import search_fields
+from batch import BATCH_JOB_PREFIX
 
 analyze_bp = Blueprint("analyze", __name__)
 
-progress_tracker = {}
-error_tracker = {}
+# Input size the code is profiled at when "profile hot spots" is ticked
+PROFILE_N = int(os.environ.get("PROFILE_N", "10000"))
+
+# Between the static analysis and Gemini's answer in the progress stream
+STATIC_SEPARATOR = "\n\n---\n\n"
+
+# Precompressed reports are immutable, so browsers and proxies may keep them for a year
+REPORT_MAX_AGE = int(os.environ.get("REPORT_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+
+_published_positions = {}
+_positions_lock = threading.Lock()
+
+def position_publisher(app):
+    # Mirrors queue positions into the job store so any process can report them
+    def publish(positions):
+        positions = {k: v for k, v in positions.items() if not k.startswith(BATCH_JOB_PREFIX)}
+        with _positions_lock:
+            changed = {k: v for k, v in positions.items() if _published_positions.get(k) != v}
+            _published_positions.clear()
+            _published_positions.update(positions)
+        if not changed:
+            return
+        with app.app_context():
+            store = get_job_store()
+            for job_id, position in changed.items():
+                store.set_position(job_id, position)
+    return publish
 
 @analyze_bp.route("/start-analysis", methods=["POST"])
 def start_analysis():
     dataset = request.form.get("dataset", "")
     code = request.form.get("code", "")
+    predict_n = request.form.get("predict_n", type=int)
+    profile_requested = bool(request.form.get("profile"))
+
+    code_path, timestamp = save_code_to_file(code)
 
-    _, timestamp = save_code_to_file(code)
+    store = get_job_store()
+    store.create(timestamp)
 
     def progress_callback(percent):
-        progress_tracker[timestamp] = percent
+        # 100 is only reported once the report has been saved
+        store.set_progress(timestamp, min(percent, 99))
+
+    def chunk_callback(text):
+        store.append_chunk(timestamp, text)
 
     app = current_app._get_current_object()
     user_object = current_user._get_current_object()
@@ -30,77 +80,168 @@ def start_analysis():
     if not current_user.is_authenticated:
         user_id = None
         is_admin = False
+        user_key = f"ip:{request.remote_addr}"
     elif isinstance(user_object, AdminUser):
         user_id = None
         is_admin = True
+        user_key = f"admin:{user_object.id}"
     else:
         user_id = user_object.id
         is_admin = False
+        user_key = f"user:{user_id}"
 
     def run_analysis(app, user_id, is_admin):
         with app.app_context():
             try:
-                analysis_html = analyze_with_gemini(code, dataset, progress_callback)
-                filename = save_html_output(code, dataset, analysis_html, timestamp)
+                # Milliseconds, so it is on screen while profiling and Gemini still run
+                static = analyze_static(code)
+                chunk_callback(static_markdown(static) + STATIC_SEPARATOR)
+                profile = None
+                if profile_requested:
+                    profile = profile_hot_spots(code, dataset)
+                analysis_html = analyze_with_fallback(code, dataset, progress_callback, chunk_callback, profile)
+                benchmark = benchmark_for_report(code, predict_n, dataset)
+                if benchmark:
+                    try:
+                        record_sweep(code, benchmark)
+                    except Exception as e:
+                        db.session.rollback()
+                        print("❌ Could not save benchmark history:", e)
+                try:
+                    optimization = verify_optimization(code, dataset, analysis_html, benchmark)
+                except Exception as e:
+                    optimization = None
+                    print("❌ Could not check the optimized code:", e)
+                filename = save_html_output(code, dataset, analysis_html, timestamp, benchmark, optimization, profile, static)
 
                 # ✅ Save correct user/admin flags
                 report = Report(
                     filename=filename,
                     dataset=dataset,
                     user_id=user_id,
-                    created_by_admin=is_admin
+                    created_by_admin=is_admin,
+                    **search_fields(code, analysis_html, benchmark, static)
                 )
 
                 db.session.add(report)
                 db.session.commit()
 
-                progress_tracker[timestamp] = 100
+                store.set_report(timestamp, filename)
+                store.set_progress(timestamp, 100)
             except Exception as e:
                 print("❌ Error during analysis:", e)
-                error_tracker[timestamp] = str(e)
-                progress_tracker[timestamp] = -1
+                store.set_error(timestamp, str(e))
+
+    try:
+        get_scheduler(position_publisher(app)).submit(timestamp, user_key, run_analysis, app, user_id, is_admin)
+    except QueueFull as e:
+        store.discard(timestamp)
+        if os.path.exists(code_path):
+            os.remove(code_path)
+        return render_template("error.html", message=str(e)), 429
 
-    threading.Thread(target=run_analysis, args=(app, user_id, is_admin)).start()
     return redirect(url_for("analyze.progress_page", ts=timestamp))
 
+def profile_hot_spots(code, dataset):
+    # Profiled before Gemini is asked, so the prompt can point at real hot spots
+    try:
+        n = PROFILE_N if uses_input_size(code) else 0
+        run = profile_code(code, n, workload=report_workload(code, dataset))
+    except Exception as e:
+        print("❌ Could not profile the code:", e)
+        return None
+    if run.get("error"):
+        print("⚠️ Profiled run failed:", run["error"].strip().splitlines()[-1])
+    return run.get("profile")
+
 @analyze_bp.route("/progress/<ts>")
 def progress(ts):
-    def stream():
-        while True:
-            prog = progress_tracker.get(ts, 0)
-            if prog == -1:
-                yield "data: error\n\n"
-                break
-            yield f"data: {prog}\n\n"
-            if prog >= 100:
-                break
-            time.sleep(0.5)
-
-    return Response(stream(), mimetype="text/event-stream")
+    response = Response(stream_with_context(sync_stream(get_job_store(), ts)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
 
 
 @analyze_bp.route("/progress-page/<ts>")
 def progress_page(ts):
-    return render_template("progress.html", ts=ts)
+    return render_template("progress.html", ts=ts, sse_url=os.environ.get("SSE_PUBLIC_URL", ""))
 
 
 @analyze_bp.route("/result/<ts>")
 def result(ts):
-    report_name = f"gemini_analysis_{ts}.html"
+    report_name = get_job_store().get_report(ts) or f"gemini_analysis_{ts}.html"
     return render_template("result.html", report_name=report_name)
 
 
+# -------------------------------
+# Report downloads
+# -------------------------------
+REPORT_ETAG_ENTRIES = 1024
+_report_etags = OrderedDict()
+_report_etags_lock = threading.Lock()
+
+def _report_etag(path):
+    # Strong validator: hash of the uncompressed report, memoized for the
+    # current version of each file (least recently served reports evicted)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _report_etags_lock:
+        cached = _report_etags.get(path)
+        if cached and cached[0] == version:
+            _report_etags.move_to_end(path)
+            return cached[1]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    etag = digest.hexdigest()[:32]
+    with _report_etags_lock:
+        _report_etags[path] = (version, etag)
+        _report_etags.move_to_end(path)
+        while len(_report_etags) > REPORT_ETAG_ENTRIES:
+            _report_etags.popitem(last=False)
+    return etag
+
+def _negotiate_encoding(path):
+    for encoding in COMPRESSED_VARIANTS:
+        if request.accept_encodings[encoding]:
+            variant = compressed_variant(path, encoding)
+            if variant:
+                return encoding, variant
+    return None, path
+
 @analyze_bp.route("/reports/<filename>")
 def download_report(filename):
-    from flask import send_from_directory
-
     reports_path = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "..", "reports")
     )
-    return send_from_directory(reports_path, filename)
+    path = safe_join(reports_path, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    # Code files, batch state and reports written before compression existed
+    if not any(compressed_variant(path, encoding) for encoding in COMPRESSED_VARIANTS):
+        return send_from_directory(reports_path, filename)
+
+    encoding, served_path = _negotiate_encoding(path)
+    # Each encoding is a different representation and needs its own strong ETag
+    etag = _report_etag(path) + (f"-{encoding}" if encoding else "")
+
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_file(served_path, mimetype=mimetype, conditional=False, etag=False)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={REPORT_MAX_AGE}, immutable"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
 
 
 @analyze_bp.route("/error/<ts>")
 def error(ts):
-    message = error_tracker.get(ts, "Unknown error.")
+    message = get_job_store().get_error(ts) or "Unknown error."
     return render_template("error.html", message=message)
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import threading
+from flask import Blueprint, request, jsonify, url_for, current_app
+from flask_login import login_required, current_user
+
+from models.models import db, Report
+from routes.admin import admin_required
+from batch import BatchRun, BatchItem, load_zip, load_jsonl_lines, new_batch_id, valid_batch_id, read_state
+from job_queue import get_scheduler
+from routes.analyze import position_publisher
+from file_saver import REPORTS_DIR
+from report_search import search_fields
+
+batch_bp = Blueprint("batch", __name__, url_prefix="/batch")
+
+# -------------------------------
+# Start a batch (Admin Only)
+# -------------------------------
+@batch_bp.route("", methods=["POST"])
+@login_required
+@admin_required
+def start_batch():
+    concurrency = request.args.get("concurrency", 4, type=int)
+    # Same id as an earlier (interrupted) batch: items already done are skipped
+    batch_id = request.args.get("batch_id") or request.form.get("batch_id")
+
+    try:
+        upload = request.files.get("file")
+        if upload and upload.filename.lower().endswith(".zip"):
+            with tempfile.TemporaryFile() as tmp:
+                upload.save(tmp)
+                items = load_zip(tmp)
+        elif upload:
+            items = load_jsonl_lines(upload.read().decode("utf-8").splitlines())
+        else:
+            data = request.get_json() or {}
+            concurrency = int(data.get("concurrency", concurrency))
+            batch_id = data.get("batch_id") or batch_id
+            items = [
+                BatchItem(str(entry.get("name") or f"item_{i}"), entry["code"], entry.get("dataset", ""))
+                for i, entry in enumerate(data.get("items", []), start=1)
+            ]
+    except (KeyError, ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Invalid batch: {e}"}), 400
+
+    if not items:
+        return jsonify({"error": "The batch contains no Python items."}), 400
+    if batch_id is not None and not valid_batch_id(str(batch_id)):
+        return jsonify({"error": "Invalid batch_id (letters, digits, '_' and '-' only)."}), 400
+
+    app = current_app._get_current_object()
+    # Items are queued with the admin's other analyses: at most one per worker
+    # at a time, so a batch counts towards the queue depth without filling it
+    scheduler = get_scheduler(position_publisher(app))
+    concurrency = max(1, min(concurrency, scheduler.workers))
+
+    def on_item_done(item, filename, analysis):
+        with app.app_context():
+            db.session.add(Report(filename=filename, dataset=item.dataset, created_by_admin=True,
+                                  **search_fields(item.code, analysis)))
+            db.session.commit()
+
+    run = BatchRun(str(batch_id or new_batch_id()), items, concurrency=concurrency, on_item_done=on_item_done,
+                   scheduler=scheduler, user_key=f"admin:{current_user.id}")
+    threading.Thread(target=run.run, daemon=True).start()
+
+    return jsonify({
+        "batch_id": run.batch_id,
+        "items": len(items),
+        "concurrency": concurrency,
+        "status_url": url_for("batch.batch_status", batch_id=run.batch_id),
+    }), 202
+
+# -------------------------------
+# Batch status (Admin Only)
+# -------------------------------
+@batch_bp.route("/<batch_id>")
+@login_required
+@admin_required
+def batch_status(batch_id):
+    state = read_state(batch_id) if valid_batch_id(batch_id) else None
+    if state is None:
+        return jsonify({"error": "Unknown batch."}), 404
+
+    counts = {}
+    for entry in state["items"].values():
+        counts[entry.get("status")] = counts.get(entry.get("status"), 0) + 1
+    state["counts"] = counts
+    index = f"batch_{batch_id}_index.html"
+    if os.path.exists(os.path.join(REPORTS_DIR, index)):
+        state["index_url"] = url_for("analyze.download_report", filename=index)
+    return jsonify(state)
@@ -1,8 +1,13 @@
-from flask import Blueprint, request, render_template, jsonify
-import time
-import io
-import sys
-import traceback
+import re
+from flask import Blueprint, request, render_template, jsonify, url_for, abort
+
+from models.models import db
+from sandbox import run_code
+from benchmarking import parse_sizes, parse_workload, sweep_with_fit
+from workloads import KINDS, workload_spec
+from profiling import profile_code
+from html_generator import format_seconds
+from benchmark_history import record_sweep, compare_latest, code_hash
 
 execute_bp = Blueprint("execute", __name__)
 
@@ -13,26 +18,39 @@ def execute():
     execution_time = None
     code = ""
     n = 0
+    profile = None
+    profile_requested = False
+    workload = {"kind": "", "seed": 0, "template": ""}
 
     if request.method == "POST":
         code = request.form.get("code", "")
         input_size = int(request.form.get("input_size", "0"))
+        n = input_size
+        profile_requested = bool(request.form.get("profile"))
+        workload = {
+            "kind": request.form.get("workload", ""),
+            "seed": request.form.get("seed", type=int) or 0,
+            "template": request.form.get("template", ""),
+        }
 
-        user_globals = {'n': input_size}
-        old_stdout = sys.stdout
-        redirected_output = sys.stdout = io.StringIO()
-
-        start_time = time.time()
         try:
-            exec(code, user_globals)
-            result = redirected_output.getvalue()
-        except Exception:
-            error = traceback.format_exc()
-        finally:
-            sys.stdout = old_stdout
-            execution_time = time.time() - start_time
+            spec = workload_spec(workload["kind"], workload["seed"], workload["template"]) if workload["kind"] else None
+            if profile_requested:
+                run = profile_code(code, input_size, workload=spec)
+            else:
+                run = run_code(code, {"n": input_size}, workload=spec)
+        except ValueError as e:
+            run = {"error": f"Invalid workload: {e}"}
+        profile = run.get("profile")
+        execution_time = run.get("time")
+        if run.get("error"):
+            error = run["error"]
+        else:
+            result = run.get("output", "")
 
-    return render_template("execute.html", result=result, error=error, time=execution_time, code=code, n=n)
+    return render_template("execute.html", result=result, error=error, time=execution_time, code=code, n=n,
+                           workload=workload, workload_kinds=KINDS, profile=profile,
+                           profile_requested=profile_requested, format_seconds=format_seconds)
 
 @execute_bp.route("/benchmark", methods=["POST"])
 def benchmark():
@@ -40,20 +58,66 @@ def benchmark():
     code = data["code"]
     n = data["n"]
 
-    result = None
-    error = None
-    execution_time = None
+    if data.get("profile"):
+        run = profile_code(code, n)
+    else:
+        run = run_code(code, {"n": n})
+    error = run.get("error")
+    execution_time = 0.0 if error else run.get("time")
+
+    response = {"time": execution_time, "error": error}
+    if data.get("profile"):
+        response["profile"] = run.get("profile")
+    return jsonify(response)
 
+@execute_bp.route("/benchmark/sweep", methods=["POST"])
+def benchmark_sweep():
+    data = request.get_json() or {}
+    code = data.get("code", "")
+
+    try:
+        sizes = parse_sizes(data)
+        predict_n = int(data["predict_n"]) if data.get("predict_n") else None
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid input sizes: {e}"}), 400
     try:
-        redirected_output = sys.stdout = io.StringIO()
-        start_time = time.time()
-        exec_globals = {"n": n}
-        exec(code, exec_globals)
-        sys.stdout = sys.__stdout__
-        execution_time = time.time() - start_time
-    except Exception:
-        error = traceback.format_exc()
-        execution_time = 0.0
-        sys.stdout = sys.__stdout__
-
-    return jsonify({"time": execution_time, "error": error})
+        workload = parse_workload(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid workload: {e}"}), 400
+
+    try:
+        outcome = sweep_with_fit(code, sizes, predict_n=predict_n, workload=workload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    save_history(code, outcome)
+    return jsonify(outcome)
+
+def save_history(code, outcome):
+    try:
+        outcome["sweep_id"] = record_sweep(code, outcome)
+    except Exception as e:
+        # History is a nice-to-have; never fail the benchmark because of it
+        db.session.rollback()
+        print("❌ Could not save benchmark history:", e)
+        return
+    if outcome["sweep_id"]:
+        digest = code_hash(code, outcome.get("workload"))
+        outcome["code_hash"] = digest
+        outcome["history_url"] = url_for("execute.benchmark_history", digest=digest)
+
+# -------------------------------
+# Benchmark history
+# -------------------------------
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+@execute_bp.route("/benchmark/history/<digest>.json")
+def benchmark_history_json(digest):
+    if not HASH_PATTERN.match(digest):
+        abort(404)
+    return jsonify(compare_latest(digest))
+
+@execute_bp.route("/benchmark/history/<digest>")
+def benchmark_history(digest):
+    if not HASH_PATTERN.match(digest):
+        abort(404)
+    return render_template("benchmark_history.html", report=compare_latest(digest))
@@ -0,0 +1,21 @@
+import hmac
+from flask import Blueprint, Response, request, abort
+
+from config import get_config
+from metrics import registry
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics")
+def metrics():
+    # Optional bearer token for scrapers, read per request so .env edits apply
+    # without a restart; unset leaves /metrics open (e.g. behind a private network)
+    token = get_config().get("METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, token):
+            abort(401)
+    response = Response(registry.render(), mimetype="text/plain")
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
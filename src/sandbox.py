@@ -0,0 +1,329 @@
+import os
+import io
+import math
+import time
+import queue
+import atexit
+import signal
+import threading
+import traceback
+import importlib
+import contextlib
+import multiprocessing
+
+from metrics import SANDBOX_LATENCY
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, wall timeouts still apply
+    resource = None
+
+# How long a worker whose pipe closed gets to exit before its exit code is read
+CRASH_JOIN_TIMEOUT = 1.0
+DEFAULT_PRELOAD = "collections,heapq,bisect,itertools,functools,math,random,array,re,string,statistics"
+
+
+class CpuTimeExceeded(Exception):
+    pass
+
+
+# -------------------------------
+# Worker process side
+# -------------------------------
+def _on_sigxcpu(signum, frame):
+    raise CpuTimeExceeded("CPU time limit exceeded")
+
+
+def _set_cpu_limit(seconds):
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        soft = hard
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(math.ceil(usage.ru_utime + usage.ru_stime + seconds))
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _limit_memory(memory_mb):
+    if resource is None or not memory_mb:
+        return
+    limit = int(memory_mb) * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _preload(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def _exit_error(exit):
+    # Like the interpreter: exit() and exit(0) are a clean exit, anything else fails
+    if exit.code is None or exit.code == 0:
+        return None
+    return f"SystemExit: {exit.code}"
+
+
+def run_user_code(code, user_globals, max_output, profiler=None):
+    buffer = io.StringIO()
+    error = None
+    recycle = False
+    start_time = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        compiled = compile(code, "<user_code>", "exec")
+        with contextlib.redirect_stdout(buffer), (profiler or contextlib.nullcontext()):
+            exec(compiled, user_globals)
+    except CpuTimeExceeded:
+        error = "CpuTimeExceeded: CPU time limit exceeded"
+    except MemoryError:
+        error = "MemoryError: memory limit exceeded"
+        recycle = True
+    except SystemExit as e:
+        # exit()/sys.exit() ends the program, not the pooled worker
+        error = _exit_error(e)
+    except Exception:
+        error = traceback.format_exc()
+    execution_time = time.perf_counter() - start_time
+    cpu_time = time.process_time() - start_cpu
+
+    output = buffer.getvalue()
+    if max_output and len(output) > max_output:
+        output = output[:max_output] + "\n... [output truncated]"
+
+    return {"output": output, "error": error, "time": execution_time, "cpu_time": cpu_time, "recycle": recycle}
+
+
+def _handle_exec(payload):
+    if payload.get("seed") is not None:
+        # Lets two versions of randomized code be compared on the same draws
+        import random
+
+        random.seed(payload["seed"])
+    user_globals = dict(payload.get("globals") or {})
+    if payload.get("workload"):
+        from workloads import workload_globals
+
+        user_globals.update(workload_globals(payload["workload"], user_globals.get("n", 0)))
+    return run_user_code(payload["code"], user_globals, payload.get("max_output"))
+
+
+def _handlers():
+    from benchmarking import handle_sweep
+    from profiling import handle_profile
+
+    return {
+        "exec": _handle_exec,
+        "sweep": handle_sweep,
+        "profile": handle_profile,
+    }
+
+
+def _worker_main(conn, memory_mb, preload):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    _limit_memory(memory_mb)
+    _preload(preload)
+    handlers = _handlers()
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        handler_name, payload, cpu_timeout = job
+        _set_cpu_limit(cpu_timeout)
+        try:
+            result = handlers[handler_name](payload)
+        except CpuTimeExceeded:
+            result = {"error": "CpuTimeExceeded: CPU time limit exceeded"}
+        except MemoryError:
+            result = {"error": "MemoryError: memory limit exceeded", "recycle": True}
+        except SystemExit as e:
+            # User code exiting in the middle of a sweep or profiled run
+            result = {"error": _exit_error(e) or "SystemExit: the program exited before the run finished"}
+        except Exception:
+            result = {"error": traceback.format_exc()}
+        finally:
+            _set_cpu_limit(None)
+
+        try:
+            conn.send(result)
+        except Exception:
+            conn.send({"error": traceback.format_exc(), "recycle": True})
+
+
+# -------------------------------
+# Parent (web worker) side
+# -------------------------------
+class SandboxTimeout(Exception):
+    pass
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except Exception:
+                self.process.kill()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SandboxPool:
+    def __init__(self, size=2, max_jobs=100, timeout=10.0, cpu_timeout=10.0,
+                 memory_mb=512, max_output=100_000, preload=None):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.cpu_timeout = cpu_timeout
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.preload = list(preload or [])
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._closed = False
+
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_mb, self.preload),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker, kill=False):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.stop(kill=kill)
+
+    def _release(self, worker, healthy):
+        if healthy and worker.jobs < self.max_jobs and not self._closed:
+            self._idle.put(worker)
+            return
+        self._retire(worker, kill=not healthy)
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def submit(self, handler, payload, timeout=None, cpu_timeout=None):
+        if self._closed:
+            raise RuntimeError("Sandbox pool is shut down")
+        with SANDBOX_LATENCY.time(handler=handler):
+            return self._submit(handler, payload, timeout, cpu_timeout)
+
+    def _submit(self, handler, payload, timeout, cpu_timeout):
+        timeout = self.timeout if timeout is None else timeout
+        cpu_timeout = self.cpu_timeout if cpu_timeout is None else cpu_timeout
+        payload = dict(payload)
+        payload.setdefault("max_output", self.max_output)
+
+        worker = self._idle.get()
+        healthy = False
+        try:
+            worker.jobs += 1
+            worker.conn.send((handler, payload, cpu_timeout))
+            if not worker.conn.poll(timeout):
+                raise SandboxTimeout(f"Execution exceeded the {timeout:g}s time limit")
+            result = worker.conn.recv()
+            healthy = not result.pop("recycle", False)
+            return result
+        except (EOFError, OSError, BrokenPipeError):
+            # The pipe closes slightly before the process is reaped
+            worker.process.join(CRASH_JOIN_TIMEOUT)
+            exitcode = worker.process.exitcode
+            if hasattr(signal, "SIGXCPU") and exitcode == -signal.SIGXCPU:
+                return {"error": "CpuTimeExceeded: CPU time limit exceeded"}
+            return {"error": f"Sandbox worker crashed (exit code {exitcode})"}
+        finally:
+            self._release(worker, healthy)
+
+    def run(self, code, user_globals=None, timeout=None, cpu_timeout=None, seed=None, workload=None):
+        # `workload` is the path of a materialized input (see workloads.py)
+        try:
+            return self.submit(
+                "exec",
+                {"code": code, "globals": user_globals or {}, "seed": seed, "workload": workload},
+                timeout=timeout,
+                cpu_timeout=cpu_timeout,
+            )
+        except SandboxTimeout as e:
+            return {"output": "", "error": f"TimeoutError: {e}", "time": timeout or self.timeout, "cpu_time": None}
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                preload = os.environ.get("SANDBOX_PRELOAD", DEFAULT_PRELOAD)
+                _pool = SandboxPool(
+                    size=int(os.environ.get("SANDBOX_WORKERS", "2")),
+                    max_jobs=int(os.environ.get("SANDBOX_MAX_JOBS", "100")),
+                    timeout=float(os.environ.get("SANDBOX_TIMEOUT", "10")),
+                    cpu_timeout=float(os.environ.get("SANDBOX_CPU_TIMEOUT", "10")),
+                    memory_mb=int(os.environ.get("SANDBOX_MEMORY_MB", "512")),
+                    max_output=int(os.environ.get("SANDBOX_MAX_OUTPUT", "100000")),
+                    preload=[m.strip() for m in preload.split(",") if m.strip()],
+                )
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+def run_code(code, user_globals=None, timeout=None, cpu_timeout=None, seed=None, workload=None):
+    path = None
+    if workload:
+        from workloads import materialize
+
+        path = materialize(workload, int((user_globals or {}).get("n", 0)))
+    return get_pool().run(code, user_globals, timeout=timeout, cpu_timeout=cpu_timeout, seed=seed, workload=path)
@@ -0,0 +1,757 @@
+import re
+import ast
+import math
+import time
+
+# Complexities are (exponential, power of n, power of log n) tuples: they
+# multiply by adding up and compare in the order the MODELS of complexity_fit use
+O1 = (0, 0, 0)
+OLOG = (0, 0, 1)
+ON = (0, 1, 0)
+ONLOGN = (0, 1, 1)
+OEXP = (1, 0, 0)
+
+SUPERSCRIPTS = str.maketrans("0123456789", "⁰¹²³⁴⁵⁶⁷⁸⁹")
+
+# Calls that walk their whole argument once
+LINEAR_BUILTINS = {"sum", "min", "max", "any", "all", "list", "tuple", "set", "frozenset", "dict",
+                   "sorted", "reversed", "enumerate", "zip", "map", "filter", "deque", "Counter"}
+CONSTRUCTOR_KINDS = {"list": "list", "dict": "dict", "set": "set", "frozenset": "set", "tuple": "tuple",
+                     "str": "str", "deque": "deque", "defaultdict": "dict", "OrderedDict": "dict",
+                     "Counter": "dict", "sorted": "list"}
+LITERAL_KINDS = {ast.List: "list", ast.ListComp: "list", ast.Dict: "dict", ast.DictComp: "dict",
+                 ast.Set: "set", ast.SetComp: "set", ast.Tuple: "tuple", ast.JoinedStr: "str"}
+MEMO_DECORATORS = {"lru_cache", "cache", "memoize", "memoized"}
+MEMO_NAMES = {"memo", "cache", "dp", "seen", "visited", "table"}
+HEAP_OPERATIONS = {"heappush", "heappop", "heappushpop", "heapreplace"}
+LINEAR_LIST_METHODS = {"remove", "index", "count"}
+
+# Typical cost of the operations a structure offers, shown when none were seen
+TYPICAL_OPERATIONS = {
+    "list": [("append", O1), ("index by position", O1), ("insert/pop at the front", ON), ("`in`", ON)],
+    "dict": [("get/set by key", O1), ("`in`", O1)],
+    "set": [("add", O1), ("`in`", O1)],
+    "deque": [("append/popleft", O1)],
+    "heap": [("heappush/heappop", OLOG)],
+    "tuple": [("index by position", O1), ("`in`", ON)],
+    "str": [("`+=`", ON), ("`in`", ON)],
+}
+CATEGORIES = ("Fastest", "Average", "Slowest")
+MODULE = "<module>"
+
+
+def multiply(a, b):
+    return (max(a[0], b[0]), a[1] + b[1], a[2] + b[2])
+
+
+def format_cost(cost):
+    exponential, power, logs = cost
+    if exponential:
+        return "O(2ⁿ)"
+    parts = []
+    if power:
+        parts.append("n" if power == 1 else "n" + str(power).translate(SUPERSCRIPTS))
+    if logs:
+        parts.append("log n" if logs == 1 else "log" + str(logs).translate(SUPERSCRIPTS) + " n")
+    return f"O({' '.join(parts) or '1'})"
+
+
+def code_span(text):
+    # Markdown inline code that holds any text: the fence is longer than every
+    # backtick run inside it, so user code cannot close the span early
+    fence = "`" * (max((len(run) for run in re.findall(r"`+", text)), default=0) + 1)
+    pad = " " if text.startswith("`") or text.endswith("`") else ""
+    return f"{fence}{pad}{text}{pad}{fence}"
+
+
+def _call_name(node):
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _receiver(node):
+    # "items" for items.pop(0), "self.items" for self.items.pop(0)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return f"{node.value.id}.{node.attr}"
+    return None
+
+
+def _is_constant(node):
+    return all(isinstance(child, (ast.Constant, ast.operator, ast.unaryop, ast.expr_context,
+                                  ast.Tuple, ast.List, ast.BinOp, ast.UnaryOp))
+               for child in ast.walk(node))
+
+
+def _value_kind(node):
+    kind = LITERAL_KINDS.get(type(node))
+    if kind:
+        return kind
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return "str"
+    if isinstance(node, ast.Call):
+        name = _call_name(node)
+        if name == "split" or name == "splitlines":
+            return "list"
+        return CONSTRUCTOR_KINDS.get(name)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+        return _value_kind(node.left)
+    return None
+
+
+def _collect_kinds(tree):
+    # Structure kind per name (or self.attribute); names bound to different
+    # kinds in different places are left unknown
+    kinds = {}
+
+    def bind(target, kind):
+        name = _receiver(target)
+        if name and kind:
+            kinds.setdefault(name, set()).add(kind)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                bind(target, _value_kind(node.value))
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            bind(node.target, _value_kind(node.value))
+        elif isinstance(node, ast.arg) and node.annotation is not None:
+            annotation = node.annotation
+            if isinstance(annotation, ast.Subscript):
+                annotation = annotation.value
+            name = getattr(annotation, "id", None) or getattr(annotation, "attr", None)
+            kind = CONSTRUCTOR_KINDS.get((name or "").lower())
+            if kind:
+                kinds.setdefault(node.arg, set()).add(kind)
+        elif isinstance(node, ast.Call) and _call_name(node) in HEAP_OPERATIONS | {"heapify"} and node.args:
+            name = _receiver(node.args[0])
+            if name:
+                kinds[name] = {"heap"}
+    return {name: found.pop() for name, found in kinds.items() if len(found) == 1}
+
+
+# -------------------------------
+# Recursion shape
+# -------------------------------
+def _own_nodes(function_node):
+    # The function's nodes, without the bodies of functions defined inside it
+    stack = list(ast.iter_child_nodes(function_node))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            stack.extend(ast.iter_child_nodes(node))
+
+
+def _self_call_test(function):
+    name = function.name.split(".")[-1]
+
+    def is_call(node):
+        if not isinstance(node, ast.Call):
+            return False
+        func = node.func
+        if function.class_name and function.name != name:
+            return isinstance(func, ast.Attribute) and func.attr == name and _receiver(func.value) in ("self", "cls")
+        return isinstance(func, ast.Name) and func.id == name
+    return is_call
+
+
+def _expression_calls(node, is_call):
+    # Most calls on one evaluation path: only one side of `a if c else b` runs
+    if node is None:
+        return 0
+    if isinstance(node, ast.IfExp):
+        return _expression_calls(node.test, is_call) + max(_expression_calls(node.body, is_call),
+                                                           _expression_calls(node.orelse, is_call))
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+        return 0
+    return int(is_call(node)) + sum(_expression_calls(child, is_call) for child in ast.iter_child_nodes(node))
+
+
+def _terminates(statements):
+    if not statements:
+        return False
+    last = statements[-1]
+    if isinstance(last, (ast.Return, ast.Raise)):
+        return True
+    return isinstance(last, ast.If) and _terminates(last.body) and _terminates(last.orelse)
+
+
+def _path_calls(statements, is_call):
+    # Most recursive calls made on one path through the statements
+    total = 0
+    for index, statement in enumerate(statements):
+        if isinstance(statement, ast.If):
+            rest = statements[index + 1:]
+            branches = []
+            for branch in (statement.body, statement.orelse):
+                calls = _path_calls(branch, is_call)
+                if not _terminates(branch):
+                    calls += _path_calls(rest, is_call)
+                branches.append(calls)
+            return total + _expression_calls(statement.test, is_call) + max(branches)
+        total += _expression_calls(statement, is_call)
+        if isinstance(statement, (ast.Return, ast.Raise)):
+            return total
+    return total
+
+
+def _halves(node, names=()):
+    return any(isinstance(child, ast.BinOp) and isinstance(child.op, (ast.FloorDiv, ast.RShift, ast.Div))
+               or isinstance(child, ast.Name) and child.id in names
+               for child in ast.walk(node))
+
+
+def _derived_names(function_node, test):
+    # Local names assigned from an expression passing `test`, followed through
+    # later assignments (m = len(a) // 2; lo = m + 1)
+    assignments = [node for node in _own_nodes(function_node) if isinstance(node, (ast.Assign, ast.AugAssign))]
+    names = set()
+    changed = True
+    while changed:
+        changed = False
+        for assignment in assignments:
+            if not test(assignment.value, names):
+                continue
+            targets = assignment.targets if isinstance(assignment, ast.Assign) else [assignment.target]
+            for target in targets:
+                for node in ast.walk(target):
+                    if isinstance(node, ast.Name) and node.id not in names:
+                        names.add(node.id)
+                        changed = True
+    return names
+
+
+def _partition_names(function_node):
+    # Lists built by filtering the input (quicksort's `less`/`more`)
+    names = set()
+    for node in _own_nodes(function_node):
+        if isinstance(node, ast.Assign) and (
+                isinstance(node.value, (ast.ListComp, ast.GeneratorExp, ast.SetComp))
+                or isinstance(node.value, ast.Call) and _call_name(node.value) == "filter"):
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+        elif isinstance(node, (ast.For, ast.AsyncFor)):
+            for child in ast.walk(node):
+                if isinstance(child, ast.Call) and _call_name(child) == "append" \
+                        and isinstance(child.func, ast.Attribute) and isinstance(child.func.value, ast.Name):
+                    names.add(child.func.value.id)
+    return names
+
+
+def _is_child(node, parameters, child_targets):
+    # node.left, node.children[i], or the loop variable of `for child in node.children`
+    if isinstance(node, ast.Name):
+        return node.id in child_targets
+    if isinstance(node, ast.Subscript):
+        node = node.value
+    return isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in parameters
+
+
+def _child_loop_targets(function_node, parameters):
+    targets = set()
+    for node in _own_nodes(function_node):
+        if isinstance(node, (ast.For, ast.AsyncFor)) and isinstance(node.target, ast.Name) \
+                and _is_child(node.iter, parameters, ()):
+            targets.add(node.target.id)
+    return targets
+
+
+def _enclosing_loops(function_node, is_call):
+    # Recursive calls that sit inside a loop of the function
+    inside = set()
+    for node in _own_nodes(function_node):
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            parts = node.body if isinstance(node, (ast.For, ast.AsyncFor, ast.While)) else \
+                [getattr(node, name) for name in ("elt", "key", "value") if hasattr(node, name)]
+            for part in parts:
+                inside.update(child for child in ast.walk(part) if is_call(child))
+    return inside
+
+
+class _Function:
+    def __init__(self, name, node, class_name=None):
+        self.name = name
+        self.node = node
+        self.class_name = class_name
+        self.cost = O1
+        self.space = O1
+        self.loop_depth = 0
+        self.calls = []
+        self.recursive_calls = []
+        self.recursion = None
+
+
+class _Analyzer:
+    def __init__(self, tree):
+        self.tree = tree
+        self.kinds = _collect_kinds(tree)
+        self.functions = {}
+        self.issues = []
+        self.operations = {}
+
+    # -------------------------------
+    # Loop bounds
+    # -------------------------------
+    def iteration_factor(self, iterable):
+        if _is_constant(iterable):
+            return O1
+        if isinstance(iterable, ast.Call) and _call_name(iterable) == "range":
+            return O1 if all(_is_constant(arg) for arg in iterable.args) else ON
+        return ON
+
+    def while_factor(self, node):
+        # Loops that halve (or double) the counter in their condition, or narrow
+        # a lo/hi window around a midpoint, run log n times
+        tested = {child.id for child in ast.walk(node.test) if isinstance(child, ast.Name)}
+        for child in ast.walk(node):
+            if isinstance(child, ast.AugAssign) and _receiver(child.target) in tested \
+                    and isinstance(child.op, (ast.FloorDiv, ast.Div, ast.RShift, ast.Mult, ast.LShift)):
+                return OLOG
+            if isinstance(child, ast.Assign) and any(
+                    isinstance(part, ast.BinOp) and isinstance(part.op, (ast.FloorDiv, ast.RShift))
+                    for part in ast.walk(child.value)):
+                names = {part.id for part in ast.walk(child) if isinstance(part, ast.Name)}
+                if names & tested:
+                    return OLOG
+        return ON
+
+    # -------------------------------
+    # Bookkeeping
+    # -------------------------------
+    def charge(self, function, multiplier, cost):
+        total = multiply(multiplier, cost)
+        if total > function.cost:
+            function.cost = total
+
+    def allocate(self, function, size):
+        if size > function.space:
+            function.space = size
+
+    def record(self, name, operation, cost, in_loop):
+        kind = self.kinds.get(name)
+        if kind:
+            entry = self.operations.setdefault(kind, {})
+            worst = entry.get(operation)
+            entry[operation] = max(worst or (O1, False), (cost, in_loop))
+
+    def flag(self, node, idiom, detail, suggestion):
+        self.issues.append({"line": node.lineno, "idiom": idiom, "code": ast.unparse(node)[:80],
+                            "detail": detail, "suggestion": suggestion})
+
+    # -------------------------------
+    # Walk
+    # -------------------------------
+    def run(self):
+        module = _Function(MODULE, self.tree)
+        self.functions[module.name] = module
+        for node in self.tree.body:
+            self.visit(node, module, O1, 0)
+        for function in self.functions.values():
+            self.add_recursion(function)
+        return module
+
+    def define(self, node, class_name=None):
+        name = f"{class_name}.{node.name}" if class_name else node.name
+        function = _Function(name, node, class_name)
+        self.functions.setdefault(name, function)
+        for statement in node.body:
+            self.visit(statement, function, O1, 0)
+
+    def visit(self, node, function, multiplier, depth):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in node.decorator_list:
+                self.visit(decorator, function, multiplier, depth)
+            self.define(node)
+            return
+        if isinstance(node, ast.ClassDef):
+            scope = _Function(node.name, node, node.name)
+            for statement in node.body:
+                if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    self.define(statement, node.name)
+                else:
+                    self.visit(statement, scope, multiplier, depth)
+            return
+
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            self.visit(node.iter, function, multiplier, depth)
+            factor = self.iteration_factor(node.iter)
+            self.walk_loop(node.body, function, multiply(multiplier, factor), depth + (factor != O1))
+            for statement in node.orelse:
+                self.visit(statement, function, multiplier, depth)
+            return
+        if isinstance(node, ast.While):
+            inner = multiply(multiplier, self.while_factor(node))
+            self.visit(node.test, function, inner, depth + 1)
+            self.walk_loop(node.body, function, inner, depth + 1)
+            for statement in node.orelse:
+                self.visit(statement, function, multiplier, depth)
+            return
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            inner, inner_depth = multiplier, depth
+            for generator in node.generators:
+                self.visit(generator.iter, function, inner, inner_depth)
+                factor = self.iteration_factor(generator.iter)
+                inner, inner_depth = multiply(inner, factor), inner_depth + (factor != O1)
+                for condition in generator.ifs:
+                    self.visit(condition, function, inner, inner_depth)
+            function.loop_depth = max(function.loop_depth, inner_depth)
+            self.charge(function, inner, O1)
+            if not isinstance(node, ast.GeneratorExp):
+                self.allocate(function, inner)
+            for part in ("elt", "key", "value"):
+                if hasattr(node, part):
+                    self.visit(getattr(node, part), function, inner, inner_depth)
+            return
+
+        in_loop = depth > 0
+        if isinstance(node, ast.Call):
+            self.visit_call(node, function, multiplier, in_loop)
+        elif isinstance(node, ast.Compare):
+            self.visit_compare(node, function, multiplier, in_loop)
+        elif isinstance(node, ast.AugAssign):
+            self.visit_concatenation(node, node.target, node.value, isinstance(node.op, ast.Add),
+                                     function, multiplier, in_loop)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.value, ast.BinOp):
+            value = node.value
+            same = _receiver(value.left) is not None and _receiver(value.left) == _receiver(node.targets[0])
+            self.visit_concatenation(node, node.targets[0], value.right, same and isinstance(value.op, ast.Add),
+                                     function, multiplier, in_loop)
+        elif isinstance(node, ast.Delete):
+            for target in node.targets:
+                if isinstance(target, ast.Subscript) and _is_constant(target.slice):
+                    name = _receiver(target.value)
+                    if self.kinds.get(name) == "list" and getattr(target.slice, "value", None) == 0:
+                        self.front_removal(node, name, f"del {name}[0]", function, multiplier, in_loop)
+        elif isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice) and isinstance(node.ctx, ast.Load):
+            # Slices copy
+            self.charge(function, multiplier, ON)
+            self.allocate(function, ON)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Subscript):
+                    name = _receiver(target.value)
+                    self.record(name, "set by index/key", O1, in_loop)
+                    if in_loop and self.kinds.get(name) == "dict":
+                        self.allocate(function, multiplier)
+
+        self.charge(function, multiplier, O1)
+        for child in ast.iter_child_nodes(node):
+            self.visit(child, function, multiplier, depth)
+
+    def walk_loop(self, body, function, multiplier, depth):
+        function.loop_depth = max(function.loop_depth, depth)
+        self.charge(function, multiplier, O1)
+        for statement in body:
+            self.visit(statement, function, multiplier, depth)
+
+    def front_removal(self, node, name, code, function, multiplier, in_loop):
+        self.charge(function, multiplier, ON)
+        self.record(name, "insert/pop at the front", ON, in_loop)
+        if in_loop:
+            self.flag(node, "list.pop(0)", f"{code_span(code)} shifts every remaining element: O(n) per call.",
+                      "Use `collections.deque` and `popleft()`/`appendleft()` (O(1)).")
+
+    def visit_call(self, node, function, multiplier, in_loop):
+        name = _call_name(node)
+        receiver = _receiver(node.func.value) if isinstance(node.func, ast.Attribute) else None
+        kind = self.kinds.get(receiver)
+
+        # Calls to functions defined in the snippet are costed once every function is known
+        target = None
+        if isinstance(node.func, ast.Name):
+            target = name
+        elif receiver == "self" and function.class_name:
+            target = f"{function.class_name}.{name}"
+        if target:
+            if target == function.name:
+                function.recursive_calls.append((node, in_loop))
+            else:
+                function.calls.append((target, multiplier))
+
+        argument = node.args[0] if node.args else None
+        consumes_argument = argument is not None and not isinstance(
+            argument, (ast.GeneratorExp, ast.ListComp, ast.SetComp, ast.DictComp)) and not _is_constant(argument)
+        if name in ("min", "max") and len(node.args) > 1:
+            # max(a, b) compares its arguments, it does not walk a collection
+            consumes_argument = False
+
+        if name in ("pop", "insert") and node.args and isinstance(argument, ast.Constant) and argument.value == 0 \
+                and kind not in ("dict", "deque"):
+            self.front_removal(node, receiver, ast.unparse(node), function, multiplier, in_loop)
+        elif (name == "sort" and isinstance(node.func, ast.Attribute)) or (name == "sorted" and isinstance(node.func, ast.Name)):
+            self.charge(function, multiplier, ONLOGN if name == "sort" or consumes_argument else OLOG)
+            self.record(receiver or _receiver(argument), "sort", ONLOGN, in_loop)
+            if name == "sorted":
+                self.allocate(function, ON)
+            if in_loop:
+                self.flag(node, "sorted() in a loop", "Sorting inside a loop costs O(n log n) on every iteration.",
+                          "Sort once before the loop, or keep the data ordered with `bisect.insort` or a `heapq` heap.")
+        elif name in HEAP_OPERATIONS or name in ("bisect", "bisect_left", "bisect_right"):
+            self.charge(function, multiplier, OLOG)
+            self.record(_receiver(argument), name, OLOG, in_loop)
+        elif name in ("insort", "insort_left", "insort_right"):
+            self.charge(function, multiplier, ON)
+            self.record(_receiver(argument), name, ON, in_loop)
+        elif name in LINEAR_LIST_METHODS and kind in ("list", "tuple", "str"):
+            self.charge(function, multiplier, ON)
+            self.record(receiver, name, ON, in_loop)
+            if in_loop and kind == "list":
+                self.flag(node, f"list.{name}() in a loop", f"{code_span(f'{receiver}.{name}()')} scans the list: O(n) per call.",
+                          "Keep a `set` or `dict` alongside the list for lookups.")
+        elif name in ("append", "add", "extend", "appendleft", "update", "setdefault") and receiver:
+            self.record(receiver, name, ON if name in ("extend", "update") else O1, in_loop)
+            self.allocate(function, multiplier if in_loop else O1)
+        elif name in ("pop", "popleft", "get", "keys", "values", "items") and receiver:
+            self.record(receiver, name, O1, in_loop)
+        elif name == "join" and isinstance(node.func, ast.Attribute) and not isinstance(argument, ast.GeneratorExp):
+            self.charge(function, multiplier, ON)
+        elif name in LINEAR_BUILTINS and isinstance(node.func, ast.Name) and consumes_argument:
+            if name not in ("reversed", "enumerate", "zip", "map", "filter"):
+                self.charge(function, multiplier, ON)
+            if name in CONSTRUCTOR_KINDS:
+                self.allocate(function, ON)
+        elif name == "copy" and receiver:
+            self.charge(function, multiplier, ON)
+            self.allocate(function, ON)
+
+    def visit_compare(self, node, function, multiplier, in_loop):
+        for operator, container in zip(node.ops, node.comparators):
+            if not isinstance(operator, (ast.In, ast.NotIn)):
+                continue
+            name = _receiver(container)
+            kind = self.kinds.get(name) or LITERAL_KINDS.get(type(container))
+            if kind in ("list", "tuple", "str") and not _is_constant(container):
+                self.charge(function, multiplier, ON)
+                self.record(name, "`in`", ON, in_loop)
+                if in_loop and kind == "list":
+                    self.flag(node, "`in` on a list inside a loop",
+                              f"{code_span(ast.unparse(node)[:60])} scans {code_span(name) if name else 'the list'} on every iteration: O(n) each time.",
+                              "Build a `set` (or `dict`) once and test membership against it in O(1).")
+            elif kind in ("dict", "set"):
+                self.record(name, "`in`", O1, in_loop)
+
+    def visit_concatenation(self, node, target, value, is_add, function, multiplier, in_loop):
+        name = _receiver(target)
+        if not is_add or not name:
+            return
+        kind = self.kinds.get(name) or _value_kind(value)
+        if kind == "str":
+            self.charge(function, multiplier, ON)
+            self.record(name, "`+=`", ON, in_loop)
+            if in_loop:
+                self.allocate(function, multiplier)
+                self.flag(node, "string concatenation in a loop",
+                          f"{code_span(ast.unparse(node)[:60])} copies the whole string on every iteration.",
+                          "Collect the pieces in a list and `''.join()` them once at the end.")
+        elif kind == "list" and in_loop:
+            self.record(name, "extend", ON, in_loop)
+            self.allocate(function, multiplier)
+
+    # -------------------------------
+    # Recursion
+    # -------------------------------
+    def memoized(self, function):
+        for decorator in getattr(function.node, "decorator_list", []):
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            if (getattr(target, "id", None) or getattr(target, "attr", None)) in MEMO_DECORATORS:
+                return True
+        for node in ast.walk(function.node):
+            if isinstance(node, ast.Compare) and any(isinstance(op, (ast.In, ast.NotIn)) for op in node.ops):
+                name = _receiver(node.comparators[-1]) or ""
+                if name.split(".")[-1].lower() in MEMO_NAMES or self.kinds.get(name) == "dict":
+                    return True
+        return False
+
+    def add_recursion(self, function):
+        if not function.recursive_calls:
+            return
+        node = function.node
+        is_call = _self_call_test(function)
+        calls = [call for call in _own_nodes(node) if is_call(call)]
+        if not calls:
+            return
+        body = function.cost
+        # Calls in exclusive branches (if/elif/else, early returns) are one branch
+        branching = _path_calls(node.body, is_call)
+        memoized = self.memoized(function)
+        parameters = {arg.arg for arg in node.args.args + node.args.kwonlyargs} - {"self", "cls"}
+        halving = _derived_names(node, _halves)
+        partitions = _partition_names(node)
+        child_targets = _child_loop_targets(node, parameters)
+        loops = _enclosing_loops(node, is_call)
+
+        shrinks = set()
+        backtracking = False
+        for call in calls:
+            arguments = call.args + [keyword.value for keyword in call.keywords]
+            if any(_halves(argument, halving) for argument in arguments):
+                shrink = "half"
+            elif any(_is_child(argument, parameters, child_targets) for argument in arguments):
+                shrink = "child"
+            elif any(isinstance(argument, ast.Name) and argument.id in partitions for argument in arguments):
+                shrink = "partition"
+            else:
+                shrink = "constant"
+            shrinks.add(shrink)
+            if call in loops and shrink != "child":
+                backtracking = True
+
+        plural = "s" if branching > 1 else ""
+        if backtracking and not memoized:
+            cost, shape = OEXP, "recursive calls inside a loop (backtracking)"
+        elif shrinks == {"child"}:
+            if any(call in loops for call in calls):
+                # The loop over one node's children adds up to n over the whole structure
+                body = (body[0], max(0, body[1] - 1), body[2])
+            cost, shape = multiply(body, ON), "one call per child of the structure (each node visited once)"
+        elif shrinks <= {"half", "partition"}:
+            if "partition" in shrinks:
+                shape = f"{branching} call{plural} on parts of the input (average case; unbalanced splits are quadratic)"
+            else:
+                shape = f"{branching} call{plural} on half the input"
+            # Master theorem for T(n) = a·T(n/2) + body
+            critical = math.ceil(math.log2(branching)) if branching > 1 else 0
+            if body[1] < critical:
+                cost = (0, critical, 0)
+            elif body[1] == critical:
+                cost = (0, critical, body[2] + 1)
+            else:
+                cost = body
+        elif memoized:
+            cost, shape = multiply(body, ON), f"{branching} memoized call{plural} per level"
+        elif branching == 1:
+            cost, shape = multiply(body, ON), "1 call per level, input shrinks by a constant"
+        else:
+            cost, shape = OEXP, f"{branching} independent calls per level, input shrinks by a constant"
+
+        function.cost = max(function.cost, cost)
+        function.space = max(function.space, OLOG if shrinks == {"half"} else ON)
+        function.recursion = {"branching": branching, "shape": shape, "memoized": memoized}
+        if cost == OEXP:
+            self.flag(calls[0], "exponential recursion", f"{code_span(function.name)} {shape}: the call tree grows exponentially.",
+                      "Memoize it (`functools.lru_cache`) or rewrite it bottom-up with a table.")
+
+    def resolve(self, name, active=()):
+        # Cost of a function including the functions it calls, at the call sites' loop depth
+        function = self.functions[name]
+        total = function.cost
+        for callee, multiplier in function.calls:
+            if callee in self.functions and callee not in active and callee != name:
+                total = max(total, multiply(multiplier, self.resolve(callee, active + (name,))))
+        return total
+
+
+# -------------------------------
+# Public entry points
+# -------------------------------
+def _category(operations, kind):
+    if not operations:
+        operations = {operation: (cost, False) for operation, cost in TYPICAL_OPERATIONS.get(kind, [])}
+    worst_in_loop = max((cost for cost, in_loop in operations.values() if in_loop), default=O1)
+    worst = max((cost for cost, _ in operations.values()), default=O1)
+    if worst_in_loop >= ON:
+        return "Slowest"
+    if worst == O1:
+        return "Fastest"
+    return "Average"
+
+
+def analyze_static(code):
+    started = time.perf_counter()
+    try:
+        tree = ast.parse(code or "")
+    except SyntaxError as e:
+        return {"error": f"SyntaxError: {e.msg} (line {e.lineno})", "time": None, "space": None,
+                "functions": [], "structures": [], "issues": [],
+                "elapsed": time.perf_counter() - started}
+
+    analyzer = _Analyzer(tree)
+    analyzer.run()
+
+    functions = []
+    time_cost, space_cost = O1, O1
+    for name, function in analyzer.functions.items():
+        cost = analyzer.resolve(name)
+        time_cost = max(time_cost, cost)
+        space_cost = max(space_cost, function.space)
+        if name == MODULE and not function.calls and cost == O1:
+            continue
+        functions.append({
+            "name": "module-level code" if name == MODULE else name,
+            "line": getattr(function.node, "lineno", None),
+            "loop_depth": function.loop_depth,
+            "recursion": function.recursion,
+            "time": format_cost(cost),
+        })
+
+    structures = []
+    names = {}
+    for name, kind in analyzer.kinds.items():
+        names.setdefault(kind, []).append(name)
+    for kind in sorted(set(names) | set(analyzer.operations)):
+        operations = analyzer.operations.get(kind, {})
+        structures.append({
+            "structure": kind,
+            "names": sorted(names.get(kind, [])),
+            "operations": [(operation, format_cost(cost)) for operation, (cost, _) in sorted(operations.items())]
+                          or [(operation, format_cost(cost)) for operation, cost in TYPICAL_OPERATIONS.get(kind, [])],
+            "category": _category(operations, kind),
+        })
+    structures.sort(key=lambda row: CATEGORIES.index(row["category"]))
+
+    return {
+        "error": None,
+        "time": format_cost(time_cost),
+        "space": format_cost(space_cost),
+        "functions": functions,
+        "structures": structures,
+        "issues": sorted(analyzer.issues, key=lambda issue: issue["line"]),
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def static_markdown(result):
+    lines = ["## 🧭 Static Analysis (offline estimate)", ""]
+    if result["error"]:
+        lines.append(f"The code could not be parsed, so no static estimate is available: {result['error']}")
+        return "\n".join(lines) + "\n"
+
+    lines += [
+        f"**Estimated time complexity:** {result['time']}  ",
+        f"**Estimated auxiliary space:** {result['space']}",
+        "",
+        f"_Read from the code's structure in {result['elapsed'] * 1000:.1f} ms without running it: loop nesting, "
+        "recursion and known-costly operations. Early exits, input shapes and library internals are not "
+        "taken into account._",
+    ]
+    if result["structures"]:
+        lines += ["", "### Data structures", "", "| Structure | Names | Operations | Category |", "|---|---|---|---|"]
+        for row in result["structures"]:
+            operations = ", ".join(f"{operation} {cost}" for operation, cost in row["operations"])
+            names = ", ".join(code_span(name) for name in row["names"]) or "—"
+            lines.append(f"| {row['structure']} | {names} | {operations} | {row['category']} |")
+    if result["issues"]:
+        lines += ["", "### Costly idioms", ""]
+        for issue in result["issues"]:
+            lines.append(f"- **Line {issue['line']}, {issue['idiom']}:** {issue['detail']} {issue['suggestion']}")
+    if result["functions"]:
+        lines += ["", "### Functions", "", "| Function | Line | Loop depth | Recursion | Estimate |", "|---|---|---|---|---|"]
+        for row in result["functions"]:
+            recursion = row["recursion"]
+            shape = "—"
+            if recursion:
+                shape = recursion["shape"] + (" (memoized)" if recursion["memoized"] else "")
+            lines.append(f"| {code_span(row['name'])} | {row['line'] or '—'} | {row['loop_depth']} | {shape} | {row['time']} |")
+    return "\n".join(lines) + "\n"
+
+
+def fallback_analysis(error):
+    # Stands in for Gemini's answer when it could not be reached; the static
+    # section is rendered above it in the report and the progress stream
+    return (f"> ⚠️ Gemini was unavailable ({error}), so the static analysis above is the full result "
+            "for this code. Run the analysis again later for Gemini's explanation and optimized code.\n")
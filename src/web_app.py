@@ -1,4 +1,5 @@
 import os
+import sys
 from flask import Flask
 from flask_login import LoginManager
 from models.models import db, argon2, AdminUser
@@ -21,9 +22,46 @@ def create_env_file():
     else:
         print(f"ℹ️ .env file already exists at {env_path}")
 
-def create_app():
-    create_env_file()
+def upgrade_schema():
+    # create_all skips tables that already exist, so add columns and indexes
+    # introduced later, then the full-text search index
+    from sqlalchemy import inspect, text
+    from report_search import setup_search
+
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"✅ Added column {table.name}.{column.name}")
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    setup_search(db.engine)
+
+def init_db(app):
+    with app.app_context():
+        # Create database tables
+        db.create_all()
+        upgrade_schema()
+
+        # Create default admin user if it doesn't exist
+        admin_username = os.environ.get("ADMIN_USERNAME", "admin")
+        admin_password = os.environ.get("ADMIN_PASSWORD", "admin123")
 
+        if not AdminUser.query.filter_by(username=admin_username).first():
+            hashed_password = argon2.generate_password_hash(admin_password)
+            admin_user = AdminUser(username=admin_username, password_hash=hashed_password, is_admin=True)
+            db.session.add(admin_user)
+            db.session.commit()
+            print(f"✅ Admin user '{admin_username}' created.")
+        else:
+            print(f"ℹ️ Admin user '{admin_username}' already exists.")
+
+def create_app():
     # Load environment variables
     env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".env"))
     load_dotenv(dotenv_path=env_path)
@@ -33,7 +71,7 @@ def create_app():
 
     database_url = os.environ.get("DATABASE_URL")
     if not database_url:
-        raise RuntimeError("❌ DATABASE_URL is not set in the .env file")
+        raise RuntimeError("❌ DATABASE_URL is not set in the .env file (run `python web_app.py init-db` to create one)")
 
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -48,22 +86,14 @@ def create_app():
     def load_user(user_id):
         return AdminUser.query.get(int(user_id))
 
-    with app.app_context():
-        # Create database tables
-        db.create_all()
-
-        # Create default admin user if it doesn't exist
-        admin_username = os.environ.get("ADMIN_USERNAME", "admin")
-        admin_password = os.environ.get("ADMIN_PASSWORD", "admin123")
+    # Schema creation and the default admin are one-off steps (see init_db);
+    # AUTO_INIT_DB=1 restores running them on every boot for local development
+    if os.environ.get("AUTO_INIT_DB", "0") == "1":
+        init_db(app)
 
-        if not AdminUser.query.filter_by(username=admin_username).first():
-            hashed_password = argon2.generate_password_hash(admin_password)
-            admin_user = AdminUser(username=admin_username, password_hash=hashed_password, is_admin=True)
-            db.session.add(admin_user)
-            db.session.commit()
-            print(f"✅ Admin user '{admin_username}' created.")
-        else:
-            print(f"ℹ️ Admin user '{admin_username}' already exists.")
+    @app.cli.command("init-db", help="Create tables, indexes, the search index and the default admin user.")
+    def init_db_command():
+        init_db(app)
 
     # Register blueprints
     from routes.auth import auth_bp
@@ -71,15 +101,36 @@ def create_app():
     from routes.analyze import analyze_bp
     from routes.execute import execute_bp
     from routes.main import main_bp
+    from routes.batch import batch_bp
+    from routes.metrics import metrics_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(analyze_bp)
     app.register_blueprint(execute_bp)
     app.register_blueprint(main_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(metrics_bp)
+
+    # DB commit latency for /metrics
+    from metrics import instrument_db_commits
+
+    instrument_db_commits()
+
+    # Optional asyncio SSE endpoint for /progress/<ts> (see SSE_PUBLIC_URL)
+    sse_port = os.environ.get("SSE_ASYNC_PORT")
+    if sse_port:
+        from job_store import get_job_store
+        from progress_stream import AsyncProgressServer
+
+        AsyncProgressServer(app, get_job_store(), port=int(sse_port)).start_in_thread()
 
     return app
 
 if __name__ == "__main__":
-    app = create_app()
-    app.run(host="0.0.0.0", port=5000)
+    if sys.argv[1:] == ["init-db"]:
+        create_env_file()
+        init_db(create_app())
+    else:
+        app = create_app()
+        app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import math
+import mmap
+import random
+import struct
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+# Generated inputs are written once per (kind, n, seed, template) and memory-mapped
+# read-only by every sandbox worker, so parallel benchmarks share the page cache
+# instead of each building (and holding) their own copy
+WORKLOAD_DIR = os.path.abspath(
+    os.environ.get("WORKLOAD_DIR") or os.path.join(os.path.dirname(__file__), "..", "cache", "workloads")
+)
+WORKLOAD_CACHE_BYTES = int(os.environ.get("WORKLOAD_CACHE_MB", "512")) * 1024 * 1024
+MAX_WORKLOAD_SIZE = int(os.environ.get("MAX_WORKLOAD_SIZE", "10000000"))
+# Bump when a generator changes so stale files are not reused
+FORMAT_VERSION = 1
+TYPECODE = "q"
+ITEM_SIZE = 8
+HEADER = struct.Struct("<Q")
+MAX_VALUE = 10 ** 9
+NEARLY_SORTED_SWAPS = 0.01
+GRAPH_EXTRA_EDGES = 3
+MAX_MAPPED = 16
+
+KINDS = ("random", "sorted", "reversed", "nearly_sorted", "duplicates", "graph", "tree", "template")
+# Names user code can read; any of them makes a snippet depend on the input size
+INPUT_NAMES = ("n", "data", "data_view")
+
+
+# -------------------------------
+# Seed templates (the dataset field)
+# -------------------------------
+def _scalar(token):
+    for cast in (int, float):
+        try:
+            return cast(token)
+        except ValueError:
+            pass
+    return token
+
+
+def parse_template(dataset):
+    # A JSON array, or values separated by whitespace, commas or semicolons;
+    # generated inputs are drawn from these values
+    text = (dataset or "").strip()
+    if not text:
+        return None
+    try:
+        values = json.loads(text)
+    except ValueError:
+        values = [_scalar(token) for token in re.split(r"[\s,;]+", text) if token]
+    if isinstance(values, dict):
+        values = list(values.values())
+    if not isinstance(values, list):
+        values = [values]
+    values = [v for v in values if isinstance(v, (int, float, str)) and not isinstance(v, bool)]
+    return values or None
+
+
+def workload_spec(kind="random", seed=0, template=None):
+    if kind not in KINDS:
+        raise ValueError(f"unknown workload {kind!r} (expected one of {', '.join(KINDS)})")
+    seed = int(seed or 0)
+    if kind == "template":
+        template = parse_template(template) if isinstance(template, str) else template
+        if not template:
+            raise ValueError("the template workload needs a dataset to draw values from")
+    else:
+        template = None
+    return {"kind": kind, "seed": seed, "template": template}
+
+
+def describe(spec):
+    # Compact form stored with benchmark results; the template itself can be large
+    if not spec:
+        return None
+    template = spec.get("template")
+    digest = hashlib.sha256(json.dumps(template).encode("utf-8")).hexdigest()[:12] if template else None
+    return {"kind": spec["kind"], "seed": spec["seed"], "template": digest}
+
+
+# -------------------------------
+# Generators (flat int64 arrays)
+# -------------------------------
+def _index_encoded(spec):
+    # Templates that are not all int64-sized ints are stored as indices into the template
+    return spec["kind"] == "template" and not all(
+        isinstance(v, int) and -2 ** 63 <= v < 2 ** 63 for v in spec["template"]
+    )
+
+
+def _random_values(rng, n, upper=MAX_VALUE):
+    return [rng.randrange(upper) for _ in range(n)]
+
+
+def _graph_edges(rng, n):
+    # A random spanning tree keeps the graph connected; extra edges add cycles
+    edges = []
+    for node in range(1, n):
+        edges += (rng.randrange(node), node)
+    if n > 1:
+        for _ in range(GRAPH_EXTRA_EDGES * n):
+            u, v = rng.randrange(n), rng.randrange(n)
+            if u != v:
+                edges += (u, v)
+    return edges
+
+
+def generate(spec, n):
+    kind = spec["kind"]
+    rng = random.Random(f"{spec['seed']}:{kind}:{n}")
+    if kind == "random":
+        return _random_values(rng, n)
+    if kind == "sorted":
+        return sorted(_random_values(rng, n))
+    if kind == "reversed":
+        return sorted(_random_values(rng, n), reverse=True)
+    if kind == "nearly_sorted":
+        values = sorted(_random_values(rng, n))
+        for _ in range(math.ceil(n * NEARLY_SORTED_SWAPS) if n > 1 else 0):
+            i, j = rng.randrange(n), rng.randrange(n)
+            values[i], values[j] = values[j], values[i]
+        return values
+    if kind == "duplicates":
+        return _random_values(rng, n, max(1, math.isqrt(n)))
+    if kind == "graph":
+        return _graph_edges(rng, n)
+    if kind == "tree":
+        return [-1] + [rng.randrange(node) for node in range(1, n)]
+    values = spec["template"]
+    if _index_encoded(spec):
+        return [rng.randrange(len(values)) for _ in range(n)]
+    return [rng.choice(values) for _ in range(n)]
+
+
+def to_python(header, view):
+    # Fresh objects every call, so code that sorts or mutates its input in
+    # place never affects the next run
+    kind, n = header["kind"], header["n"]
+    if kind == "graph":
+        adjacency = [[] for _ in range(n)]
+        for i in range(0, len(view), 2):
+            u, v = view[i], view[i + 1]
+            adjacency[u].append(v)
+            adjacency[v].append(u)
+        return adjacency
+    if kind == "tree":
+        children = [[] for _ in range(n)]
+        for node in range(1, n):
+            children[view[node]].append(node)
+        return children
+    values = header.get("values")
+    if values is not None:
+        return [values[i] for i in view]
+    return view.tolist()
+
+
+# -------------------------------
+# Materializing (web side)
+# -------------------------------
+_write_lock = threading.Lock()
+
+
+def _workload_path(spec, n):
+    key = json.dumps([FORMAT_VERSION, spec["kind"], n, spec["seed"], spec.get("template")])
+    return os.path.join(WORKLOAD_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".bin")
+
+
+def _prune(keep=()):
+    entries = []
+    for name in os.listdir(WORKLOAD_DIR):
+        path = os.path.join(WORKLOAD_DIR, name)
+        if name.endswith(".bin") and path not in keep:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    # Least recently used first; workers that still map a file keep their pages
+    for _, size, path in sorted(entries):
+        if total <= WORKLOAD_CACHE_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def materialize(spec, n):
+    if n < 0 or n > MAX_WORKLOAD_SIZE:
+        raise ValueError(f"workload size must be between 0 and {MAX_WORKLOAD_SIZE:,}")
+    path = _workload_path(spec, n)
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    values = generate(spec, n)
+    header = json.dumps({
+        "kind": spec["kind"],
+        "n": n,
+        "seed": spec["seed"],
+        "values": spec["template"] if _index_encoded(spec) else None,
+    }).encode("utf-8")
+    # The array starts on an 8-byte boundary so it can be cast without copying
+    padding = b" " * (-(HEADER.size + len(header)) % ITEM_SIZE)
+
+    with _write_lock:
+        os.makedirs(WORKLOAD_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(len(header) + len(padding)))
+            f.write(header + padding)
+            array(TYPECODE, values).tofile(f)
+        os.replace(tmp_path, path)
+    return path
+
+
+def materialize_sizes(spec, sizes):
+    if not spec:
+        return {}
+    paths = {n: materialize(spec, n) for n in sizes}
+    with _write_lock:
+        _prune(set(paths.values()))
+    return paths
+
+
+# -------------------------------
+# Reading (sandbox worker side)
+# -------------------------------
+_mapped = OrderedDict()
+
+
+def open_workload(path):
+    entry = _mapped.get(path)
+    if entry is not None:
+        _mapped.move_to_end(path)
+        return entry
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    (header_size,) = HEADER.unpack_from(mapping)
+    header = json.loads(bytes(mapping[HEADER.size:HEADER.size + header_size]))
+    view = memoryview(mapping)[HEADER.size + header_size:].cast(TYPECODE)
+    entry = _mapped[path] = (header, view)
+    # Mappings still referenced by user code stay valid until those references go
+    while len(_mapped) > MAX_MAPPED:
+        _mapped.popitem(last=False)
+    return entry
+
+
+def workload_globals(path, n):
+    if not path:
+        return {"n": n}
+    header, view = open_workload(path)
+    return {"n": n, "data": to_python(header, view), "data_view": view}
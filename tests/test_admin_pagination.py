@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+from models.models import db, Report
+from routes.admin import encode_cursor, decode_cursor, report_page
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        # Pairs of reports share a timestamp, so the id has to break ties
+        for i in range(7):
+            db.session.add(Report(filename=f"r{i}.html", created_at=START + timedelta(days=i // 2),
+                                  user_id=1 if i % 2 else 2, created_by_admin=i == 0))
+        db.session.commit()
+        yield app
+
+
+def _pages(args):
+    ids, cursor = [], None
+    while True:
+        reports, cursor = report_page(MultiDict({**args, **({"cursor": cursor} if cursor else {})}))
+        ids.append([report.id for report in reports])
+        if not cursor:
+            return ids
+
+
+def test_cursor_round_trip(app):
+    report = Report.query.first()
+    assert decode_cursor(encode_cursor(report)) == (report.created_at, report.id)
+
+
+def test_pages_walk_every_row_once_newest_first(app):
+    assert _pages({"limit": "3"}) == [[7, 6, 5], [4, 3, 2], [1]]
+    assert _pages({}) == [[7, 6, 5, 4, 3, 2, 1]]
+
+
+def test_filters_apply_across_pages(app):
+    assert _pages({"limit": "2", "user_id": "1"}) == [[6, 4], [2]]
+    assert _pages({"admin": "1"}) == [[1]]
+    assert _pages({"since": "2024-01-02", "until": "2024-01-03"}) == [[6, 5, 4, 3]]
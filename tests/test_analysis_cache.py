@@ -0,0 +1,69 @@
+import time
+
+from analysis_cache import AnalysisCache, make_key
+
+
+def _cache(tmp_path, **kwargs):
+    return AnalysisCache(path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_key_ignores_line_endings_and_trailing_whitespace():
+    key = make_key("def f():\n    return 1\n", "data", "model", "v1")
+    assert make_key("def f():   \r\n    return 1\r\n\r\n", " data\n", "model", "v1") == key
+    assert make_key("def f():\n    return 2\n", "data", "model", "v1") != key
+    assert make_key("def f():\n    return 1\n", "data", "model", "v2") != key
+    assert make_key("def f():\n    return 1\n", "data", "model", "v1", context="hot spots") != key
+
+
+def test_hits_come_from_memory_then_disk(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("k") is None
+    cache.set("k", "analysis")
+    assert cache.get("k") == "analysis"
+
+    reopened = _cache(tmp_path)
+    assert reopened.get("k") == "analysis"
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, ttl=60)
+    cache.set("k", "analysis")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("k") is None
+    assert _cache(tmp_path, ttl=60).get("k") is None
+
+
+def test_memory_tier_is_lru(tmp_path):
+    cache = _cache(tmp_path, memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert list(cache._memory) == ["a", "c"]
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    cache = _cache(tmp_path, memory_entries=0, max_disk_bytes=250)
+    for key in "abc":
+        cache.set(key, key * 100)
+        clock[0] += 1
+    # "c" pushed the total past 250 bytes; "a" was the oldest access
+    fresh = _cache(tmp_path, memory_entries=0)
+    assert fresh.get("a") is None
+    assert fresh.get("b") == "b" * 100
+    assert fresh.get("c") == "c" * 100
+
+
+def test_unit_lookups_have_their_own_counters(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("unit", "analysis")
+    cache.get("unit", unit=True)
+    cache.get("other", unit=True)
+    stats = cache.stats()
+    assert (stats["unit_hits"], stats["unit_misses"]) == (1, 1)
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (0, 0, 0.0)
@@ -0,0 +1,45 @@
+import json
+
+import batch
+
+
+def _run(tmp_path, monkeypatch, batch_id, items, analyze):
+    monkeypatch.setattr(batch, "REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(batch, "save_html_output", lambda *args, **kwargs: "report.html")
+    return batch.BatchRun(batch_id, items, concurrency=2, analyze=analyze).run()
+
+
+def test_rerun_skips_finished_items(tmp_path, monkeypatch):
+    items = [batch.BatchItem(f"item{i}", f"x = {i}") for i in range(4)]
+    failing = {"x = 2"}
+
+    def analyze(code, dataset):
+        if code in failing:
+            raise ValueError("boom")
+        return "analysis"
+
+    state = _run(tmp_path, monkeypatch, "b1", items, analyze)
+    assert sorted(entry["status"] for entry in state["items"].values()) == ["done", "done", "done", "error"]
+
+    failing.clear()
+    seen = []
+    state = _run(tmp_path, monkeypatch, "b1", items, lambda code, dataset: seen.append(code) or "analysis")
+    assert seen == ["x = 2"]
+    assert all(entry["status"] == "done" for entry in state["items"].values())
+
+
+def test_state_replays_the_item_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "REPORTS_DIR", str(tmp_path))
+    item = batch.BatchItem("item", "x = 1")
+    (tmp_path / "batch_b2.log.jsonl").write_text(
+        json.dumps({"key": item.key, "name": "item", "status": "done"}) + "\n{cut short")
+
+    assert batch.read_state("b2")["items"] == {item.key: {"name": "item", "status": "done"}}
+    assert batch.BatchRun("b2", [item]).pending() == []
+    assert batch.read_state("missing") is None
+
+
+def test_batch_ids_are_plain_names():
+    assert batch.valid_batch_id("20260101_120000_000001")
+    assert not batch.valid_batch_id("../etc")
+    assert not batch.valid_batch_id("")
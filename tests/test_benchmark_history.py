@@ -0,0 +1,30 @@
+from benchmark_history import mann_whitney_greater, code_hash
+
+
+def test_clear_slowdown_is_significant():
+    slow = [1.20, 1.22, 1.19, 1.25, 1.21, 1.23]
+    fast = [1.00, 1.01, 0.99, 1.02, 1.00, 0.98]
+    assert mann_whitney_greater(slow, fast) < 0.01
+    assert mann_whitney_greater(fast, slow) > 0.99
+
+
+def test_noise_is_not_significant():
+    a = [1.00, 1.03, 0.98, 1.01, 1.02]
+    b = [1.01, 0.99, 1.02, 1.00, 1.03]
+    assert 0.2 < mann_whitney_greater(a, b) < 0.8
+
+
+def test_single_outlier_does_not_fake_a_regression():
+    baseline = [1.00, 1.01, 0.99, 1.02, 1.00]
+    latest = [1.00, 1.01, 0.99, 1.02, 50.0]
+    assert mann_whitney_greater(latest, baseline) > 0.05
+
+
+def test_degenerate_inputs():
+    assert mann_whitney_greater([], [1.0]) == 1.0
+    assert mann_whitney_greater([1.0, 1.0], [1.0, 1.0]) == 1.0
+
+
+def test_code_hash_ignores_formatting_noise():
+    assert code_hash("x = 1\r\n") == code_hash("x = 1   \n")
+    assert code_hash("x = 1") != code_hash("x = 2")
@@ -0,0 +1,29 @@
+import pytest
+
+from benchmarking import summarize, geometric_sizes, parse_sizes, DEFAULT_SIZES, MAX_SIZES
+
+
+def test_summarize_quartiles():
+    stats = summarize([5, 1, 4, 2, 3])
+    assert stats == {"median": 3, "min": 1, "max": 5, "q1": 2, "q3": 4, "iqr": 2}
+    assert summarize([7])["iqr"] == 0
+
+
+def test_geometric_sizes():
+    assert geometric_sizes(10, 10000) == [10, 100, 1000, 10000]
+    assert geometric_sizes(1, 16, factor=2) == [1, 2, 4, 8, 16]
+    assert geometric_sizes(10, 1000, points=3) == [10, 100, 1000]
+    # Rounding collisions collapse into one size
+    assert geometric_sizes(1, 3, points=10) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        geometric_sizes(1, 100, factor=1)
+
+
+def test_parse_sizes():
+    assert parse_sizes({}) == DEFAULT_SIZES
+    assert parse_sizes({"sizes": ["100", 10, 10]}) == [10, 100]
+    assert parse_sizes({"range": {"start": 100, "stop": 10000}}) == [100, 1000, 10000]
+    with pytest.raises(ValueError):
+        parse_sizes({"sizes": [-1, 10]})
+    with pytest.raises(ValueError):
+        parse_sizes({"sizes": list(range(MAX_SIZES + 1))})
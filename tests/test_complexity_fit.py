@@ -0,0 +1,42 @@
+import math
+import warnings
+
+from complexity_fit import fit_complexity, fit_sweep, claimed_complexities
+
+SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def test_fit_picks_the_generating_model():
+    assert fit_complexity(SIZES, [3e-6 * n + 1e-5 for n in SIZES])["best"] == "O(n)"
+    assert fit_complexity(SIZES, [2e-9 * n * n + 1e-5 for n in SIZES])["best"] == "O(n²)"
+    assert fit_complexity(SIZES, [4e-7 * n * math.log2(n) for n in SIZES])["best"] == "O(n log n)"
+    assert fit_complexity(SIZES, [1e-4 * (1 + 0.01 * (i % 2)) for i in range(len(SIZES))])["best"] == "O(1)"
+    small = [4, 8, 12, 16, 20]
+    assert fit_complexity(small, [1e-7 * 2 ** n for n in small])["best"] == "O(2ⁿ)"
+
+
+def test_fit_predicts_larger_inputs():
+    fit = fit_complexity(SIZES, [3e-6 * n for n in SIZES], predict_n=1_000_000)
+    assert fit["predict_n"] == 1_000_000
+    assert math.isclose(fit["predicted"], 3.0, rel_tol=0.01)
+
+
+def test_exponential_sizes_do_not_overflow():
+    sizes = [512, 700, 850, 1000]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        fit = fit_complexity(sizes, [1e-6 * n for n in sizes], predict_n=1_000_000)
+    assert fit["best"] == "O(n)"
+
+
+def test_too_few_points():
+    assert fit_complexity([10, 100], [1.0, 2.0]) is None
+    # Failed or zero timings are dropped before counting
+    assert fit_complexity([10, 100, 1000], [1.0, 0.0, float("nan")]) is None
+    assert fit_sweep([{"n": 10, "median": None}]) is None
+
+
+def test_fit_sweep_and_claims():
+    results = [{"n": n, "median": 3e-6 * n} for n in SIZES]
+    assert fit_sweep(results)["best"] == "O(n)"
+    assert claimed_complexities("Time is O(n log n), space O(n); overall O(n  log n).") == ["O(n log n)", "O(n)"]
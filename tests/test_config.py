@@ -0,0 +1,40 @@
+from dotenv import dotenv_values
+
+from config import EnvConfig
+
+
+def _config(tmp_path, content):
+    path = tmp_path / ".env"
+    path.write_text(content)
+    return EnvConfig(str(path)), path
+
+
+def test_file_wins_over_startup_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "from-startup")
+    monkeypatch.setenv("ONLY_IN_ENV", "kept")
+    config, _ = _config(tmp_path, "GOOGLE_API_KEY=from-file\n")
+    assert config.get("GOOGLE_API_KEY") == "from-file"
+    assert config.get("ONLY_IN_ENV") == "kept"
+
+    config.update({"GOOGLE_API_KEY": ""})
+    assert config.get("GOOGLE_API_KEY") is None
+    config.replace({})
+    assert config.get("GOOGLE_API_KEY", "default") == "default"
+
+
+def test_replace_keeps_raw_lines_of_unchanged_keys(tmp_path):
+    config, path = _config(tmp_path, "# comment\nBASE=/srv\nDATA=\"${BASE}/data\"\nOLD=1\n")
+    values = config.values()
+    del values["OLD"]
+    values["MODEL_NAME"] = "model with spaces"
+    config.replace(values)
+
+    assert path.read_text() == "# comment\nBASE=/srv\nDATA=\"${BASE}/data\"\nMODEL_NAME='model with spaces'\n"
+    assert dotenv_values(path)["DATA"] == "/srv/data"
+
+
+def test_written_values_read_back_unchanged(tmp_path):
+    config, path = _config(tmp_path, "")
+    value = "he said \"hi\" it's #1"
+    config.update({"QUOTED": value})
+    assert dotenv_values(path)["QUOTED"] == value
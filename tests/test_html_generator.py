@@ -0,0 +1,27 @@
+from html_generator import generate_html, inline_code
+from static_analysis import analyze_static
+
+INJECTED = '''def build(items):
+    out = ""
+    for x in items:
+        out += "`<img src=x onerror=alert(1)>` <script>alert(2)</script>"
+    return out
+'''
+
+
+def _static_section(html):
+    return html[html.index("static-analysis"):html.index("Gemini Analysis")]
+
+
+def test_static_section_escapes_user_code():
+    static = analyze_static(INJECTED)
+    assert static["issues"]
+    section = _static_section(generate_html(INJECTED, "", "analysis", static=static))
+    assert "<img" not in section
+    assert "<script" not in section
+    assert "&lt;script&gt;" in section
+
+
+def test_inline_code_renders_only_code_spans():
+    assert str(inline_code("use `set` <b>now</b>")) == "use <code>set</code> &lt;b&gt;now&lt;/b&gt;"
+    assert str(inline_code("`` a`<i>` ``")) == "<code>a`&lt;i&gt;`</code>"
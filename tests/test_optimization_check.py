@@ -0,0 +1,47 @@
+from optimization_check import splice_definitions, extract_optimized_code, compare_timings, _verdict
+
+ORIGINAL = '''import sys
+
+def slow(a):
+    return sorted(a)[0]
+
+@decorated
+def other():
+    return 1
+'''
+
+
+def test_splice_replaces_only_the_answered_definitions():
+    spliced = splice_definitions(ORIGINAL, ["def slow(a):\n    return min(a)\n", "def unknown():\n    pass\n"])
+    assert spliced == ORIGINAL.replace("sorted(a)[0]", "min(a)")
+    assert splice_definitions(ORIGINAL, ["def unknown():\n    pass\n"]) is None
+    assert splice_definitions("def (:", ["def slow(a):\n    pass\n"]) is None
+
+
+def test_extract_prefers_the_optimized_section():
+    analysis = ("## Current code\n```python\ndef slow(a):\n    return sorted(a)[0]\n```\n"
+                "## Optimized code\n```python\ndef slow(a):\n    return min(a)\n```\n"
+                "## Notes\n```text\nnot code\n```\n")
+    assert extract_optimized_code(analysis) == "def slow(a):\n    return min(a)"
+    assert extract_optimized_code("no code here") is None
+
+
+def _sweep(*points):
+    return {"results": [{"n": n, "median": median, "samples": samples} for n, median, samples in points]}
+
+
+def test_speedups_need_significance():
+    baseline = _sweep((10, 1.0, [1.0, 1.01, 0.99, 1.02, 1.0]), (100, 10.0, [10.0, 10.1, 9.9, 10.2, 10.0]))
+    candidate = _sweep((10, 1.0, [1.0, 0.99, 1.02, 1.01, 1.0]), (100, 5.0, [5.0, 5.1, 4.9, 5.05, 5.0]))
+    sizes = compare_timings(baseline, candidate)
+    assert [(size["n"], size["status"]) for size in sizes] == [(10, "same"), (100, "faster")]
+    assert sizes[1]["speedup"] == 2.0
+    assert compare_timings(candidate, baseline)[1]["status"] == "slower"
+
+
+def test_verdict():
+    faster = [{"n": 100, "status": "faster"}]
+    assert _verdict([{"status": "mismatch"}], faster, None) == "wrong"
+    assert _verdict([], [], "timed out") == "failed"
+    assert _verdict([{"status": "unverified"}], faster, None) == "unverified"
+    assert _verdict([{"status": "match"}], [{"status": "slower"}] + faster, None) == "faster"
@@ -0,0 +1,86 @@
+import json
+
+import prompt_budget
+from prompt_budget import needs_split, split_code, summarize_dataset, _fit
+from gemini_client import estimate_tokens
+
+
+def _program(functions, body_lines=20):
+    parts = ["import math\nLIMIT = 10\n"]
+    for i in range(functions):
+        body = "".join(f"    x{j} = math.sqrt({j}) + LIMIT\n" for j in range(body_lines))
+        parts.append(f"\n# helper {i}\ndef f{i}(a):\n{body}    return a\n")
+    parts.append("\nprint(f0(1))\n")
+    return "".join(parts)
+
+
+def test_small_code_is_one_chunk():
+    code = _program(2)
+    assert not needs_split(code)
+    assert split_code(code) == ([{"names": [], "code": code}], "", [])
+
+
+def test_large_code_splits_on_definitions():
+    code = _program(6)
+    chunks, context, skipped = split_code(code, max_tokens=300)
+    assert needs_split(code, max_tokens=300)
+    assert all(estimate_tokens(chunk["code"]) <= 300 for chunk in chunks)
+    assert [name for chunk in chunks for name in chunk["names"]] == [f"f{i}" for i in range(6)] + ["module-level code"]
+    # Shared imports/constants and an outline of every definition go with each chunk
+    assert "import math" in context and "LIMIT = 10" in context and "#   def f5(a)" in context
+    assert "# helper 3\ndef f3(a):" in "".join(chunk["code"] for chunk in chunks)
+    assert skipped == []
+
+
+def test_chunks_beyond_the_limit_are_reported():
+    chunks, _, skipped = split_code(_program(6), max_tokens=300, max_chunks=2)
+    assert len(chunks) == 2
+    assert skipped and "module-level code" in skipped
+    assert not set(skipped) & {name for chunk in chunks for name in chunk["names"]}
+
+
+def test_unparseable_code_splits_by_lines():
+    code = "def broken(:\n" + "x = 1\n" * 400
+    chunks, context, _ = split_code(code, max_tokens=200)
+    assert len(chunks) > 1 and context == ""
+    assert chunks[0]["names"][0].startswith("lines 1–")
+
+
+def test_fit_truncates_to_the_budget():
+    assert _fit("short", 10) == "short"
+    fitted = _fit("x" * 1000, 10)
+    assert fitted.startswith("x" * 40) and fitted.endswith("[truncated to fit the prompt budget]")
+    assert "x" * 41 not in fitted
+
+
+def test_small_datasets_pass_through():
+    assert summarize_dataset("1, 2, 3") == ("1, 2, 3", False)
+    assert summarize_dataset(None) == ("", False)
+
+
+def test_large_datasets_are_summarized():
+    rows = "\n".join(f"{i},{i * 2.5},name{i}" for i in range(5000))
+    text, summarized = summarize_dataset("id,score,label\n" + rows, max_tokens=500)
+    assert summarized and estimate_tokens(text) <= 510
+    assert "table: 5,000 rows × 3 columns" in text and "score:" in text
+
+    records = json.dumps([{"id": i, "tags": ["a", "b"]} for i in range(5000)])
+    text, summarized = summarize_dataset(records, max_tokens=500)
+    assert summarized and "Summary of a large dataset" in text and "id" in text
+
+
+def test_code_units_need_several_definitions(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "INCREMENTAL", True)
+    monkeypatch.setattr(prompt_budget, "cache_enabled", lambda: True)
+    assert prompt_budget.code_units("def f():\n    return 1\n") is None
+
+    units, context = prompt_budget.code_units("def f():\n    return g()\n\ndef g():\n    return 1\n")
+    assert [unit["names"] for unit in units] == [["f"], ["g"]]
+    assert units[0]["callees"] == ["g"] and units[1]["callees"] == []
+    assert "#   def g()" in context
+    # Formatting and comments do not change a unit's fingerprint
+    reformatted, _ = prompt_budget.code_units("# entry\ndef f( ):\n    return g( )\n\ndef g():\n    return 1\n")
+    assert reformatted[0]["fingerprint"] == units[0]["fingerprint"]
+
+    monkeypatch.setattr(prompt_budget, "INCREMENTAL", False)
+    assert prompt_budget.code_units("def f():\n    pass\n\ndef g():\n    pass\n") is None
@@ -0,0 +1,22 @@
+from report_search import fts5_query, detect_data_structures
+
+
+def test_terms_become_quoted_phrases():
+    assert fts5_query("merge sort") == '"merge" "sort"'
+    assert fts5_query("O(n) AND NOT") == '"O(n)" "AND" "NOT"'
+
+
+def test_quotes_cannot_break_the_match_syntax():
+    assert fts5_query('say "hi') == '"say" "hi"'
+    assert fts5_query('""  * ') == ""
+
+
+def test_trailing_star_keeps_prefix_matching():
+    assert fts5_query("quick* heap") == '"quick"* "heap"'
+    assert fts5_query("a*b") == '"a*b"'
+
+
+def test_detects_data_structures():
+    code = "import heapq\nfrom collections import deque\nseen = set()\nq = deque()\nheapq.heappush(h, 1)\n"
+    found = detect_data_structures(code)
+    assert {"heap", "deque", "set"} <= set(found)
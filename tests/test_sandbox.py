@@ -0,0 +1,18 @@
+from sandbox import run_user_code
+
+
+def test_exit_is_a_clean_finish():
+    result = run_user_code("print('done')\nexit()", {}, max_output=1000)
+    assert result["error"] is None
+    assert result["output"] == "done\n"
+
+
+def test_nonzero_exit_is_reported():
+    result = run_user_code("import sys\nsys.exit(3)", {}, max_output=1000)
+    assert result["error"] == "SystemExit: 3"
+
+
+def test_output_is_truncated():
+    result = run_user_code("print('x' * 50)", {}, max_output=10)
+    assert result["output"].startswith("x" * 10)
+    assert result["output"].endswith("[output truncated]")
@@ -0,0 +1,116 @@
+from static_analysis import analyze_static, code_span
+
+MERGE_SORT = '''
+def merge_sort(a):
+    if len(a) <= 1:
+        return a
+    m = len(a) // 2
+    left = merge_sort(a[:m])
+    right = merge_sort(a[m:])
+    out = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            out.append(left[i])
+            i += 1
+        else:
+            out.append(right[j])
+            j += 1
+    return out + left[i:] + right[j:]
+'''
+
+QUICKSORT = '''
+def quicksort(a):
+    if len(a) <= 1:
+        return a
+    pivot = a[0]
+    less = [x for x in a[1:] if x < pivot]
+    more = [x for x in a[1:] if x >= pivot]
+    return quicksort(less) + [pivot] + quicksort(more)
+'''
+
+TREE_HEIGHT = '''
+def height(node):
+    if node is None:
+        return 0
+    return 1 + max(height(node.left), height(node.right))
+'''
+
+TREE_SIZE = '''
+def size(node):
+    total = 1
+    for child in node.children:
+        total += size(child)
+    return total
+'''
+
+BINARY_SEARCH = '''
+def search(a, target, lo, hi):
+    if lo > hi:
+        return -1
+    mid = (lo + hi) // 2
+    if a[mid] == target:
+        return mid
+    elif a[mid] < target:
+        return search(a, target, mid + 1, hi)
+    else:
+        return search(a, target, lo, mid - 1)
+'''
+
+FIBONACCI = '''
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+'''
+
+
+def _exponential_flags(result):
+    return [issue for issue in result["issues"] if issue["idiom"] == "exponential recursion"]
+
+
+def test_merge_sort_is_n_log_n():
+    result = analyze_static(MERGE_SORT)
+    assert result["time"] == "O(n log n)"
+    assert not _exponential_flags(result)
+
+
+def test_quicksort_is_n_log_n_on_average():
+    result = analyze_static(QUICKSORT)
+    assert result["time"] == "O(n log n)"
+    assert not _exponential_flags(result)
+
+
+def test_tree_height_is_linear():
+    result = analyze_static(TREE_HEIGHT)
+    assert result["time"] == "O(n)"
+    assert not _exponential_flags(result)
+
+
+def test_loop_over_children_is_linear():
+    assert analyze_static(TREE_SIZE)["time"] == "O(n)"
+
+
+def test_recursive_binary_search_is_logarithmic():
+    result = analyze_static(BINARY_SEARCH)
+    assert result["time"] == "O(log n)"
+    assert result["functions"][0]["recursion"]["branching"] == 1
+
+
+def test_independent_branches_are_exponential():
+    result = analyze_static(FIBONACCI)
+    assert result["time"] == "O(2ⁿ)"
+    assert _exponential_flags(result)
+
+
+def test_memoized_recursion_is_not_flagged():
+    result = analyze_static("from functools import lru_cache\n\n@lru_cache(None)" + FIBONACCI)
+    assert result["time"] == "O(n)"
+    assert not _exponential_flags(result)
+
+
+def test_code_span_survives_backticks_in_user_code():
+    assert code_span("a") == "`a`"
+    assert code_span("x += '`'") == "``x += '`'``"
+    assert code_span("`x`") == "`` `x` ``"
+    assert code_span("s = '``'") == "```s = '``'```"